@@ -12,6 +12,12 @@ else:
 
 settings = Settings()
 
+import logging
+from ..logs import configure as _configure_logging
+
+_configure_logging(settings)
+log = logging.getLogger(__name__)
+
 # ---- Post-init helpers/warnings ----
 from pathlib import Path
 import os as _os
@@ -24,7 +30,7 @@ if settings.USE_GDRIVE and settings.GOOGLE_APPLICATION_CREDENTIALS:
         from .base import BASE_DIR
         cred_path = BASE_DIR / cred_path
     _os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(cred_path)
-    print("[config] CRED PATH ->", cred_path, cred_path.exists())
+    log.info("credentials path", extra={"path": str(cred_path), "exists": cred_path.exists()})
 
 # تأكد من مجلدات التخزين
 settings.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
@@ -33,9 +39,9 @@ settings.THUMBS_DIR.mkdir(parents=True, exist_ok=True)
 # تحذيرات Drive
 if settings.USE_GDRIVE:
     if not settings.GDRIVE_ROOT_FOLDER_ID:
-        print("[config] WARNING: USE_GDRIVE=True but GDRIVE_ROOT_FOLDER_ID is not set.")
+        log.warning("USE_GDRIVE=True but GDRIVE_ROOT_FOLDER_ID is not set")
     cred_env = _os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
     if not cred_env or not Path(cred_env).exists():
-        print("[config] WARNING: GOOGLE_APPLICATION_CREDENTIALS is missing or invalid.")
+        log.warning("GOOGLE_APPLICATION_CREDENTIALS is missing or invalid")
 
-print(f"[config] Loaded {settings.ENV} config | USE_GDRIVE={settings.USE_GDRIVE}")
+log.info("loaded config", extra={"env": settings.ENV, "use_gdrive": settings.USE_GDRIVE})
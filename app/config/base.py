@@ -13,6 +13,21 @@ class BaseConfig(BaseSettings):
     ADMIN_PASSWORD: str = ""
     SITE_TITLE: str = "Dich Foto"
     ENV: str = "base"  # تُغيّر في local/server
+    AUTO_CREATE_SCHEMA: bool = True  # prod: مرة واحدة في gunicorn on_starting / migrate_schema.py
+
+    # ===== PostgreSQL (DATABASE_URL=postgresql://...) =====
+    DB_POOL_SIZE: Optional[int] = None     # الافتراضي: DB_MAX_CONNECTIONS مقسومة على العمّال
+    DB_MAX_CONNECTIONS: int = 90           # ميزانية كل العمّال (أقل من max_connections=100)
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 10            # ثوانٍ انتظار اتصال حر قبل الخطأ
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_PREPARE_THRESHOLD: Optional[int] = 5  # None مع pgbouncer في وضع transaction
+
+    # ===== SQLite: single writer + read-only pool =====
+    SQLITE_READ_POOL_SIZE: int = 8      # اتصالات mode=ro للقراءات العامة؛ 0 = محرك واحد للجميع
+    WRITE_BATCH_DELAY_MS: float = 2     # نافذة تجميع الكتابات الصغيرة (وما وصل أثناء الالتزام السابق)
+    WRITE_BATCH_MAX: int = 200          # أقصى عدد مهام في المعاملة الواحدة
+    WRITE_WAIT_TIMEOUT: float = 10      # ثوانٍ ينتظرها الطلب نتيجة كتابته
 
     # ===== Upload service =====
     UPLOAD_BASE_URL: str = "https://upload.dichfoto.com"
@@ -24,12 +39,83 @@ class BaseConfig(BaseSettings):
     STORAGE_DIR: Path = BASE_DIR / "storage"
     THUMBS_DIR: Path = STORAGE_DIR / "_thumbs"
     THUMB_MAX_WIDTH: int = 800
+    ARCHIVE_DIR: Path = BASE_DIR / "archive"  # خارج STORAGE_DIR: /media لا يخدمه؛ التنزيل للمشرف فقط
 
     # ===== Image / thumbnail options =====
     FORCE_JPEG: bool = True
     ENABLE_WEBP: bool = True
     ENABLE_AVIF: bool = False
 
+    # ===== Trash sweeper =====
+    TRASH_SWEEP_INTERVAL: int = 60   # ثوانٍ بين كل دورة حذف؛ 0 يعطّل الخيط الخلفي
+    TRASH_BATCH_SIZE: int = 100
+    TRASH_MAX_ATTEMPTS: int = 8
+    TRASH_ORPHAN_GRACE: int = 3600   # ثوانٍ؛ الملفات الأحدث قد تكون رفعًا لم يُسجَّل صفّه بعد
+
+    # ===== Likes =====
+    LIKES_FLUSH_DELAY: float = 0.5   # ثوانٍ لتجميع نقرات الإعجاب المتتالية في معاملة واحدة
+
+    # ===== Public shares =====
+    SHARE_CACHE_TTL: int = 30          # ثوانٍ لتخزين بيانات رابط المشاركة في ذاكرة كل عامل
+    ASSET_TOKEN_TTL: int = 6 * 3600    # صلاحية توكن روابط الصور/الملفات
+    ASSET_TOKEN_BUCKET: int = 3600     # تقريب الانتهاء ليبقى الرابط ثابتًا داخل النافذة
+
+    # ===== Share unlock (password) =====
+    UNLOCK_WORKERS: int = 2            # خيوط bcrypt المخصّصة
+    UNLOCK_QUEUE: int = 8              # محاولات إضافية بالانتظار قبل الرد بـ 429
+    UNLOCK_IP_BURST: int = 5
+    UNLOCK_IP_PER_MIN: float = 5       # 0 يعطّل حدّ الـ IP
+    UNLOCK_SLUG_BURST: int = 20
+    UNLOCK_SLUG_PER_MIN: float = 20    # 0 يعطّل حدّ الرابط
+    UNLOCK_TOKEN_TTL: int = 7 * 24 * 3600
+
+    # ===== Signed /media URLs =====
+    MEDIA_SIGNED_URLS: bool = True           # روابط /media موقّعة في الصفحات العامة
+    MEDIA_REQUIRE_SIGNATURE: bool = False    # رفض أي طلب /media بدون توقيع (مفعّل في server)؛ original/ يتطلبه دائمًا
+    MEDIA_SIGNING_SECRET: Optional[str] = None  # يطابق سر nginx secure_link_md5؛ الافتراضي SECRET_KEY
+    MEDIA_URL_TTL: int = 30 * 24 * 3600      # صلاحية رابط الوسائط؛ تحدّ مدة تخزينه في المتصفح/CDN
+    MEDIA_URL_BUCKET: int = 7 * 24 * 3600    # الرابط ثابت طوال النافذة فلا يعيد المتصفح تنزيل الألبوم
+
+    # ===== File offload (front server sends the bytes) =====
+    FILE_OFFLOAD: str = ""                 # "" | "x-accel" (nginx) | "x-sendfile"
+    FILE_OFFLOAD_PREFIX: str = "/_protected"  # location internal في nginx يشير إلى STORAGE_DIR
+
+    # ===== Compression / page cache =====
+    COMPRESS_MIN_SIZE: int = 1024      # بايت؛ الردود الأصغر تُرسل كما هي
+    PAGE_CACHE_TTL: int = 300          # ثوانٍ؛ الإصدار (album_version) يبطل الصفحة قبل ذلك عند أي تعديل
+    PAGE_CACHE_MAX: int = 200          # عدد الصفحات المخزّنة لكل عامل
+    PAGE_CACHE_DIR: Optional[str] = None  # مجلد مشترك بين العمّال بدل ذاكرة كل عامل (prod)
+    TEMPLATE_CACHE_DIR: Optional[str] = str(BASE_DIR / "cache" / "jinja")  # bytecode لقوالب Jinja
+    TEMPLATE_AUTO_RELOAD: bool = True  # يعيد تحميل القالب عند تعديل ملفه (للتطوير)
+    FRAGMENT_CACHE_TTL: int = 3600     # ثوانٍ؛ HTML عنصر المعرض لكل أصل (app/services/fragments.py)
+    FRAGMENT_CACHE_MAX: int = 20_000   # عنصر واحد لكل أصل، ~0.5KB لكل منها
+
+    # ===== Logging (app/logs.py) =====
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"                # "json" | "text"
+    LOG_FILE: Optional[str] = None          # الافتراضي stdout
+    LOG_REQUESTS: bool = True               # سطر لكل طلب مع الزمن وعدد الاستعلامات
+    SLOW_REQUEST_MS: float = 1000           # الطلبات الأبطأ تُسجَّل بمستوى WARNING
+    SLOW_QUERY_MS: float = 200              # 0 يعطّل سجل الاستعلامات البطيئة
+    LOG_SLOW_QUERY_PARAMS: bool = False     # قد تحتوي بيانات شخصية
+    SLOW_DRIVE_MS: float = 2000
+
+    # ===== Metrics (/metrics) =====
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None      # Authorization: Bearer <token>؛ إلزامي خارج dev (بدونه 404)
+
+    # ===== Request profiling (app/profiling.py) =====
+    PROFILE_SAMPLE_RATE: float = 0.0        # نسبة الطلبات المُحلَّلة تلقائيًا؛ X-Profile: 1 للمشرف دائمًا
+    PROFILE_INTERVAL_MS: float = 5.0        # فترة أخذ عينات المكدّس؛ 0 = spans فقط
+    PROFILE_KEEP: int = 20                  # أبطأ N طلبًا تُحفظ على القرص لكل عامل
+    PROFILE_DIR: Path = BASE_DIR / "profiles"
+
+    # ===== Video posters =====
+    VIDEO_POSTER_TTL: int = 7 * 24 * 3600   # إعادة جلب صورة الغلاف من المزوّد بعد هذه المدة
+    VIDEO_POSTER_RETRY: int = 3600          # مهلة قبل إعادة المحاولة بعد فشل الجلب
+    VIDEO_POSTER_WIDTH: int = 960
+    VIDEO_POSTER_TIMEOUT: float = 10.0
+
     # ===== Google Drive =====
     USE_GDRIVE: bool = False
     GDRIVE_ROOT_FOLDER_ID: Optional[str] = None
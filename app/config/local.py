@@ -19,4 +19,5 @@ class Settings(BaseConfig):
     ]
 
     USE_GDRIVE: bool = False
+    LOG_FORMAT: str = "text"
     UPLOAD_BASE_URL: str = ""
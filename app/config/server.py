@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from .base import BaseConfig, BASE_DIR
 
 _env_file = BASE_DIR / ".env"
@@ -16,5 +16,9 @@ class Settings(BaseConfig):
     ]
 
     USE_GDRIVE: bool = True  # أو True حسب حاجتك
+    AUTO_CREATE_SCHEMA: bool = False  # لا يكرر كل عامل create_all عند الإقلاع
+    PAGE_CACHE_DIR: Optional[str] = str(BASE_DIR / "cache" / "pages")  # نسخة واحدة لكل العمّال
+    TEMPLATE_AUTO_RELOAD: bool = False  # القوالب لا تتغير بين عمليات النشر
+    MEDIA_REQUIRE_SIGNATURE: bool = True  # لا /media بدون رابط موقّع
     UPLOAD_BASE_URL: str = "https://upload.dichfoto.com"
 
@@ -1,27 +1,84 @@
 # app/database.py
+import os
+from typing import Optional
+
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
-DATABASE_URL = settings.DATABASE_URL
+# عمّال anyio الافتراضيون لكل عامل: حد أعلى للاتصالات المتزامنة من الراوترات
+THREADPOOL_SIZE = 40
 
-# Detect if SQLite is being used and set appropriate connection arguments
-is_sqlite = DATABASE_URL.startswith("sqlite")
-connect_args = {"check_same_thread": False} if is_sqlite else {}
 
-# Create the database engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True,  # Verify connection before using
-    future=True,
-)
+def normalize_url(url: str) -> str:
+    """
+    Use psycopg 3 for PostgreSQL URLs (``postgres://`` as given by most
+    hosts, or ``postgresql://`` which SQLAlchemy maps to psycopg2).
+    """
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+
+def pool_size(workers: Optional[int] = None) -> int:
+    """
+    Connections kept per worker: DB_POOL_SIZE, or the DB_MAX_CONNECTIONS
+    budget shared by all gunicorn workers (WEB_CONCURRENCY), minus each
+    worker's overflow and capped at its thread pool.
+    """
+    if settings.DB_POOL_SIZE:
+        return settings.DB_POOL_SIZE
+    workers = workers or int(os.environ.get("WEB_CONCURRENCY", "1"))
+    per_worker = settings.DB_MAX_CONNECTIONS // max(1, workers) - settings.DB_MAX_OVERFLOW
+    return max(2, min(THREADPOOL_SIZE, per_worker))
+
+
+def make_engine(url: str, statement_timeout_ms: Optional[int] = None) -> Engine:
+    """
+    Engine tuned for the backend: WAL pragmas and BEGIN IMMEDIATE on
+    SQLite (its sessions write alongside the writer thread); on PostgreSQL
+    a sized pool, a statement timeout and server-side prepared statements.
+    """
+    url = normalize_url(url)
 
+    if url.startswith("sqlite"):
+        return _sqlite_engine(url, immediate=True)
 
-# Apply SQLite-specific PRAGMAs when a new connection is established
-if is_sqlite:
+    connect_args = {}
+    if url.startswith("postgresql"):
+        timeout = settings.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+        connect_args = {
+            "application_name": "dichfoto",
+            # استعلام عالق لا يحجز اتصالًا من المجمّع إلى ما لا نهاية
+            "options": f"-c statement_timeout={timeout} -c idle_in_transaction_session_timeout={max(timeout, 60000)}",
+            # psycopg يحضّر الاستعلام على الخادم بعد N تنفيذات؛ None يعطّله (pgbouncer transaction mode)
+            "prepare_threshold": settings.DB_PREPARE_THRESHOLD,
+        }
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=pool_size(),
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=1800,   # الاتصالات الطويلة تُغلق خلف load balancers
+        pool_pre_ping=True,
+        future=True,
+    )
 
-    @event.listens_for(engine, "connect")
+
+def _sqlite_engine(url: str, read_only: bool = False, immediate: bool = False, **pool) -> Engine:
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_pre_ping=True,  # Verify connection before using
+        future=True,
+        **pool,
+    )
+
+    # Apply SQLite-specific PRAGMAs when a new connection is established
+    @event.listens_for(eng, "connect")
     def _sqlite_pragmas(dbapi_con, con_record):
         """
         Apply SQLite PRAGMAs to optimize performance and stability.
@@ -31,14 +88,70 @@ if is_sqlite:
             con_record: The SQLAlchemy connection record.
         """
         cur = dbapi_con.cursor()
-        cur.execute("PRAGMA journal_mode=WAL;")     # Enable Write-Ahead Logging
-        cur.execute("PRAGMA synchronous=NORMAL;")   # Balance between safety and performance
+        if read_only:
+            cur.execute("PRAGMA query_only=1;")     # أي كتابة تفشل فورًا بدل انتظار القفل
+        else:
+            cur.execute("PRAGMA journal_mode=WAL;")     # Enable Write-Ahead Logging
+            cur.execute("PRAGMA synchronous=NORMAL;")   # Balance between safety and performance
         cur.execute("PRAGMA busy_timeout=5000;")    # Wait 5s before 'database is locked' error
         cur.execute("PRAGMA cache_size=-20000;")    # ~20MB cache (negative means KB units)
         cur.close()
+        if immediate:
+            dbapi_con.isolation_level = None        # BEGIN يصدر من SQLAlchemy (الحدث أدناه)
+
+    if immediate:
+        # قفل الكتابة من أول المعاملة: كاتب عامل آخر ينتظر busy_timeout بدل
+        # "database is locked" عند ترقية قراءة إلى كتابة (قراءة-تعديل-كتابة)
+        @event.listens_for(eng, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return eng
 
 
-# Session factory for database interactions
+def sqlite_split(url: str):
+    """
+    SQLite engines for the single-writer mode: ``(read_engine, write_engine)``.
+
+    Readers open the file with ``mode=ro`` and ``query_only`` (WAL lets
+    them run alongside the writer); the write engine holds exactly one
+    connection, used by services/writer.py, and begins with BEGIN
+    IMMEDIATE so writers of other processes queue instead of failing on
+    a read-to-write upgrade. Returns ``(None, None)`` for
+    in-memory databases or when SQLITE_READ_POOL_SIZE is 0.
+    """
+    path = make_url(url).database
+    if not path or path == ":memory:" or settings.SQLITE_READ_POOL_SIZE <= 0:
+        return None, None
+    path = os.path.abspath(path)
+    size = min(settings.SQLITE_READ_POOL_SIZE, THREADPOOL_SIZE)
+    reader = _sqlite_engine(
+        f"sqlite:///file:{path}?mode=ro&uri=true",
+        read_only=True,
+        pool_size=size,
+        max_overflow=THREADPOOL_SIZE - size,
+    )
+    writer = _sqlite_engine(
+        url, immediate=True, pool_size=1, max_overflow=0, pool_timeout=settings.WRITE_WAIT_TIMEOUT
+    )
+    return reader, writer
+
+
+DATABASE_URL = normalize_url(settings.DATABASE_URL)
+is_sqlite = DATABASE_URL.startswith("sqlite")
+
+# Create the database engine
+engine = make_engine(DATABASE_URL)
+
+# SQLite: قراءات عامة على اتصالات للقراءة فقط، والكتابات الصغيرة عبر اتصال كاتب واحد
+read_engine, write_engine = sqlite_split(DATABASE_URL) if is_sqlite else (None, None)
+read_engine = read_engine or engine
+write_engine = write_engine or engine
+
+
+# Session factory for writes that do file work inside the transaction
+# (uploads, rotation, album jobs, trash); small writes go through services/writer.
+# على SQLite يبدأ بـ BEGIN IMMEDIATE: ينتظر الكاتب بدل "database is locked"
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
@@ -46,5 +159,30 @@ SessionLocal = sessionmaker(
     future=True,
 )
 
+# Public pages and other read-only routes
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    autocommit=False,
+    autoflush=False,
+    future=True,
+)
+
 # Base class for ORM models
 Base = declarative_base()
+
+
+def all_engines() -> list:
+    """Distinct engines of this process (for event hooks and dispose after fork)."""
+    return list({id(e): e for e in (engine, read_engine, write_engine)}.values())
+
+
+def init_schema(bind=None) -> None:
+    """
+    Create missing tables.
+
+    Runs once per deploy (gunicorn ``on_starting`` or migrate_schema.py)
+    rather than in every worker; dev keeps AUTO_CREATE_SCHEMA on.
+    """
+    from . import models  # noqa: F401  (registers the tables on Base)
+
+    Base.metadata.create_all(bind=bind or engine)
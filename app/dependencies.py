@@ -1,4 +1,8 @@
 # app/dependencies.py
+import secrets
+
+from fastapi import Request
+
 from .database import SessionLocal
 
 def get_db():
@@ -7,3 +11,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def visitor_id(request: Request) -> str:
+    """معرّف زائر مجهول ثابت داخل الجلسة (كوكي df_session)."""
+    vid = request.session.get("vid")
+    if not vid:
+        vid = secrets.token_urlsafe(12)
+        request.session["vid"] = vid
+    return vid
@@ -0,0 +1,179 @@
+# app/logs.py
+"""
+Structured logging.
+
+Records are formatted as one JSON object per line in the calling thread
+(so the request id and ``extra`` fields are captured), then pushed onto
+a queue; a single listener thread does the actual writes. Workers
+never block on stdout/file I/O.
+
+Also here: the request id context used by RequestLogMiddleware and the
+slow-query log fed by SQLAlchemy cursor events.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+sql_log = logging.getLogger("app.sql")
+
+# حالة الطلب الحالي (قاموس قابل للتعديل: يصل من خيوط threadpool)
+_request: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_request", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_sink: Optional[logging.Handler] = None
+_slow_query_ms = 0.0
+_log_params = False
+
+# حقول LogRecord القياسية؛ كل ما عداها جاء من extra=
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        req = _request.get()
+        if req is not None:
+            out["request_id"] = req["id"]
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info:
+            out["exc"] = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable single line for local development."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        req = _request.get()
+        rid = f" [{req['id'][:8]}]" if req is not None else ""
+        extras = " ".join(
+            f"{k}={v}" for k, v in record.__dict__.items() if k not in _STANDARD and not k.startswith("_")
+        )
+        line = f"{datetime.fromtimestamp(record.created):%H:%M:%S} {record.levelname:<7} {record.name}{rid}: {record.getMessage()}"
+        if extras:
+            line += f"  {extras}"
+        if record.exc_info:
+            line += "\n" + "".join(traceback.format_exception(*record.exc_info)).rstrip()
+        return line
+
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """Formats in the caller (context vars are visible there) and queues only the final line."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        line = self.format(record)
+        return logging.makeLogRecord({"msg": line, "levelno": record.levelno, "levelname": record.levelname})
+
+
+def configure(settings) -> None:
+    """Install the queue handler on the root logger once per process."""
+    global _listener, _sink, _slow_query_ms, _log_params
+    _slow_query_ms = float(settings.SLOW_QUERY_MS)
+    _log_params = bool(settings.LOG_SLOW_QUERY_PARAMS)
+    if _listener is not None:
+        return
+
+    if settings.LOG_FILE:
+        _sink = logging.handlers.WatchedFileHandler(settings.LOG_FILE, encoding="utf-8")
+    else:
+        _sink = logging.StreamHandler(sys.stdout)
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    _sink.setFormatter(logging.Formatter("%(message)s"))
+
+    handler = _PreformattedQueueHandler(queue.SimpleQueue())
+    handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    # سجلات uvicorn تمر بنفس الطابور بدل معالجاتها الخاصة
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error"):
+        logging.getLogger(name).handlers[:] = []
+        logging.getLogger(name).propagate = True
+
+    _listener = logging.handlers.QueueListener(handler.queue, _sink, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown)
+    # خيط المستمع لا ينجو من fork (gunicorn master يستورد الإعدادات قبل العمّال)
+    os.register_at_fork(after_in_child=_restart_listener)
+
+
+def _restart_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener = logging.handlers.QueueListener(_listener.queue, _sink, respect_handler_level=False)
+        _listener.start()
+
+
+def shutdown() -> None:
+    """Flush queued records (app shutdown / exit); later records are written directly."""
+    global _listener
+    if _listener is None:
+        return
+    formatter = logging.getLogger().handlers[0].formatter
+    _listener.stop()
+    _listener = None
+    _sink.setFormatter(formatter)
+    logging.getLogger().handlers[:] = [_sink]
+
+
+# ======================================================
+# Request context
+# ======================================================
+
+def begin_request(request_id: str) -> Dict[str, Any]:
+    state = {"id": request_id, "queries": 0, "db_ms": 0.0}
+    _request.set(state)
+    return state
+
+
+def request_id() -> Optional[str]:
+    req = _request.get()
+    return req["id"] if req is not None else None
+
+
+# ======================================================
+# Slow-query log
+# ======================================================
+
+def install_db(engine) -> None:
+    """Time every statement; count it for the request log and log it when over SLOW_QUERY_MS."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("log_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("log_start")
+        if not starts:
+            return
+        ms = (time.perf_counter() - starts.pop()) * 1000
+        req = _request.get()
+        if req is not None:
+            req["queries"] += 1
+            req["db_ms"] += ms
+        if _slow_query_ms and ms >= _slow_query_ms:
+            extra = {"duration_ms": round(ms, 2), "statement": " ".join(statement.split())[:2000]}
+            if _log_params:
+                extra["params"] = repr(parameters)[:1000]
+            sql_log.warning("slow query", extra=extra)
@@ -4,11 +4,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse
 
+import hmac
+import logging
 import mimetypes
+import time
+from urllib.parse import parse_qs
 
 from .config import settings
-from .database import engine, Base
+from .database import all_engines, init_schema
+from . import logs, metrics, profiling, static_assets, templating
+from .middleware import (
+    CompressionMiddleware, MetricsMiddleware, ProfilingMiddleware, RequestLogMiddleware, SignedMediaMiddleware
+)
+from .static_assets import PrecompressedStaticFiles
 from .routers import admin, public, likes
+from .services import trash, writer, likes as likes_service, unlock as unlock_service
 from .templating import templates
 
 
@@ -16,15 +26,24 @@ from .templating import templates
 mimetypes.add_type("image/avif", ".avif")
 mimetypes.add_type("image/webp", ".webp")
 
+log = logging.getLogger(__name__)
+
 
 class StaticFilesCached(StaticFiles):
-    """StaticFiles with cache-control headers for images, CSS, and JS."""
+    """
+    StaticFiles with cache-control headers for images, CSS, and JS.
+    Signed media (``?expires=``) is cached no longer than its link is valid.
+    """
 
-    def file_response(self, *args, **kwargs):
-        resp: FileResponse = super().file_response(*args, **kwargs)
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        resp: FileResponse = super().file_response(full_path, stat_result, scope, status_code)
         content_type = resp.headers.get("content-type", "")
         if content_type.startswith("image/"):
-            resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            max_age = 31536000
+            expires = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("expires")
+            if expires and expires[0].isdigit():
+                max_age = max(0, min(max_age, int(expires[0]) - int(time.time())))
+            resp.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
         elif content_type in ("text/css", "application/javascript"):
             resp.headers["Cache-Control"] = "public, max-age=86400"
         return resp
@@ -48,10 +67,22 @@ app.add_middleware(
 # Media + static mounts
 app.mount("/media", StaticFilesCached(directory=str(settings.STORAGE_DIR)), name="media")
 app.mount("/static/thumbs", StaticFilesCached(directory=str(settings.THUMBS_DIR)), name="thumbs")
-app.mount("/static", StaticFilesCached(directory="static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+
+# Create database tables if they don't exist (prod: once in gunicorn on_starting)
+if settings.AUTO_CREATE_SCHEMA:
+    init_schema()
 
-# Create database tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# ضغط HTML/JSON (الصفحات المخزّنة والملفات المضغوطة مسبقًا تمر كما هي)
+app.add_middleware(CompressionMiddleware)
+
+# Signed /media URLs (نفس فحص nginx secure_link عند غياب البروكسي)
+app.add_middleware(SignedMediaMiddleware)
+
+# تحليل أداء اختياري لكل طلب (داخل SessionMiddleware ليعرف المشرف)
+for _engine in all_engines():
+    profiling.install_db(_engine)
+app.add_middleware(ProfilingMiddleware)
 
 # Session middleware
 if settings.ENV == "prod":
@@ -73,12 +104,54 @@ else:
         https_only=False,
     )
 
+# Prometheus: الطبقة الخارجية لتقيس الزمن الكامل والبايتات الفعلية بعد الضغط
+if metrics.enabled():
+    for _engine in all_engines():
+        metrics.install_db(_engine)
+    app.add_middleware(MetricsMiddleware)
+
+# سجل الطلبات (JSON): الطبقة الأبعد لتشمل الزمن الكامل ومعرّف الطلب
+for _engine in all_engines():
+    logs.install_db(_engine)
+app.add_middleware(RequestLogMiddleware)
+
 # Routers
 app.include_router(admin.router)
 app.include_router(public.router)
 app.include_router(likes.router)
 
 
+def warm_up() -> None:
+    """
+    Build what each worker would otherwise load lazily on its first
+    requests. gunicorn calls it in the master when preload_app is on, so
+    the workers share these pages copy-on-write.
+    """
+    static_assets._manifest()
+    templating.precompile()
+    # المكتبات المؤجلة عن إقلاع العامل: في الـ master تُحمَّل مرة للجميع
+    import PIL.Image, PIL.ImageOps, slugify, zipstream  # noqa: F401, E401
+    from .services.variants import register_avif
+    from .utils import pwd_context
+
+    register_avif()
+    pwd_context()
+
+
+@app.on_event("startup")
+def _start_background_workers():
+    trash.start_sweeper()
+
+
+@app.on_event("shutdown")
+def _stop_background_workers():
+    trash.stop_sweeper()
+    likes_service.flush()
+    writer.flush()
+    unlock_service.shutdown()
+    logs.shutdown()
+
+
 # ====== Homepage ======
 @app.get("/", response_class=HTMLResponse)
 def home():
@@ -121,5 +194,19 @@ def health(request: Request):
     return JSONResponse({"ok": True}, headers=headers)
 
 
-print("[DB URL]", settings.DATABASE_URL)
-print("[ENV]", settings.ENV)
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(request: Request):
+    if not metrics.enabled():
+        return PlainTextResponse("metrics disabled", status_code=503)
+    token = settings.METRICS_TOKEN
+    if not token:
+        # خارج dev لا تُكشف أزمنة المسارات وذاكرة العمّال بلا توكن
+        if settings.ENV != "dev":
+            return PlainTextResponse("Not Found", status_code=404)
+    elif not hmac.compare_digest(request.headers.get("authorization") or "", f"Bearer {token}"):
+        return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type, headers={"Cache-Control": "no-store"})
+
+
+log.info("app ready", extra={"env": settings.ENV, "database": settings.DATABASE_URL.split("://", 1)[0]})
@@ -0,0 +1,227 @@
+# app/metrics.py
+"""
+Prometheus metrics served at ``/metrics``.
+
+Under gunicorn every worker keeps its own counters, so run it with
+``PROMETHEUS_MULTIPROC_DIR`` pointing to an empty directory (see
+gunicorn.conf.py): prometheus_client then writes the values to mmap
+files there and ``/metrics`` adds up all workers, whichever one
+answers the scrape.
+
+prometheus-client is optional: without it every helper here is a no-op
+and ``/metrics`` answers 503.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from . import profiling
+from .config import settings
+
+try:
+    import prometheus_client as prom
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - optional dependency
+    prom = None
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover
+    psutil = None
+
+MULTIPROC = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+drive_log = logging.getLogger("app.drive")
+
+# حالة الطلب الحالي؛ قاموس قابل للتعديل لأن الراوترات المتزامنة تعمل
+# في threadpool بنسخة من الـ context (التعديل يصل، الاستبدال لا)
+_request: ContextVar[Optional[Dict[str, Any]]] = ContextVar("metrics_request", default=None)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_RSS_INTERVAL = 10.0
+_rss_updated = 0.0
+
+if prom is not None:
+    REQUEST_SECONDS = prom.Histogram(
+        "http_request_duration_seconds",
+        "Request latency by route template.",
+        ["method", "route", "status"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    BYTES_SERVED = prom.Counter(
+        "http_response_bytes_total",
+        "Response body bytes by source (local, drive, cache, offload, app).",
+        ["source"],
+    )
+    DB_QUERIES = prom.Histogram(
+        "db_queries_per_request",
+        "SQL statements executed while handling one request.",
+        ["route"],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    )
+    ENCODE_SECONDS = prom.Histogram(
+        "variant_encode_seconds",
+        "Time to resize and encode one image variant.",
+        ["size", "format"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+    DRIVE_CALLS = prom.Counter(
+        "gdrive_calls_total",
+        "Google Drive API calls.",
+        ["op", "outcome"],
+    )
+    DRIVE_SECONDS = prom.Histogram(
+        "gdrive_call_seconds",
+        "Google Drive API latency (time to first chunk for downloads).",
+        ["op"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    WORKER_RSS = prom.Gauge(
+        "worker_resident_memory_bytes",
+        "Resident set size of each worker process.",
+        multiprocess_mode="all",
+    )
+
+
+def enabled() -> bool:
+    return prom is not None and settings.METRICS_ENABLED
+
+
+# ======================================================
+# Per-request state (filled by MetricsMiddleware)
+# ======================================================
+
+def begin_request() -> Dict[str, Any]:
+    state = {"queries": 0, "source": None, "bytes": None}
+    _request.set(state)
+    return state
+
+
+def set_source(source: str, nbytes: Optional[int] = None) -> None:
+    """
+    Label the bytes of the current response (``drive``, ``cache``, ...).
+    ``nbytes`` replaces the counted body size, e.g. for offloaded files
+    whose body the front server sends.
+    """
+    state = _request.get()
+    if state is not None:
+        state["source"] = source
+        if nbytes is not None:
+            state["bytes"] = nbytes
+
+
+def observe_request(method: str, route: str, status: int, seconds: float, body_bytes: int,
+                    state: Dict[str, Any]) -> None:
+    if not enabled():
+        return
+    REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+    DB_QUERIES.labels(route).observe(state["queries"])
+    nbytes = state["bytes"] if state["bytes"] is not None else body_bytes
+    if nbytes:
+        source = state["source"] or ("local" if route.startswith(("/media", "/static")) else "app")
+        BYTES_SERVED.labels(source).inc(nbytes)
+    update_rss()
+
+
+def update_rss(force: bool = False) -> None:
+    global _rss_updated
+    if not enabled() or psutil is None:
+        return
+    now = time.monotonic()
+    if force or now - _rss_updated >= _RSS_INTERVAL:
+        _rss_updated = now
+        WORKER_RSS.set(psutil.Process().memory_info().rss)
+
+
+# ======================================================
+# Instrumentation helpers
+# ======================================================
+
+def install_db(engine) -> None:
+    """Count SQL statements per request on this engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        state = _request.get()
+        if state is not None:
+            state["queries"] += 1
+
+
+def observe_encode(size: str, fmt: str, seconds: float) -> None:
+    profiling.record("encode", f"{size}.{fmt}", seconds)
+    if enabled():
+        ENCODE_SECONDS.labels(size, fmt).observe(seconds)
+
+
+def drive_call(op: str) -> Callable:
+    """
+    Decorator counting and timing a Drive call. For generator functions
+    (downloads) the latency is measured up to the first chunk.
+    """
+    def deco(fn: Callable) -> Callable:
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                first = True
+                try:
+                    for chunk in fn(*args, **kwargs):
+                        if first:
+                            _drive_done(op, "ok", time.perf_counter() - start)
+                            first = False
+                        yield chunk
+                except Exception:
+                    if first:
+                        _drive_done(op, "error", time.perf_counter() - start)
+                    raise
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = fn(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                _drive_done(op, outcome, time.perf_counter() - start)
+        return wrapper
+    return deco
+
+
+def _drive_done(op: str, outcome: str, seconds: float) -> None:
+    profiling.record("drive", f"{op} ({outcome})", seconds)
+    if seconds * 1000 >= settings.SLOW_DRIVE_MS:
+        drive_log.warning("slow drive call", extra={"op": op, "outcome": outcome, "duration_ms": round(seconds * 1000, 1)})
+    if enabled():
+        DRIVE_CALLS.labels(op, outcome).inc()
+        DRIVE_SECONDS.labels(op).observe(seconds)
+
+
+# ======================================================
+# Exposition
+# ======================================================
+
+def render() -> tuple[bytes, str]:
+    """Body and content type for /metrics, aggregated across workers in multiprocess mode."""
+    update_rss(force=True)
+    if MULTIPROC:
+        registry = prom.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prom.REGISTRY
+    return prom.generate_latest(registry), prom.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """gunicorn child_exit hook: drop the gauges of a dead worker."""
+    if prom is not None and MULTIPROC:
+        multiprocess.mark_process_dead(pid)
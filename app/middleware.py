@@ -0,0 +1,261 @@
+# app/middleware.py
+from __future__ import annotations
+
+import logging
+import re
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import logs, metrics, profiling
+from .config import settings
+from .services import signing
+from .services.compression import choose_encoding, compress, is_compressible
+
+
+class SignedMediaMiddleware:
+    """
+    Check ``md5``/``expires`` on /media requests before they reach the
+    static mount, with no DB access and no router.
+
+    It mirrors the nginx config that serves /media directly in
+    production, so the same URLs work with or without the proxy::
+
+        location /media/ {
+            secure_link $arg_md5,$arg_expires;
+            secure_link_md5 "$secure_link_expires$uri <MEDIA_SIGNING_SECRET>";
+            if ($secure_link = "")  { return 403; }
+            if ($secure_link = "0") { return 410; }
+            alias /path/to/storage/;
+        }
+
+    Unsigned requests pass through unless MEDIA_REQUIRE_SIGNATURE is set;
+    a present but wrong signature is always rejected, and originals
+    (``albums/<id>/original/``) always need a valid one: they are only
+    downloaded through the share routes.
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "/media/"):
+        self.app = app
+        self.prefix = prefix
+        self._original = re.compile(re.escape(prefix) + r"albums/[^/]+/original/")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.prefix):
+            qs = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            md5 = (qs.get("md5") or [None])[0]
+            expires = (qs.get("expires") or [None])[0]
+            required = settings.MEDIA_REQUIRE_SIGNATURE or self._original.match(scope["path"])
+            if md5 or expires or required:
+                status = signing.check_media_signature(scope["path"], md5, expires)
+                if status != 200:
+                    text = "Link expired" if status == 410 else "Forbidden"
+                    await PlainTextResponse(text, status_code=status)(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip for HTML, JSON and other text responses above
+    COMPRESS_MIN_SIZE.
+
+    Passed through untouched: responses that already carry
+    Content-Encoding (cached pages, precompressed static files),
+    non-text types (images, videos, archives) and streamed bodies
+    (downloads, ZIP/CSV exports), so nothing gets buffered in memory.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESS_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        passthrough = False
+
+        async def _send(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            data = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(data))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": data})
+
+        await self.app(scope, receive, _send)
+
+
+class MetricsMiddleware:
+    """
+    Latency per route template, response bytes and SQL statements per
+    request (see app/metrics.py).
+
+    Routes are labelled by their template (``/s/{slug}/thumb/{asset_id}``)
+    and mounts by their prefix (``/media``) so labels stay bounded;
+    unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not metrics.enabled() or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        state = metrics.begin_request()
+        start = time.perf_counter()
+        status = 500
+        body_bytes = 0
+
+        async def _send(message: Message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            metrics.observe_request(
+                scope["method"], self._route(scope), status, time.perf_counter() - start, body_bytes, state
+            )
+
+    @staticmethod
+    def _route(scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            return route.path
+        app_root = scope.get("app_root_path")
+        if app_root is not None and scope.get("root_path", "") != app_root:
+            return scope["root_path"][len(app_root):]   # Mount (/media, /static, ...)
+        return "<unmatched>"
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiling (see app/profiling.py): ``X-Profile: 1`` from
+    an admin session, or PROFILE_SAMPLE_RATE. Must sit inside
+    SessionMiddleware to see the session.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not profiling.should_profile(Headers(scope=scope), scope.get("session")):
+            await self.app(scope, receive, send)
+            return
+
+        prof = profiling.begin(scope["method"], scope["path"])
+
+        async def _send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # الرد جاهز: الأزمنة حتى الآن تغطي المعالج والقالب
+                prof.duration = time.perf_counter() - prof.started
+                headers = MutableHeaders(raw=message["headers"])
+                headers["Server-Timing"] = prof.server_timing()
+                headers["X-Profile-Id"] = prof.id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            prof.route = getattr(route, "path", None) or scope["path"]
+            profiling.finish(prof)
+            profiling.maybe_dump(prof)
+
+
+class RequestLogMiddleware:
+    """
+    One structured log line per request (see app/logs.py) with status,
+    duration, response bytes and SQL count/time. Reuses a sane incoming
+    ``X-Request-ID`` (from nginx) or generates one, and echoes it back so
+    a visitor's report can be matched to the log.
+    """
+
+    SKIP = {"/healthz", "/metrics"}
+    _valid_id = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.log = logging.getLogger("app.request")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get("x-request-id", "")
+        rid = incoming if self._valid_id.fullmatch(incoming) else uuid.uuid4().hex
+        state = logs.begin_request(rid)
+        start = time.perf_counter()
+        status = 500
+        body_bytes = 0
+
+        async def _send(message: Message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(raw=message["headers"])["X-Request-ID"] = rid
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            if settings.LOG_REQUESTS and scope["path"] not in self.SKIP:
+                client = scope.get("client")
+                self.log.log(
+                    logging.WARNING if ms >= settings.SLOW_REQUEST_MS else logging.INFO,
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": MetricsMiddleware._route(scope),
+                        "status": status,
+                        "duration_ms": round(ms, 1),
+                        "bytes": body_bytes,
+                        "queries": state["queries"],
+                        "db_ms": round(state["db_ms"], 1),
+                        "client": client[0] if client else None,
+                    },
+                )
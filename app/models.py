@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import BigInteger, Column, Float, Integer, LargeBinary, String, DateTime, ForeignKey, Boolean, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -23,10 +23,17 @@ class Album(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    # Set once the album was moved to cold storage (tarball or Drive only)
+    archived_at = Column(DateTime, nullable=True)
+
+    # Cover renditions (JSON manifest from services/covers.py), regenerated on set_cover
+    cover_renditions = Column(Text, nullable=True)
+
     # Cover image: Explicit FK to assets.id
     cover_asset_id = Column(
         Integer,
-        ForeignKey("assets.id", ondelete="SET NULL"),
+        # use_alter: دورة albums <-> assets؛ PostgreSQL يضيف القيد بعد إنشاء الجدولين
+        ForeignKey("assets.id", ondelete="SET NULL", use_alter=True, name="fk_albums_cover_asset_id"),
         nullable=True,
         index=True,
     )
@@ -100,10 +107,21 @@ class Asset(Base):
     mime_type = Column(String(128), nullable=True)
     size = Column(Integer, nullable=True)
 
-    # Dimensions + LQIP
+    # Dimensions + placeholder
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
-    lqip = Column(Text, nullable=True)
+    lqip = Column(Text, nullable=True)  # قديم: data URI بصيغة JPEG (لم يعد يُولَّد)
+    thumbhash = Column(String(48), nullable=True)  # ThumbHash بصيغة base64 (~32 حرفًا)
+
+    # نقطة التركيز (0..1 من اليسار/الأعلى) لقصّ الغلاف؛ None = المنتصف
+    focal_x = Column(Float, nullable=True)
+    focal_y = Column(Float, nullable=True)
+
+    # تدوير إضافي فوق اتجاه EXIF للأصل (0/90/180/270 مع عقارب الساعة).
+    # يُستخدم فقط حين لا يمكن تعديل وسم Orientation داخل الملف نفسه.
+    orientation = Column(Integer, nullable=False, default=0, server_default="0")
+    # يزيد مع كل تدوير: جزء من روابط المشتقات (v=) فلا تبقى نسخة immutable قديمة في المتصفح/CDN
+    media_rev = Column(Integer, nullable=False, default=0, server_default="0")
 
     # JPG variants
     jpg_480 = Column(String(255), nullable=True)
@@ -129,6 +147,9 @@ class Asset(Base):
 
     is_hidden = Column(Boolean, default=False)
 
+    # عدّاد مُجمّع يُحدَّث في نفس معاملة جدول asset_likes
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     created_at = Column(DateTime, server_default=func.now(), index=True)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), index=True)
 
@@ -156,6 +177,10 @@ class Video(Base):
     description = Column(Text, nullable=True)
     is_hidden = Column(Boolean, default=False)
 
+    # صورة الغلاف من المزوّد محفوظة محليًا (services/video_posters.py)
+    poster_path = Column(String, nullable=True)
+    poster_fetched_at = Column(DateTime, nullable=True)
+
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -163,14 +188,61 @@ class Video(Base):
 
 
 class Like(Base):
-    """Represents a user's like on an image, optionally linked to a user ID."""
+    """A visitor's like on an asset: at most one row per (asset, visitor)."""
 
-    __tablename__ = "likes"
+    __tablename__ = "asset_likes"
 
-    id = Column(Integer, primary_key=True, index=True)
-    url = Column(String, index=True)  # Image URL
-    user_id = Column(Integer, nullable=True)  # Optional user link
-    liked = Column(Boolean, default=True)
+    asset_id = Column(Integer, ForeignKey("assets.id", ondelete="CASCADE"), primary_key=True)
+    visitor_id = Column(String(64), primary_key=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class Selection(Base):
+    """A visitor's proofing selection for one share link, stored as a packed sorted id array."""
+
+    __tablename__ = "selections"
+
+    share_id = Column(Integer, ForeignKey("share_links.id", ondelete="CASCADE"), primary_key=True)
+    visitor_id = Column(String(64), primary_key=True)
+
+    # uint32 little-endian مرتبة تصاعديًا (4 بايت لكل صورة)
+    asset_ids = Column(LargeBinary, nullable=False, default=b"")
+    count = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class TrashItem(Base):
+    """A file queued for deletion by the trash sweeper (local path or Drive file id)."""
+
+    __tablename__ = "trash_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(16), nullable=False)        # local | gdrive
+    target = Column(String(1024), nullable=False)    # مسار نسبي لـ STORAGE_DIR أو Drive file id
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, server_default=func.now(), index=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class AlbumJob(Base):
+    """A background album-level job (delete or archive) with progress reporting."""
+
+    __tablename__ = "album_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # بدون FK: السجل يبقى بعد حذف الألبوم لعرض النتيجة
+    album_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String(32), nullable=False)                # delete | archive_tar | archive_drive
+    status = Column(String(16), nullable=False, default="queued")  # queued | running | done | failed
+    files = Column(Integer, nullable=False, default=0)
+    freed_bytes = Column(BigInteger, nullable=False, default=0)
+    archive_path = Column(String(1024), nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,214 @@
+# app/profiling.py
+"""
+Opt-in per-request profiling.
+
+A request is profiled when an admin session sends ``X-Profile: 1`` or
+when it falls into PROFILE_SAMPLE_RATE. While it runs we record:
+
+* spans: every SQL statement (SQLAlchemy cursor events), template
+  renders, Drive calls and Pillow variant encodes, with durations;
+* stack samples of the threads that did work for the request, taken by
+  a helper thread every PROFILE_INTERVAL_MS.
+
+The response gets a ``Server-Timing`` header with the breakdown. The
+slowest PROFILE_KEEP requests of each worker are also written to
+PROFILE_DIR as ``<ms>-<id>.json`` (spans) and ``<ms>-<id>.collapsed``
+(folded stacks, opens in speedscope or flamegraph.pl).
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+
+HEADER = "x-profile"
+KINDS = ("sql", "template", "drive", "encode")
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+
+_slowest: List[Tuple[float, str]] = []     # min-heap (ms, stem) لأبطأ الطلبات المحفوظة
+_slowest_lock = threading.Lock()
+
+
+class Profile:
+    """Spans and stack samples of one request."""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route = path
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[dict] = []
+        self.threads: set[int] = {threading.get_ident()}
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # ---- spans ----
+    def add(self, kind: str, name: str, seconds: float) -> None:
+        self.threads.add(threading.get_ident())
+        self.spans.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": round((time.perf_counter() - self.started - seconds) * 1000, 3),
+            "ms": round(seconds * 1000, 3),
+        })
+
+    def totals(self) -> Dict[str, Tuple[int, float]]:
+        out: Dict[str, Tuple[int, float]] = {}
+        for s in self.spans:
+            n, ms = out.get(s["kind"], (0, 0.0))
+            out[s["kind"]] = (n + 1, ms + s["ms"])
+        return out
+
+    # ---- stack sampling ----
+    def start_sampling(self, interval: float) -> None:
+        self._sampler = threading.Thread(target=self._sample, args=(interval,), name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+
+    def _sample(self, interval: float) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            for tid in list(self.threads):
+                frame = frames.get(tid)
+                if frame is None or tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    # ---- output ----
+    def server_timing(self) -> str:
+        parts = [f"total;dur={self.duration * 1000:.1f}"]
+        for kind, (n, ms) in self.totals().items():
+            parts.append(f'{kind};dur={ms:.1f};desc="{n}"')
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "ms": round(self.duration * 1000, 3),
+            "totals": {k: {"count": n, "ms": round(ms, 3)} for k, (n, ms) in self.totals().items()},
+            "spans": self.spans,
+            "samples": sum(self.stacks.values()),
+        }
+
+
+# ======================================================
+# Recording (no-ops when the current request is not profiled)
+# ======================================================
+
+def current() -> Optional[Profile]:
+    return _current.get()
+
+
+def record(kind: str, name: str, seconds: float) -> None:
+    prof = _current.get()
+    if prof is not None:
+        prof.add(kind, name, seconds)
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[None]:
+    prof = _current.get()
+    if prof is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add(kind, name, time.perf_counter() - start)
+
+
+def install_db(engine) -> None:
+    """Time every SQL statement of profiled requests."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        prof = _current.get()
+        starts = conn.info.get("profile_start")
+        if prof is not None and starts:
+            prof.add("sql", " ".join(statement.split())[:300], time.perf_counter() - starts.pop())
+
+
+# ======================================================
+# Request lifecycle (used by ProfilingMiddleware)
+# ======================================================
+
+def should_profile(headers, session: Optional[dict]) -> bool:
+    if headers.get(HEADER) == "1" and session and session.get("admin"):
+        return True
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def begin(method: str, path: str) -> Profile:
+    prof = Profile(method, path)
+    _current.set(prof)
+    if settings.PROFILE_INTERVAL_MS > 0:
+        prof.start_sampling(settings.PROFILE_INTERVAL_MS / 1000)
+    return prof
+
+
+def finish(prof: Profile) -> None:
+    prof.duration = time.perf_counter() - prof.started
+    prof.stop_sampling()
+    _current.set(None)
+
+
+def maybe_dump(prof: Profile) -> Optional[Path]:
+    """Write the profile if it is among the PROFILE_KEEP slowest seen by this worker."""
+    keep = settings.PROFILE_KEEP
+    if keep <= 0:
+        return None
+    ms = prof.duration * 1000
+    stem = f"{ms:09.1f}-{prof.id}"
+    with _slowest_lock:
+        if len(_slowest) >= keep and ms <= _slowest[0][0]:
+            return None
+        evicted = heapq.heappushpop(_slowest, (ms, stem)) if len(_slowest) >= keep else None
+        if evicted is None:
+            heapq.heappush(_slowest, (ms, stem))
+
+    out = Path(settings.PROFILE_DIR)
+    out.mkdir(parents=True, exist_ok=True)
+    (out / f"{stem}.json").write_text(json.dumps(prof.to_dict(), ensure_ascii=False, indent=1), encoding="utf-8")
+    (out / f"{stem}.collapsed").write_text(
+        "".join(f"{stack} {n}\n" for stack, n in prof.stacks.most_common()), encoding="utf-8"
+    )
+    if evicted is not None:
+        for ext in ("json", "collapsed"):
+            (out / f"{evicted[1]}.{ext}").unlink(missing_ok=True)
+    return out / f"{stem}.json"
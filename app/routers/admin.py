@@ -1,28 +1,28 @@
 from fastapi import (
-    APIRouter, Depends, Request, UploadFile, File, Form,
+    APIRouter, BackgroundTasks, Depends, Request, UploadFile, File, Form,
     HTTPException, Response
 )
 from fastapi.responses import (
-    HTMLResponse, RedirectResponse, StreamingResponse, FileResponse
+    HTMLResponse, RedirectResponse, StreamingResponse
 )
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
-from slugify import slugify
 from pathlib import Path
-import json, shutil
+import json, logging, shutil
 from pydantic import BaseModel
 
 from ..templating import templates
-from ..database import SessionLocal
+from ..database import ReadSessionLocal, SessionLocal
 from .. import models
 from ..config import settings
 from ..utils import gen_slug, hash_password, safe_filename
-from ..services import thumbs, gdrive
-from ..services.variants import make_variants
-from PIL import Image, ImageOps
+from ..services import delivery, gdrive, exif, trash, album_jobs, likes, selections, share_cache, covers, video_posters, writer
+from ..services.variants import make_variants, rotate_variants, variant_paths
 from app.utils import _parse_dt
 
+log = logging.getLogger(__name__)
+
 # helpers لاستخراج الـID من روابط يوتيوب/فيميو/كلودفلير
 import re
 from urllib.parse import urlparse, parse_qs
@@ -145,29 +145,122 @@ class ThemePayload(BaseModel):
     disableDark: bool = False
 
 
+# ===========================
+# Batch asset operations
+# ===========================
+BatchOpName = Literal["hide", "unhide", "delete", "rotate", "reorder", "cover"]
+
+class BatchOp(BaseModel):
+    op: BatchOpName
+    asset_id: Optional[int] = None          # كل العمليات ما عدا reorder (و cover=None للإلغاء)
+    dir: Literal["cw", "ccw"] = "cw"        # rotate
+    asset_ids: list[int] = []               # reorder: الترتيب الجديد
+
+class BatchPayload(BaseModel):
+    ops: list[BatchOp]
+
+
 def _variant_paths(album_id: int, stem: str) -> list[Path]:
+    return variant_paths(Path(settings.STORAGE_DIR), album_id, stem)
+
+
+def _rotate_asset_files(asset: models.Asset, clockwise: bool) -> None:
+    """
+    تدوير بدون فقدان: لا يُعاد ترميز الأصل.
+
+    - JPEG يحمل وسم Orientation: نعدّل قيمة الوسم فقط داخل الملف.
+    - غير ذلك: نخزّن التدوير في asset.orientation.
+    ثم تُولَّد المشتقات من الأصل من جديد (تدوير مشتق JPEG يُفقده جودة في كل مرة)،
+    ويزيد media_rev ليتغيّر رابطها رغم أن الأسماء نفسها.
+    """
     base = Path(settings.STORAGE_DIR)
-    rels = [
-        f"albums/{album_id}/thumb/400/{stem}.jpg",
-        f"albums/{album_id}/thumb/400/{stem}.webp",
-        f"albums/{album_id}/disp/1600/{stem}.jpg",
-        f"albums/{album_id}/disp/1600/{stem}.webp",
-        f"albums/{album_id}/big/2048/{stem}.jpg",
-        f"albums/{album_id}/big/2048/{stem}.webp",
-    ]
-    return [base / r for r in rels]
+    f_rel = Path(str(asset.filename).replace("\\", "/"))
+    orig = base / f_rel
+    stem = f_rel.stem
+    degrees = 90 if clockwise else 270
+
+    if exif.rotate_orientation(orig, clockwise=clockwise) is None:
+        asset.orientation = ((asset.orientation or 0) + degrees) % 360
+
+    if orig.exists():
+        variants = make_variants(
+            original_path=orig,
+            out_root=base,
+            album_id=asset.album_id,
+            filename_stem=stem,
+            rotate=asset.orientation or 0,
+        )
+    else:
+        # الأصل على Drive فقط: لا مصدر غير المشتقات
+        variants = rotate_variants(base, asset.album_id, stem, degrees)
+    asset.media_rev = (asset.media_rev or 0) + 1
+
+    if asset.width and asset.height:
+        asset.width, asset.height = asset.height, asset.width
+
+    if variants:
+        asset.thumbhash = variants.get("thumbhash")
+    asset.lqip = None
+
+
+def _asset_file_paths(asset: models.Asset) -> list[Path]:
+    """الأصل + كل المشتقات المحلية لأصل واحد."""
+    base = Path(settings.STORAGE_DIR)
+    f_rel = Path(str(asset.filename).replace("\\", "/"))
+    return (
+        _variant_paths(asset.album_id, f_rel.stem)
+        + covers.rendition_paths(asset.album_id, f_rel.stem)
+        + [base / f_rel]
+    )
+
+
+def _asset_gdrive_ids(asset: models.Asset) -> list[str]:
+    return [x for x in (asset.gdrive_file_id, asset.gdrive_thumb_id) if x]
+
+
+def _rotate_assets_job(items: list[tuple[int, bool]]) -> None:
+    """عمل خلفي: تدوير ملفات عدة أصول بجلسة DB مستقلة عن الطلب."""
+    db = SessionLocal()
+    try:
+        for asset_id, clockwise in items:
+            asset = db.get(models.Asset, asset_id)
+            if asset is None:
+                continue
+            try:
+                _rotate_asset_files(asset, clockwise=clockwise)
+                db.commit()
+            except Exception:
+                db.rollback()
+                log.exception("batch rotate failed", extra={"asset_id": asset_id})
+                continue
+            if asset.album and asset.album.cover_asset_id == asset.id:
+                covers.generate_job(asset.album_id)
+    finally:
+        db.close()
 
 
 # ================
 # Helpers
 # ================
 def get_db():
+    """
+    جلسة كتابة للمسارات التي تعمل على الملفات داخل المعاملة (الرفع، التدوير،
+    مهام الألبوم). التعديلات الصغيرة تمر عبر services/writer بدلًا منها.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def get_read_db():
+    """صفحات المشرف وفحوص ما قبل الكتابة (اتصالات القراءة فقط في SQLite)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def is_admin(request: Request) -> bool:
     return bool(request.session.get("admin"))
 
@@ -239,23 +332,27 @@ def create_album(
     photographer: Optional[str] = Form(None),
     photographer_url: Optional[str] = Form(None),
     event_date: Optional[str] = Form(None),
-    db: Session = Depends(get_db),
 ):
     require_admin(request)
-    album = models.Album(
-        title=title.strip(),
-        photographer=photographer or None,
-        photographer_url=photographer_url or None,
-        event_date=_parse_dt(event_date),
-    )
-    db.add(album)
-    db.commit()
-    db.refresh(album)
-    dest = request.url_for("view_album", album_id=album.id)
+    event_dt = _parse_dt(event_date)
+
+    def _create(w: Session) -> int:
+        album = models.Album(
+            title=title.strip(),
+            photographer=photographer or None,
+            photographer_url=photographer_url or None,
+            event_date=event_dt,
+        )
+        w.add(album)
+        w.flush()
+        return album.id
+
+    album_id = writer.run(_create)
+    dest = request.url_for("view_album", album_id=album_id)
     return RedirectResponse(url=dest, status_code=302)
 
 @router.get("/albums/{album_id}", response_class=HTMLResponse)
-def view_album(request: Request, album_id: int, db: Session = Depends(get_db)):
+def view_album(request: Request, album_id: int, db: Session = Depends(get_read_db)):
     require_admin(request)
     album = db.get(models.Album, album_id)
     if not album:
@@ -275,7 +372,7 @@ def view_album(request: Request, album_id: int, db: Session = Depends(get_db)):
 
 @router.get("/albums", response_class=HTMLResponse)
 @router.get("/albums/", response_class=HTMLResponse, include_in_schema=False)
-def list_albums(request: Request, db: Session = Depends(get_db)):
+def list_albums(request: Request, db: Session = Depends(get_read_db)):
     require_admin(request)
     albums = db.query(models.Album).order_by(models.Album.created_at.desc()).all()
     return templates.TemplateResponse(
@@ -319,8 +416,8 @@ async def upload_files(
                 d_disp1600 = gdrive.ensure_subfolder(service, d_disp, "1600")
                 d_big      = gdrive.ensure_subfolder(service, d_album, "big")
                 d_big2048  = gdrive.ensure_subfolder(service, d_big, "2048")
-        except Exception as e:
-            print("[gdrive] init failed:", e)
+        except Exception:
+            log.exception("gdrive folder init failed", extra={"album_id": album.id})
             service = None
 
     saved_assets = []
@@ -350,20 +447,14 @@ async def upload_files(
             filename_stem=stem,
         )
 
-        try:
-            lqip = thumbs.tiny_placeholder_base64(original_path)
-        except Exception:
-            lqip = None
-
         gfile_id = gthumb_id = None
         if service and d_album:
             try:
-                with open(original_path, "rb") as fp:
-                    gfile_id = gdrive.upload_bytes(
-                        service, d_orig, filename,
-                        file.content_type or "application/octet-stream",
-                        fp.read(),
-                    )
+                gfile_id = gdrive.upload_file(
+                    service, d_orig, original_path,
+                    file.content_type or "application/octet-stream",
+                    filename=filename,
+                )
 
                 def _up(rel: str, folder_id: str):
                     p = STORAGE_ROOT / rel
@@ -381,8 +472,8 @@ async def upload_files(
                 _up(variants["disp_webp"], d_disp1600)
                 _up(variants["big_jpg"], d_big2048)
                 _up(variants["big_webp"], d_big2048)
-            except Exception as e:
-                print("[gdrive] upload failed:", e)
+            except Exception:
+                log.exception("gdrive upload failed", extra={"album_id": album.id, "file": filename})
 
         filename_rel = (Path("albums") / str(album.id) / "original" / filename).as_posix()
         asset = models.Asset(
@@ -400,7 +491,7 @@ async def upload_files(
             asset.set_variants(variants)
         except Exception:
             pass
-        asset.lqip = lqip
+        asset.thumbhash = variants.get("thumbhash")
 
         db.add(asset)
         saved_assets.append(asset)
@@ -414,7 +505,7 @@ async def upload_files(
 
 # ---- Thumbs ----
 @router.get("/thumb/{asset_id}")
-def admin_thumb(asset_id: int, db: Session = Depends(get_db)):
+def admin_thumb(asset_id: int, db: Session = Depends(get_read_db)):
     asset = db.get(models.Asset, asset_id)
     if not asset:
         raise HTTPException(404)
@@ -432,9 +523,9 @@ def admin_thumb(asset_id: int, db: Session = Depends(get_db)):
     webp = thumb_dir / f"{stem}.webp"
 
     if jpg.exists():
-        return FileResponse(jpg, media_type="image/jpeg")
+        return delivery.file_response(jpg, media_type="image/jpeg")
     if webp.exists():
-        return FileResponse(webp, media_type="image/webp")
+        return delivery.file_response(webp, media_type="image/webp")
 
     svg = ('<svg xmlns="http://www.w3.org/2000/svg" width="400" height="260">'
            '<rect width="100%" height="100%" fill="#e2e8f0"/>'
@@ -468,13 +559,8 @@ def create_share(
     expires_at: Optional[str] = Form(None),
     password: Optional[str] = Form(None),
     allow_zip: Optional[bool] = Form(True),
-    db: Session = Depends(get_db),
 ):
     require_admin(request)
-    album = db.get(models.Album, album_id)
-    if not album:
-        raise HTTPException(404, "Album not found")
-
     exp = None
     if expires_at:
         try:
@@ -482,32 +568,46 @@ def create_share(
         except Exception:
             exp = None
 
-    slug = slugify(album.title)[:20] + "-" + gen_slug(4)
+    from slugify import slugify  # lazy: text_unidecode ثقيل عند الإقلاع
+
+    # التجزئة بطيئة عمدًا: تُحسب هنا لا في خيط الكاتب
     pwd_hash = hash_password(password) if password else None
 
-    sl = models.ShareLink(
-        album_id=album.id,
-        slug=slug,
-        expires_at=exp,
-        password_hash=pwd_hash,
-        allow_zip=bool(allow_zip),
-    )
-    db.add(sl)
-    db.commit()
-    db.refresh(sl)
-    return RedirectResponse(url=f"/s/{sl.slug}", status_code=302)
+    def _create(w: Session) -> Optional[str]:
+        album = w.get(models.Album, album_id)
+        if not album:
+            return None
+        sl = models.ShareLink(
+            album_id=album.id,
+            slug=slugify(album.title)[:20] + "-" + gen_slug(4),
+            expires_at=exp,
+            password_hash=pwd_hash,
+            allow_zip=bool(allow_zip),
+        )
+        w.add(sl)
+        return sl.slug
+
+    slug = writer.run(_create)
+    if slug is None:
+        raise HTTPException(404, "Album not found")
+    return RedirectResponse(url=f"/s/{slug}", status_code=302)
 
 @router.get("/albums/{album_id}/share", include_in_schema=False)
 def create_share_get(album_id: int):
     return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=302)
 
 # ---- Asset ops ----
+def _apply_sort_order(db: Session, order: dict[int, int]) -> None:
+    """sort_order لكل أصل (تعمل داخل services/writer)؛ لا يُكتب إلا ما تغيّر."""
+    for a in db.query(models.Asset).filter(models.Asset.id.in_(order)):
+        a.sort_order = order[a.id]
+
 @router.post("/assets/{asset_id}/move")
 def move_asset(
     request: Request,
     asset_id: int,
     direction: str = Form(...),  # up/down/top/bottom
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     require_admin(request)
     asset = db.get(models.Asset, asset_id)
@@ -534,9 +634,8 @@ def move_asset(
     if new_idx != idx:
         item = assets.pop(idx)
         assets.insert(new_idx, item)
-        for i, it in enumerate(assets):
-            it.sort_order = i * 10
-        db.commit()
+        order = {it.id: i * 10 for i, it in enumerate(assets)}
+        writer.run(lambda w: _apply_sort_order(w, order))
 
     return RedirectResponse(url=f"/admin/albums/{album.id}", status_code=303)
 
@@ -544,6 +643,7 @@ def move_asset(
 def rotate_asset(
     request: Request,
     asset_id: int,
+    background_tasks: BackgroundTasks,
     dir: str = Form(...),  # 'cw' أو 'ccw'
     db: Session = Depends(get_db),
 ):
@@ -558,121 +658,376 @@ def rotate_asset(
     if not orig.exists():
         raise HTTPException(404, "Original file not found")
 
-    stem = f_rel.stem
-    for p in _variant_paths(asset.album_id, stem):
-        try:
-            if p.exists():
-                p.unlink()
-        except Exception:
-            pass
-
-    with Image.open(orig) as im:
-        im = ImageOps.exif_transpose(im)
-        angle = -90 if dir == "cw" else 90
-        im = im.rotate(angle, expand=True)
-        ext = orig.suffix.lower()
-        if ext in [".jpg", ".jpeg", ".png", ".webp"]:
-            im.save(orig)
-        else:
-            im.convert("RGB").save(orig.with_suffix(".jpg"), format="JPEG", quality=90, optimize=True)
-            try:
-                orig.unlink()
-            except Exception:
-                pass
-            new_rel = (Path("albums") / str(asset.album_id) / "original" / f"{stem}.jpg").as_posix()
-            asset.filename = new_rel
-            orig = base / new_rel
-
-    variants = make_variants(
-        original_path=orig,
-        out_root=base,
-        album_id=asset.album_id,
-        filename_stem=Path(asset.filename).stem,
-    )
-    try:
-        asset.set_variants(variants)
-    except Exception:
-        pass
-    try:
-        asset.lqip = thumbs.tiny_placeholder_base64(orig)
-    except Exception:
-        asset.lqip = None
+    _rotate_asset_files(asset, clockwise=(dir == "cw"))
 
     db.commit()
+    if asset.album and asset.album.cover_asset_id == asset.id:
+        background_tasks.add_task(covers.generate_job, asset.album_id)
     return RedirectResponse(url=f"/admin/albums/{asset.album_id}", status_code=303)
 
-@router.post("/assets/{asset_id}/delete")
-def delete_asset(request: Request, asset_id: int, db: Session = Depends(get_db)):
+@router.post("/assets/{asset_id}/focal")
+def set_focal_point(
+    request: Request,
+    asset_id: int,
+    background_tasks: BackgroundTasks,
+    x: float = Form(...),  # 0..1 من اليسار
+    y: float = Form(...),  # 0..1 من الأعلى
+):
+    """نقطة التركيز لقصّ الغلاف؛ يعاد توليد قصّات الغلاف إن كان الأصل هو الغلاف."""
     require_admin(request)
-    asset = db.get(models.Asset, asset_id)
-    if not asset:
+    fx, fy = min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+
+    def _set(w: Session) -> Optional[tuple[int, bool]]:
+        asset = w.get(models.Asset, asset_id)
+        if not asset:
+            return None
+        asset.focal_x, asset.focal_y = fx, fy
+        return asset.album_id, bool(asset.album and asset.album.cover_asset_id == asset.id)
+
+    res = writer.run(_set)
+    if res is None:
         raise HTTPException(404)
-    album = db.get(models.Album, asset.album_id)
+    album_id, is_cover = res
+    if is_cover:
+        background_tasks.add_task(covers.generate_job, album_id)
+    return {"ok": True, "x": fx, "y": fy}
 
-    base = Path(settings.STORAGE_DIR)
-    f_rel = Path(str(asset.filename).replace("\\", "/"))
-    orig = base / f_rel
-    stem = f_rel.stem
+@router.post("/assets/{asset_id}/delete")
+def delete_asset(request: Request, asset_id: int, background_tasks: BackgroundTasks):
+    require_admin(request)
 
-    for p in _variant_paths(album.id, stem):
-        try:
-            if p.exists():
-                p.unlink()
-        except Exception:
-            pass
+    def _delete(w: Session) -> Optional[tuple[int, bool]]:
+        asset = w.get(models.Asset, asset_id)
+        if not asset:
+            return None
+        album = w.get(models.Album, asset.album_id)
 
-    try:
-        if orig.exists():
-            orig.unlink()
-    except Exception:
-        pass
+        # الملفات تُحذف لاحقًا بواسطة كانس سلة المحذوفات (services/trash.py)
+        trash.enqueue(w, _asset_file_paths(asset), _asset_gdrive_ids(asset))
+        likes.delete_for_assets(w, [asset.id])
 
-    if getattr(album, "cover_asset_id", None) == asset.id:
-        album.cover_asset_id = None
+        cover_changed = getattr(album, "cover_asset_id", None) == asset.id
+        if cover_changed:
+            album.cover_asset_id = None
 
-    if getattr(settings, "USE_GDRIVE", False):
-        try:
-            if getattr(asset, "gdrive_file_id", None):
-                gdrive.delete_file(asset.gdrive_file_id)
-            if getattr(asset, "gdrive_thumb_id", None):
-                gdrive.delete_file(asset.gdrive_thumb_id)
-        except Exception as e:
-            print("[gdrive] delete failed:", e)
-
-    db.delete(asset)
-    db.commit()
-    return RedirectResponse(url=f"/admin/albums/{album.id}", status_code=303)
+        w.delete(asset)
+        return album.id, cover_changed
 
-@router.post("/albums/{album_id}/cover/{asset_id}")
-def set_cover(request: Request, album_id: int, asset_id: int, db: Session = Depends(get_db)):
-    require_admin(request)
+    res = writer.run(_delete)
+    if res is None:
+        raise HTTPException(404)
+    album_id, cover_changed = res
+    if cover_changed:
+        background_tasks.add_task(covers.generate_job, album_id)
+    return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
+
+def _apply_batch(db: Session, album_id: int, ops: list) -> Optional[tuple[list[dict], list[tuple[int, bool]], bool]]:
+    """عمليات الدفعة على جلسة الكاتب: (النتائج، ما يُدوَّر، تغيّر الغلاف)، أو None إن لم يوجد الألبوم."""
     album = db.get(models.Album, album_id)
-    asset = db.get(models.Asset, asset_id)
-    if not album or not asset or asset.album_id != album.id:
+    if not album:
+        return None
+
+    by_id = {a.id: a for a in album.assets}
+    deleted: set[int] = set()
+    results: list[dict] = []
+    to_rotate: list[tuple[int, bool]] = []
+    cover_changed = False
+
+    for i, item in enumerate(ops):
+        res = {"index": i, "op": item.op, "asset_id": item.asset_id, "ok": True}
+        results.append(res)
+
+        if item.op == "reorder":
+            unknown = [x for x in item.asset_ids if x not in by_id or x in deleted]
+            if unknown or not item.asset_ids:
+                res.update(ok=False, error=f"Unknown assets: {unknown}" if unknown else "asset_ids is required")
+                continue
+            wanted = list(dict.fromkeys(item.asset_ids))
+            rest = [
+                a.id for a in sorted(by_id.values(), key=lambda a: ((a.sort_order or 0), a.id))
+                if a.id not in deleted and a.id not in wanted
+            ]
+            for pos, aid in enumerate(wanted + rest):
+                by_id[aid].sort_order = pos * 10
+            continue
+
+        if item.op == "cover" and item.asset_id is None:
+            album.cover_asset_id = None
+            cover_changed = True
+            continue
+
+        asset = by_id.get(item.asset_id) if item.asset_id not in deleted else None
+        if asset is None:
+            res.update(ok=False, error="Asset not found in album")
+            continue
+
+        if item.op in ("hide", "unhide"):
+            asset.is_hidden = item.op == "hide"
+        elif item.op == "cover":
+            album.cover_asset_id = asset.id
+            cover_changed = True
+        elif item.op == "rotate":
+            to_rotate.append((asset.id, item.dir == "cw"))
+        elif item.op == "delete":
+            trash.enqueue(db, _asset_file_paths(asset), _asset_gdrive_ids(asset))
+            likes.delete_for_assets(db, [asset.id])
+            if album.cover_asset_id == asset.id:
+                album.cover_asset_id = None
+                cover_changed = True
+            deleted.add(asset.id)
+            db.delete(asset)
+
+    return results, to_rotate, cover_changed
+
+@router.post("/albums/{album_id}/assets/batch")
+def batch_assets(
+    request: Request,
+    album_id: int,
+    payload: BatchPayload,
+    background_tasks: BackgroundTasks,
+):
+    """
+    تطبيق عدة عمليات على أصول ألبوم واحد في معاملة واحدة.
+
+    تغييرات قاعدة البيانات تُطبَّق وتُحفظ مرة واحدة عبر services/writer،
+    أما عمل الملفات فيُؤجَّل: الحذف إلى سلة المحذوفات، والتدوير إلى مهمة
+    خلفية بعد الرد. يعيد نتيجة لكل عملية بنفس ترتيب الطلب.
+    """
+    require_admin(request)
+    res = writer.run(lambda w: _apply_batch(w, album_id, payload.ops))
+    if res is None:
+        raise HTTPException(404, "Album not found")
+    results, to_rotate, cover_changed = res
+
+    if to_rotate:
+        background_tasks.add_task(_rotate_assets_job, to_rotate)
+    if cover_changed:
+        background_tasks.add_task(covers.generate_job, album_id)
+
+    return {"ok": all(r["ok"] for r in results), "results": results}
+
+@router.post("/albums/{album_id}/cover/{asset_id:int}")
+def set_cover(
+    request: Request,
+    album_id: int,
+    asset_id: int,
+    background_tasks: BackgroundTasks,
+):
+    require_admin(request)
+
+    def _set(w: Session) -> bool:
+        album = w.get(models.Album, album_id)
+        asset = w.get(models.Asset, asset_id)
+        if not album or not asset or asset.album_id != album.id:
+            return False
+        album.cover_asset_id = asset.id
+        return True
+
+    if not writer.run(_set):
         raise HTTPException(404)
-    album.cover_asset_id = asset.id
-    db.commit()
+    # قصّات الغلاف بحجم الشاشة (services/covers.py) في الخلفية
+    background_tasks.add_task(covers.generate_job, album_id)
     return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
 
 @router.post("/albums/{album_id}/cover/clear")
-def clear_cover(request: Request, album_id: int, db: Session = Depends(get_db)):
+def clear_cover(request: Request, album_id: int, background_tasks: BackgroundTasks):
+    require_admin(request)
+
+    def _clear(w: Session) -> bool:
+        album = w.get(models.Album, album_id)
+        if not album:
+            return False
+        album.cover_asset_id = None
+        return True
+
+    if not writer.run(_clear):
+        raise HTTPException(404)
+    background_tasks.add_task(covers.generate_job, album_id)
+    return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
+
+# ---- Album delete / archive (background jobs) ----
+def _job_response(request: Request, job_id: int):
+    accept = (request.headers.get("accept") or "").lower()
+    if "text/html" in accept:
+        return RedirectResponse(url="/admin/albums", status_code=303)
+    return {"ok": True, "job_id": job_id, "status": "queued"}
+
+def _queue_album_job(album_id: int, kind: str, before=None) -> Optional[int]:
+    """
+    فحص المهمة النشطة وإنشاء المهمة في معاملة الكاتب الواحد، فلا ينشئ
+    طلبان متزامنان مهمتين لنفس الألبوم. None عند التعارض.
+    """
+    def _queue(w: Session) -> Optional[int]:
+        if w.get(models.Album, album_id) is None or album_jobs.active_job(w, album_id):
+            return None
+        if before:
+            before(w)
+        job = album_jobs.create_job(w, album_id, kind)
+        w.flush()
+        return job.id
+
+    return writer.run(_queue)
+
+@router.post("/albums/{album_id}/delete")
+def delete_album(
+    request: Request,
+    album_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_read_db),
+):
+    """حذف ألبوم كامل: الروابط العامة تتوقف فورًا، والملفات تُحذف في الخلفية."""
+    require_admin(request)
+    album = db.get(models.Album, album_id)
+    if not album:
+        raise HTTPException(404, "Album not found")
+    if album_jobs.active_job(db, album.id):
+        raise HTTPException(409, "Album has a job in progress")
+
+    def _drop_shares(w: Session) -> None:
+        share_ids = w.query(models.ShareLink.id).filter(models.ShareLink.album_id == album_id)
+        w.query(models.Selection).filter(models.Selection.share_id.in_(share_ids.scalar_subquery())).delete(
+            synchronize_session=False
+        )
+        w.query(models.ShareLink).filter(models.ShareLink.album_id == album_id).delete(
+            synchronize_session=False
+        )
+
+    job_id = _queue_album_job(album_id, album_jobs.DELETE, before=_drop_shares)
+    if job_id is None:
+        raise HTTPException(409, "Album has a job in progress")
+    share_cache.invalidate_album(album_id)  # الحذف الجماعي لا يطلق أحداث ORM
+    background_tasks.add_task(album_jobs.run_job, job_id)
+    return _job_response(request, job_id)
+
+@router.post("/albums/{album_id}/archive")
+def archive_album(
+    request: Request,
+    album_id: int,
+    background_tasks: BackgroundTasks,
+    mode: str = Form("tar"),  # tar | drive
+    db: Session = Depends(get_read_db),
+):
+    """نقل الألبوم إلى تخزين بارد (tarball محلي أو Drive فقط) وحذف المشتقات المحلية."""
     require_admin(request)
     album = db.get(models.Album, album_id)
     if not album:
+        raise HTTPException(404, "Album not found")
+    if album.archived_at:
+        raise HTTPException(409, "Album already archived")
+    if album_jobs.active_job(db, album.id):
+        raise HTTPException(409, "Album has a job in progress")
+    kind = {"tar": album_jobs.ARCHIVE_TAR, "drive": album_jobs.ARCHIVE_DRIVE}.get(mode)
+    if kind is None:
+        raise HTTPException(400, "Invalid mode")
+
+    job_id = _queue_album_job(album_id, kind)
+    if job_id is None:
+        raise HTTPException(409, "Album has a job in progress")
+    background_tasks.add_task(album_jobs.run_job, job_id)
+    return _job_response(request, job_id)
+
+@router.get("/jobs/{job_id}")
+def job_status(request: Request, job_id: int, db: Session = Depends(get_read_db)):
+    require_admin(request)
+    job = db.get(models.AlbumJob, job_id)
+    if not job:
         raise HTTPException(404)
-    album.cover_asset_id = None
-    db.commit()
-    return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
+    return {
+        "id": job.id,
+        "album_id": job.album_id,
+        "kind": job.kind,
+        "status": job.status,
+        "files": job.files,
+        "freed_bytes": job.freed_bytes,
+        "archive_path": job.archive_path,
+        "archive_url": f"/admin/albums/{job.album_id}/archive.tar" if job.archive_path else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+@router.get("/albums/{album_id}/archive.tar")
+def download_archive(request: Request, album_id: int):
+    """تنزيل tarball الألبوم المؤرشف (للمشرف فقط؛ ARCHIVE_DIR خارج /media)."""
+    require_admin(request)
+    path = album_jobs.archive_file(album_id)
+    if not path.exists():
+        raise HTTPException(404, "Archive not found")
+    return delivery.file_response(path, media_type="application/x-tar", filename=path.name)
+
+# ---- Client selections (proofing) ----
+@router.get("/albums/{album_id}/selections", response_class=HTMLResponse)
+def album_selections(request: Request, album_id: int, db: Session = Depends(get_read_db)):
+    require_admin(request)
+    album = db.get(models.Album, album_id)
+    if not album:
+        raise HTTPException(404)
+    summary = selections.album_summary(db, album.id)
+    names = dict(
+        db.query(models.Asset.id, models.Asset.original_name)
+        .filter(models.Asset.album_id == album.id)
+        .all()
+    )
+    return templates.TemplateResponse(
+        "admin/selections.html",
+        {
+            "request": request,
+            "site_title": settings.SITE_TITLE,
+            "album": album,
+            "visitors": summary["visitors"],
+            "popular": [(aid, names.get(aid, "?"), n) for aid, n in summary["assets"].items()],
+        },
+    )
+
+def _share_or_404(db: Session, share_id: int) -> models.ShareLink:
+    sl = db.get(models.ShareLink, share_id)
+    if not sl:
+        raise HTTPException(404)
+    return sl
+
+@router.get("/shares/{share_id}/selections/{visitor}.csv")
+def export_selection_csv(request: Request, share_id: int, visitor: str, db: Session = Depends(get_read_db)):
+    require_admin(request)
+    sl = _share_or_404(db, share_id)
+    headers = {"Content-Disposition": f'attachment; filename="selection-{sl.slug}-{visitor}.csv"'}
+    return StreamingResponse(selections.iter_csv(db, sl, visitor), media_type="text/csv", headers=headers)
+
+@router.get("/shares/{share_id}/selections/{visitor}.zip")
+def export_selection_zip(request: Request, share_id: int, visitor: str, db: Session = Depends(get_read_db)):
+    require_admin(request)
+    sl = _share_or_404(db, share_id)
+    headers = {"Content-Disposition": f'attachment; filename="selection-{sl.slug}-{visitor}.zip"'}
+    return StreamingResponse(selections.zip_originals(db, sl, visitor), media_type="application/zip", headers=headers)
+
+# ---- Trash ----
+@router.post("/trash/sweep")
+def trash_sweep(request: Request):
+    """تشغيل دورة حذف فورية بدل انتظار الخيط الخلفي."""
+    require_admin(request)
+    return trash.sweep_all()
+
+@router.get("/trash/orphans")
+def trash_orphans(request: Request, db: Session = Depends(get_read_db)):
+    """تقرير الملفات اليتيمة محليًا وفي Drive (قراءة فقط)."""
+    require_admin(request)
+    return trash.scan_orphans(db)
+
+@router.post("/trash/orphans")
+def trash_orphans_apply(request: Request, db: Session = Depends(get_db)):
+    """وضع الملفات اليتيمة في سلة المحذوفات."""
+    require_admin(request)
+    return trash.scan_orphans(db, apply=True)
 
 # ---- Videos ----
 @router.post("/albums/{album_id}/videos/add")
 def add_video(
     request: Request,
     album_id: int,
+    background_tasks: BackgroundTasks,
     provider: str = Form(...),
     video_id: str = Form(...),      # يقبل ID أو رابط كامل
     title: str | None = Form(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     require_admin(request)
 
@@ -700,43 +1055,56 @@ def add_video(
     if not video_id:
         raise HTTPException(400, "Invalid video id")
 
-    # منع التكرار (مهم مع Vimeo لأن الـhash جزء من الهوية)
-    exists = (
-        db.query(models.Video)
-          .filter(
-              models.Video.album_id == album_id,
-              models.Video.provider == provider,
-              models.Video.video_id == video_id,
-              models.Video.vimeo_hash.is_(vimeo_hash),  # IS NULL إذا None
-          )
-          .first()
-    )
-    if exists:
-        return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
+    def _add(w: Session) -> Optional[int]:
+        # منع التكرار (مهم مع Vimeo لأن الـhash جزء من الهوية)
+        exists = (
+            w.query(models.Video)
+              .filter(
+                  models.Video.album_id == album_id,
+                  models.Video.provider == provider,
+                  models.Video.video_id == video_id,
+                  models.Video.vimeo_hash.is_(vimeo_hash),  # IS NULL إذا None
+              )
+              .first()
+        )
+        if exists:
+            return None
+
+        # إنشاء السجل
+        v = models.Video(
+            album_id=album_id,
+            provider=provider,
+            video_id=video_id,
+            vimeo_hash=vimeo_hash,
+            title=(title or "").strip() or None,
+        )
+        w.add(v)
+        w.flush()
+        return v.id
 
-    # إنشاء السجل
-    v = models.Video(
-        album_id=album_id,
-        provider=provider,
-        video_id=video_id,
-        vimeo_hash=vimeo_hash,
-        title=(title or "").strip() or None,
-    )
-    db.add(v)
-    db.commit()
+    new_id = writer.run(_add)
+    if new_id is not None:
+        # صورة الغلاف من المزوّد في الخلفية (الصفحة العامة تعرض واجهة خفيفة بدل iframe)
+        background_tasks.add_task(video_posters.refresh_job, [new_id])
 
     return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
 
 
 @router.post("/videos/{video_id}/delete")
-def delete_video(request: Request, video_id: int, db: Session = Depends(get_db)):
+def delete_video(request: Request, video_id: int):
     require_admin(request)
-    v = db.get(models.Video, video_id)
-    if not v:
+
+    def _delete(w: Session) -> Optional[int]:
+        v = w.get(models.Video, video_id)
+        if not v:
+            return None
+        video_posters.discard(w, v)
+        w.delete(v)
+        return v.album_id
+
+    album_id = writer.run(_delete)
+    if album_id is None:
         raise HTTPException(404)
-    album_id = v.album_id
-    db.delete(v)
-    db.commit()
     return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
 
 # ---- HEAD helpers (لمنع أخطاء HEAD) ----
@@ -760,7 +1128,7 @@ def view_album_head(album_id: int):
 
 # --- Edit album ---
 @router.get("/albums/{album_id}/edit", response_class=HTMLResponse)
-def edit_album_form(request: Request, album_id: int, db: Session = Depends(get_db)):
+def edit_album_form(request: Request, album_id: int, db: Session = Depends(get_read_db)):
     require_admin(request)
     album = db.get(models.Album, album_id)
     if not album:
@@ -783,17 +1151,20 @@ def edit_album_save(
     photographer: str | None = Form(None),
     photographer_url: str | None = Form(None),
     event_date: str | None = Form(None),
-    db: Session = Depends(get_db),
 ):
     require_admin(request)
-    album = db.get(models.Album, album_id)
-    if not album:
+    event_dt = _parse_dt(event_date)
+
+    def _save(w: Session) -> bool:
+        album = w.get(models.Album, album_id)
+        if not album:
+            return False
+        album.title = title.strip()
+        album.photographer = (photographer or "").strip() or None
+        album.photographer_url = (photographer_url or "").strip() or None
+        album.event_date = event_dt
+        return True
+
+    if not writer.run(_save):
         raise HTTPException(404)
-
-    album.title = title.strip()
-    album.photographer = (photographer or "").strip() or None
-    album.photographer_url = (photographer_url or "").strip() or None
-    album.event_date = _parse_dt(event_date)
-
-    db.commit()
     return RedirectResponse(url=f"/admin/albums/{album_id}", status_code=303)
@@ -1,25 +1,56 @@
 # app/routers/likes.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from .. import models
+from ..database import ReadSessionLocal
+from ..dependencies import visitor_id
+from ..services import likes, share_cache
+from .public import is_unlocked, load_share
 
 router = APIRouter()
 
 def get_db():
-    db = SessionLocal()
+    # الكتابات هنا تمر عبر services/writer؛ الجلسة للقراءة فقط
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
 @router.post("/api/like")
-def toggle_like(data: dict, db: Session = Depends(get_db)):
-    url = data.get("url")
-    liked = data.get("liked", True)
-    if not url:
-        raise HTTPException(status_code=400, detail="url is required")
-    like = models.Like(url=url, liked=liked)
-    db.add(like)
-    db.commit()
-    return {"ok": True}
+def toggle_like(request: Request, data: dict, db: Session = Depends(get_db)):
+    asset_id, slug = data.get("asset_id"), data.get("slug")
+    if data.get("url"):
+        # العملاء القدامى يرسلون url الصورة فقط: /s/<slug>/file/<id>
+        url_slug, url_asset = likes.parse_asset_url(str(data["url"]))
+        slug = slug or url_slug
+        asset_id = asset_id if asset_id is not None else url_asset
+    try:
+        asset_id = int(asset_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="asset_id is required")
+    if not slug:
+        raise HTTPException(status_code=400, detail="slug is required")
+
+    # التحقق كاملًا قبل أي كتابة: رابط صالح، الأصل من ألبومه، والرابط مفتوح
+    sl = load_share(db, str(slug))
+    asset = share_cache.get_asset(db, asset_id)
+    if asset is None or asset.album_id != sl.album_id:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    if not is_unlocked(request, sl):
+        raise HTTPException(status_code=403, detail="Locked")
+
+    liked = bool(data.get("liked", True))
+    vid = visitor_id(request)
+    # زر الإعجاب داخل رابط مشاركة = اختيار العميل للطباعة؛ يُكتبان معًا في دفعة واحدة
+    likes.record(asset_id, vid, liked, share_id=sl.id)
+    return {"ok": True, "asset_id": asset_id, "liked": liked}
+
+@router.get("/api/s/{slug}/likes")
+def album_likes(request: Request, slug: str, db: Session = Depends(get_db)):
+    if likes.has_pending():
+        likes.flush()
+    sl = load_share(db, slug)
+    if not is_unlocked(request, sl):
+        raise HTTPException(status_code=403, detail="Locked")
+    counts = likes.album_counts(db, sl.album_id)
+    return {"album_id": sl.album_id, "counts": {str(k): v for k, v in counts.items()}}
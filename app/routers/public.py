@@ -5,16 +5,21 @@ from urllib.parse import quote
 from pathlib import Path
 import unicodedata
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Request, Response
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from .. import models
 from ..config import settings
-from ..database import SessionLocal
-from ..services import gdrive
-from ..utils import is_expired, verify_password
+from ..database import ReadSessionLocal
+from ..dependencies import visitor_id
+from ..services import covers, delivery, fragments, gdrive, likes, page_cache, selections, share_cache, signing, video_posters, writer
+from ..services import unlock as unlock_service
+from ..services.share_cache import AssetInfo, ShareInfo
+from ..utils import is_expired
 from ..templating import templates
 
 
@@ -25,46 +30,97 @@ def ascii_fallback(name: str) -> str:
     return n or "file"
 
 def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+    # اتصالات للقراءة فقط على SQLite؛ الكتابات الصغيرة عبر services/writer
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-def load_share(db: Session, slug: str) -> models.ShareLink:
-    sl = db.query(models.ShareLink).filter(models.ShareLink.slug == slug).first()
+def load_share(db: Session, slug: str) -> ShareInfo:
+    """بيانات رابط المشاركة من الكاش (استعلام واحد لكل slug كل SHARE_CACHE_TTL)."""
+    sl = share_cache.get_share(db, slug)
     if not sl:
         raise HTTPException(404, "Not found")
     if is_expired(sl.expires_at):
         raise HTTPException(403, "Link expired")
+    if sl.archived:
+        raise HTTPException(410, "Album archived")
     return sl
 
-def _url(rel: str | None) -> str | None:
-    return f"/media/{rel}" if rel else None
+def is_unlocked(request: Request, sl: ShareInfo) -> bool:
+    """فحص HMAC للتوكن المخزّن في الجلسة؛ لا bcrypt بعد أول فتح ناجح."""
+    if not sl.password_hash:
+        return True
+    token = request.session.get(f"unlocked:{sl.slug}")
+    return signing.check_unlock_token(token, sl.slug, sl.password_hash)
+
+def _authorize_asset(request: Request, db: Session, slug: str, asset_id: int, token: str | None) -> AssetInfo:
+    """
+    A valid ``t`` token is checked by HMAC alone; without one we fall back
+    to the share lookup and the session unlock. The asset row itself comes
+    from the in-process cache, so a gallery full of thumbnails costs no queries.
+    """
+    album_id = signing.check_asset_token(token, slug)
+    if album_id is None:
+        sl = load_share(db, slug)
+        if not is_unlocked(request, sl):
+            raise HTTPException(403, "Locked")
+        album_id = sl.album_id
+    a = share_cache.get_asset(db, asset_id)
+    if not a or a.album_id != album_id:
+        raise HTTPException(404)
+    return a
+
+_url = signing.media_url
+
+def _thumb_url(a: models.Asset, slug: str, token: str) -> str:
+    """ثمبنيل محلي -> رابط /media موقّع مباشرة (بدون الراوتر)؛ وإلا عبر /s/<slug>/thumb."""
+    stem = Path(str(a.filename).replace("\\", "/")).stem
+    rel = f"albums/{a.album_id}/thumb/400/{stem}.jpg"
+    if (Path(settings.STORAGE_DIR) / rel).is_file():
+        return _url(rel, a.media_rev)
+    return f"/s/{slug}/thumb/{a.id}?t={token}"
+
+def _display_url(a: models.Asset) -> str | None:
+    """مشتق العرض 1600px (للغلاف حين لا توجد قصّات مخصّصة)."""
+    stem = Path(str(a.filename).replace("\\", "/")).stem
+    rel = f"albums/{a.album_id}/disp/1600/{stem}.jpg"
+    return _url(rel, a.media_rev) if (Path(settings.STORAGE_DIR) / rel).is_file() else None
 
-def _asset_to_dict(a: models.Asset, slug: str) -> dict:
+def _poster_urls(v: models.Video) -> dict:
+    if not v.poster_path:
+        return {"poster": None, "poster_webp": None}
+    webp = video_posters.poster_rel(v, "webp")
+    return {
+        "poster": _url(v.poster_path),
+        "poster_webp": _url(webp) if (Path(settings.STORAGE_DIR) / webp).is_file() else None,
+    }
+
+def _asset_to_dict(a: models.Asset, slug: str, token: str) -> dict:
+    rev = a.media_rev
     return {
         "id": a.id,
         "name": a.original_name,
-        "url": f"/s/{slug}/file/{a.id}",       # الأصل عبر الراوتر (محمي/سجل)
-        "thumb": f"/s/{slug}/thumb/{a.id}",    # الثمبنيل統 واحد: لو محلي أو درايف
-        "width": a.width, "height": a.height, "lqip": a.lqip,
+        "url": f"/s/{slug}/file/{a.id}?t={token}",       # الأصل عبر الراوتر (محمي/سجل)
+        "thumb": _thumb_url(a, slug, token),             # الثمبنيل統 واحد: لو محلي أو درايف
+        "width": a.width, "height": a.height, "thumbhash": a.thumbhash,
         # مشتقات مباشرة من /media (مسارات نسبية مخزنة)
-        "jpg_480": _url(a.jpg_480),   "jpg_960": _url(a.jpg_960),
-        "jpg_1280": _url(a.jpg_1280), "jpg_1920": _url(a.jpg_1920),
-        "webp_480": _url(a.webp_480), "webp_960": _url(a.webp_960),
-        "webp_1280": _url(a.webp_1280), "webp_1920": _url(a.webp_1920),
-        "avif_480": _url(a.avif_480), "avif_960": _url(a.avif_960),
-        "avif_1280": _url(a.avif_1280), "avif_1920": _url(a.avif_1920),
+        "jpg_480": _url(a.jpg_480, rev),   "jpg_960": _url(a.jpg_960, rev),
+        "jpg_1280": _url(a.jpg_1280, rev), "jpg_1920": _url(a.jpg_1920, rev),
+        "webp_480": _url(a.webp_480, rev), "webp_960": _url(a.webp_960, rev),
+        "webp_1280": _url(a.webp_1280, rev), "webp_1920": _url(a.webp_1920, rev),
+        "avif_480": _url(a.avif_480, rev), "avif_960": _url(a.avif_960, rev),
+        "avif_1280": _url(a.avif_1280, rev), "avif_1920": _url(a.avif_1920, rev),
     }
 
 @router.get("/{slug}", response_class=HTMLResponse)
-def open_share(request: Request, slug: str, db: Session = Depends(get_db)):
+def open_share(request: Request, slug: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     sl = load_share(db, slug)
-    album = sl.album
 
     # 🔒 حماية بكلمة مرور
-    if sl.password_hash and not request.session.get(f"unlocked:{slug}"):
+    if not is_unlocked(request, sl):
+        album = db.get(models.Album, sl.album_id)
         return templates.TemplateResponse(
             "public_album.html",
             {
@@ -79,6 +135,15 @@ def open_share(request: Request, slug: str, db: Session = Depends(get_db)):
             },
         )
 
+    # ✅ صفحة مخزّنة (مضغوطة مرة واحدة) طالما لم يتغير إصدار الألبوم ولا نافذة التوكن
+    token = signing.make_asset_token(slug, sl.album_id, sl.expires_at)
+    cache_key = (slug, token, sl.allow_zip, page_cache.album_version(db, sl.album_id))
+    cached = page_cache.get(cache_key)
+    if cached is not None:
+        return page_cache.respond(cached, request)
+
+    album = db.get(models.Album, sl.album_id)
+
     # ✅ الصور غير المخفية
     assets_orm = [a for a in album.assets if not a.is_hidden]
     assets_orm.sort(key=lambda a: ((a.sort_order or 0), a.id))
@@ -90,10 +155,27 @@ def open_share(request: Request, slug: str, db: Session = Depends(get_db)):
     if not hero_orm and assets_orm:
         hero_orm = assets_orm[0]
 
-    hero = _asset_to_dict(hero_orm, slug) if hero_orm else None
-    others = [_asset_to_dict(a, slug) for a in assets_orm if not hero_orm or a.id != hero_orm.id]
+    hero = None
+    headers = {}
+    if hero_orm:
+        hero = _asset_to_dict(hero_orm, slug, token)
+        hero["picture"] = covers.hero_picture(album, hero_orm.id)
+        hero["src"] = _display_url(hero_orm) or hero["thumb"]
+        # Link: preload يبدأ تحميل صورة LCP قبل تحليل HTML (ويمكن للبروكسي تحويله إلى 103 Early Hints)
+        if hero["picture"]:
+            headers["Link"] = covers.preload_link(hero["picture"])
+        else:
+            headers["Link"] = f"<{hero['src']}>; rel=preload; as=image; fetchpriority=high"
+    # عناصر المعرض من أجزاء HTML مخزّنة لكل أصل: بعد تعديل يُعاد عرض ما تغيّر فقط
+    gallery_html = fragments.render_items(
+        (a for a in assets_orm if not hero_orm or a.id != hero_orm.id),
+        (slug, token),
+        lambda a: _asset_to_dict(a, slug, token),
+        album.title,
+    )
 
     # ✅ الفيديوهات (مهم: تمرير vimeo_hash)
+    visible_videos = [v for v in getattr(album, "videos", []) if not getattr(v, "is_hidden", False)]
     videos = [
         {
             "id": v.id,
@@ -101,13 +183,17 @@ def open_share(request: Request, slug: str, db: Session = Depends(get_db)):
             "video_id": v.video_id,
             "vimeo_hash": getattr(v, "vimeo_hash", None),   # ← الجديد
             "title": v.title,
+            **_poster_urls(v),
         }
-        for v in getattr(album, "videos", [])
-        if not getattr(v, "is_hidden", False)
+        for v in visible_videos
     ]
     videos.sort(key=lambda v: v["id"], reverse=True)
+    # صور الغلاف الناقصة/القديمة تُجلب بعد إرسال الرد؛ تعديل Video يبطل الصفحة المخزّنة
+    stale = video_posters.stale_ids(visible_videos)
+    if stale:
+        background_tasks.add_task(video_posters.refresh_job, stale)
 
-    return templates.TemplateResponse(
+    resp = templates.TemplateResponse(
         "public_album.html",
         {
             "request": request,
@@ -116,28 +202,34 @@ def open_share(request: Request, slug: str, db: Session = Depends(get_db)):
             "locked": False,
             "site_title": settings.SITE_TITLE,
             "hero": hero,
-            "gallery_assets": others,
+            "gallery_html": gallery_html,
             "gallery_videos": videos,
         },
     )
+    page = page_cache.put(cache_key, sl.album_id, resp.body, resp.media_type, headers)
+    return page_cache.respond(page, request)
 
 
 @router.post("/{slug}/unlock")
-def unlock(request: Request, slug: str, password: str = Form(...), db: Session = Depends(get_db)):
-    sl = load_share(db, slug)
-    if not sl.password_hash:
+async def unlock(request: Request, slug: str, password: str = Form(...), db: Session = Depends(get_db)):
+    sl = await run_in_threadpool(load_share, db, slug)
+    if not sl.password_hash or is_unlocked(request, sl):
         return RedirectResponse(f"/s/{slug}", status_code=302)
-    if verify_password(password, sl.password_hash):
-        request.session[f"unlocked:{slug}"] = True
+
+    # bcrypt في منفّذ محدود، بعد حدّ المحاولات لكل IP ولكل رابط
+    try:
+        unlock_service.check_rate(slug, request.client.host if request.client else None)
+        ok = await unlock_service.verify(password, sl.password_hash)
+    except unlock_service.Busy as e:
+        raise HTTPException(429, "Too many attempts", headers={"Retry-After": str(e.retry_after)})
+    if ok:
+        request.session[f"unlocked:{slug}"] = signing.make_unlock_token(slug, sl.password_hash)
         return RedirectResponse(f"/s/{slug}", status_code=302)
     raise HTTPException(403, "Wrong password")
 
 @router.get("/{slug}/file/{asset_id}")
-def get_file(slug: str, asset_id: int, db: Session = Depends(get_db)):
-    sl = load_share(db, slug)
-    a = db.get(models.Asset, asset_id)
-    if not a or a.album_id != sl.album_id:
-        raise HTTPException(404)
+def get_file(request: Request, slug: str, asset_id: int, t: str | None = None, db: Session = Depends(get_db)):
+    a = _authorize_asset(request, db, slug, asset_id, t)
 
     # Drive؟
     if getattr(settings, "USE_GDRIVE", False) and getattr(a, "gdrive_file_id", None):
@@ -158,14 +250,11 @@ def get_file(slug: str, asset_id: int, db: Session = Depends(get_db)):
     fpath = Path(settings.STORAGE_DIR) / a.filename
     if not fpath.exists():
         raise HTTPException(404)
-    return FileResponse(fpath, filename=a.original_name)
+    return delivery.file_response(fpath, filename=a.original_name)
 
 @router.get("/{slug}/thumb/{asset_id}")
-def get_thumb(slug: str, asset_id: int, db: Session = Depends(get_db)):
-    sl = load_share(db, slug)
-    a = db.get(models.Asset, asset_id)
-    if not a or a.album_id != sl.album_id:
-        raise HTTPException(404)
+def get_thumb(request: Request, slug: str, asset_id: int, t: str | None = None, db: Session = Depends(get_db)):
+    a = _authorize_asset(request, db, slug, asset_id, t)
 
     if getattr(settings, "USE_GDRIVE", False) and getattr(a, "gdrive_thumb_id", None):
         gen = gdrive.stream_via_requests(a.gdrive_thumb_id, chunk_size=256 * 1024)
@@ -175,8 +264,8 @@ def get_thumb(slug: str, asset_id: int, db: Session = Depends(get_db)):
     stem = Path(str(a.filename).replace("\\", "/")).stem
     base = Path(settings.STORAGE_DIR) / "albums" / str(a.album_id) / "thumb" / "400"
     jpg = base / f"{stem}.jpg"; webp = base / f"{stem}.webp"
-    if jpg.exists():  return FileResponse(jpg, media_type="image/jpeg")
-    if webp.exists(): return FileResponse(webp, media_type="image/webp")
+    if jpg.exists():  return delivery.file_response(jpg, media_type="image/jpeg")
+    if webp.exists(): return delivery.file_response(webp, media_type="image/webp")
 
     # fallback
     svg = ('<svg xmlns="http://www.w3.org/2000/svg" width="400" height="260">'
@@ -187,3 +276,66 @@ def get_thumb(slug: str, asset_id: int, db: Session = Depends(get_db)):
     return Response(content=svg, media_type="image/svg+xml")
 
 
+@router.get("/{slug}/assets")
+def list_assets(
+    request: Request,
+    slug: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """صفحات JSON من صور الألبوم المرئية مع thumbhash (للتحميل التدريجي في الواجهة)."""
+    sl = load_share(db, slug)
+    if not is_unlocked(request, sl):
+        raise HTTPException(403, "Locked")
+    rows = (
+        db.query(models.Asset)
+        .filter(models.Asset.album_id == sl.album_id, models.Asset.is_hidden.is_(False))
+        .order_by(func.coalesce(models.Asset.sort_order, 0), models.Asset.id)
+        .offset(offset)
+        .limit(limit + 1)
+        .all()
+    )
+    token = signing.make_asset_token(slug, sl.album_id, sl.expires_at)
+    items = [
+        {
+            "id": a.id,
+            "name": a.original_name,
+            "url": f"/s/{slug}/file/{a.id}?t={token}",
+            "thumb": _thumb_url(a, slug, token),
+            "width": a.width,
+            "height": a.height,
+            "thumbhash": a.thumbhash,
+        }
+        for a in rows[:limit]
+    ]
+    return {"items": items, "next": offset + limit if len(rows) > limit else None}
+
+
+# ---- Proofing selection (قائمة اختيار العميل لكل رابط مشاركة) ----
+@router.get("/{slug}/selection")
+def get_selection(request: Request, slug: str, db: Session = Depends(get_db)):
+    sl = load_share(db, slug)
+    if not is_unlocked(request, sl):
+        raise HTTPException(403, "Locked")
+    if likes.has_pending():
+        likes.flush()   # نقرات الإعجاب المعلّقة تغيّر الاختيار
+    return {"asset_ids": selections.get(db, sl.id, visitor_id(request))}
+
+@router.post("/{slug}/selection")
+def toggle_selection(request: Request, slug: str, data: dict, db: Session = Depends(get_db)):
+    sl = load_share(db, slug)
+    if not is_unlocked(request, sl):
+        raise HTTPException(403, "Locked")
+    try:
+        asset_id = int(data.get("asset_id"))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "asset_id is required")
+    a = share_cache.get_asset(db, asset_id)
+    if not a or a.album_id != sl.album_id:
+        raise HTTPException(404)
+    vid, selected = visitor_id(request), bool(data.get("selected", True))
+    if likes.has_pending():
+        likes.flush()   # نقرة إعجاب أقدم لا تطغى على هذا التبديل
+    count = writer.run(lambda w: selections.toggle(w, sl, vid, asset_id, selected))
+    return {"ok": True, "count": count}
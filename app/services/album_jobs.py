@@ -0,0 +1,231 @@
+# app/services/album_jobs.py
+from __future__ import annotations
+
+import logging
+import os
+import tarfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+from . import gdrive, likes, share_cache
+
+log = logging.getLogger(__name__)
+
+DELETE = "delete"
+ARCHIVE_TAR = "archive_tar"
+ARCHIVE_DRIVE = "archive_drive"
+KINDS = (DELETE, ARCHIVE_TAR, ARCHIVE_DRIVE)
+
+_PROGRESS_EVERY = 200  # حفظ التقدّم كل N ملف
+
+
+def album_root(album_id: int) -> Path:
+    return Path(settings.STORAGE_DIR) / "albums" / str(album_id)
+
+
+def archive_dir() -> Path:
+    return Path(settings.ARCHIVE_DIR)
+
+
+def archive_file(album_id: int) -> Path:
+    """Tarball of an archived album (served only by the admin download route)."""
+    return archive_dir() / f"album_{album_id:06d}.tar"
+
+
+def _legacy_archive_file(album_id: int) -> Path:
+    # المسار القديم تحت STORAGE_DIR (كان مكشوفًا عبر /media)
+    return Path(settings.STORAGE_DIR) / "archive" / f"album_{album_id:06d}.tar"
+
+
+def active_job(db: Session, album_id: int) -> Optional[models.AlbumJob]:
+    """A queued or running job of this album, if any."""
+    return (
+        db.query(models.AlbumJob)
+        .filter(models.AlbumJob.album_id == album_id, models.AlbumJob.status.in_(("queued", "running")))
+        .first()
+    )
+
+
+def create_job(db: Session, album_id: int, kind: str) -> models.AlbumJob:
+    """
+    Create a queued job; the caller schedules run_job(job.id) in the
+    background. The caller checks active_job() first: two jobs of one
+    album must not run at once.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = models.AlbumJob(album_id=album_id, kind=kind, status="queued", files=0, freed_bytes=0)
+    db.add(job)
+    return job
+
+
+def _iter_files(root: Path) -> Iterator[os.DirEntry]:
+    """مرور متدفق على ملفات الشجرة بدون بناء قائمة كاملة في الذاكرة."""
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    else:
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def _remove_tree(db: Session, job: models.AlbumJob, root: Path) -> None:
+    """
+    Unlink every file under root and prune empty dirs, adding removed
+    sizes to the job as it goes.
+    """
+    n = 0
+    for entry in _iter_files(root):
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            continue
+        job.files += 1
+        job.freed_bytes += size
+        n += 1
+        if n % _PROGRESS_EVERY == 0:
+            db.commit()
+
+    for dirpath, _dirs, _files in os.walk(root, topdown=False):
+        try:
+            os.rmdir(dirpath)
+        except OSError:
+            pass
+    db.commit()
+
+
+def _drive_album_folder(service, album_id: int) -> Optional[str]:
+    root_id = settings.GDRIVE_ROOT_FOLDER_ID
+    if not root_id:
+        return None
+    albums = gdrive.find_subfolder(service, root_id, "albums")
+    return gdrive.find_subfolder(service, albums, str(album_id)) if albums else None
+
+
+def _delete_album(db: Session, job: models.AlbumJob) -> None:
+    album_id = job.album_id
+    _remove_tree(db, job, album_root(album_id))
+    for tar_path in (archive_file(album_id), _legacy_archive_file(album_id)):
+        try:
+            size = tar_path.stat().st_size
+            tar_path.unlink()
+        except FileNotFoundError:
+            continue
+        job.files += 1
+        job.freed_bytes += size
+
+    if settings.USE_GDRIVE:
+        service = gdrive._service()
+        folder_id = _drive_album_folder(service, album_id)
+        if folder_id:
+            for f in gdrive.walk_files(service, folder_id):
+                job.freed_bytes += int(f.get("size") or 0)
+            # حذف المجلد يحذف محتواه في طلب واحد
+            gdrive.delete_file(folder_id)
+
+    # حذف جماعي صريح: SQLite لا يطبّق ON DELETE CASCADE بدون PRAGMA foreign_keys
+    db.query(models.Album).filter(models.Album.id == album_id).update(
+        {models.Album.cover_asset_id: None}, synchronize_session=False
+    )
+    asset_ids = db.query(models.Asset.id).filter(models.Asset.album_id == album_id)
+    likes.delete_for_assets(db, [a for (a,) in asset_ids])
+    for model in (models.Asset, models.Video, models.ShareLink):
+        db.query(model).filter(model.album_id == album_id).delete(synchronize_session=False)
+    db.query(models.Album).filter(models.Album.id == album_id).delete(synchronize_session=False)
+    db.commit()
+    share_cache.invalidate_album(album_id)
+
+
+def _archive_tar(db: Session, job: models.AlbumJob, album: models.Album) -> None:
+    """Stream originals into ARCHIVE_DIR/album_<id>.tar, then drop the local tree."""
+    root = album_root(album.id)
+    tar_path = archive_file(album.id)
+    tar_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = tar_path.with_suffix(".tar.part")
+
+    originals = root / "original"
+    # بدون ضغط: الصور مضغوطة أصلًا، و tarfile يكتب الملفات على دفعات
+    with tarfile.open(tmp_path, mode="w") as tar:
+        for entry in _iter_files(originals):
+            tar.add(entry.path, arcname=f"album_{album.id}/{entry.name}")
+    os.replace(tmp_path, tar_path)
+
+    _remove_tree(db, job, root)
+    job.freed_bytes -= tar_path.stat().st_size
+    job.archive_path = tar_path.name  # نسبةً إلى ARCHIVE_DIR
+
+
+def _archive_drive(db: Session, job: models.AlbumJob, album: models.Album) -> None:
+    """Make sure every original is on Drive, then drop the local tree."""
+    if not settings.USE_GDRIVE:
+        raise RuntimeError("Google Drive is disabled (USE_GDRIVE=False)")
+
+    service = gdrive._service()
+    d_orig = None
+    base = Path(settings.STORAGE_DIR)
+    for asset in album.assets:
+        if asset.gdrive_file_id:
+            continue
+        path = base / str(asset.filename).replace("\\", "/")
+        if not path.exists():
+            raise RuntimeError(f"Original missing locally and on Drive: {asset.filename}")
+        if d_orig is None:
+            root_id = settings.GDRIVE_ROOT_FOLDER_ID
+            if not root_id:
+                raise RuntimeError("GDRIVE_ROOT_FOLDER_ID is not set")
+            d_albums = gdrive.ensure_subfolder(service, root_id, "albums")
+            d_album = gdrive.ensure_subfolder(service, d_albums, str(album.id))
+            d_orig = gdrive.ensure_subfolder(service, d_album, "original")
+        asset.gdrive_file_id = gdrive.upload_file(service, d_orig, path, asset.mime_type)
+        db.commit()
+
+    _remove_tree(db, job, album_root(album.id))
+
+
+def run_job(job_id: int) -> None:
+    """Execute a job in its own DB session (meant for BackgroundTasks/threads)."""
+    db = SessionLocal()
+    try:
+        job = db.get(models.AlbumJob, job_id)
+        if job is None or job.status != "queued":
+            return
+        job.status = "running"
+        db.commit()
+
+        try:
+            if job.kind == DELETE:
+                _delete_album(db, job)
+            else:
+                album = db.get(models.Album, job.album_id)
+                if album is None:
+                    raise RuntimeError("Album not found")
+                if job.kind == ARCHIVE_TAR:
+                    _archive_tar(db, job, album)
+                else:
+                    _archive_drive(db, job, album)
+                album.archived_at = datetime.utcnow()
+            job.status = "done"
+        except Exception as e:
+            db.rollback()
+            job = db.get(models.AlbumJob, job_id)
+            job.status = "failed"
+            job.error = str(e)[:2000]
+            log.exception("album job failed", extra={"job_id": job_id})
+
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
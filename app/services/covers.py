@@ -0,0 +1,222 @@
+# app/services/covers.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+from . import signing, trash
+from .variants import SUBDIRS, _rotate, register_avif
+
+log = logging.getLogger(__name__)
+
+# قصّات بحجم الشاشة: أفقي للحواسيب وعمودي للجوال
+CROPS: Dict[str, Tuple[float, List[int]]] = {
+    "landscape": (16 / 9, [1280, 1920, 2560]),
+    "portrait": (9 / 16, [640, 960, 1280]),
+}
+QUALITY = {"avif": 55, "webp": 78, "jpg": 82}
+MIME = {"avif": "image/avif", "webp": "image/webp", "jpg": "image/jpeg"}
+
+
+def formats() -> List[str]:
+    """Best first; AVIF only when enabled and the encoder is available."""
+    out = ["webp", "jpg"]
+    if settings.ENABLE_AVIF and register_avif():
+        out.insert(0, "avif")
+    return out
+
+
+def rendition_name(stem: str, fx: float, fy: float, media_rev: int) -> str:
+    """
+    ``<stem>.<version>``: the version changes with the crop (focal point,
+    rotation via Asset.media_rev), so a new crop gets a new URL under
+    immutable caching.
+    """
+    version = hashlib.sha1(f"{fx:.4f}:{fy:.4f}:{media_rev}".encode()).hexdigest()[:8]
+    return f"{stem}.{version}"
+
+
+def manifest_name(m: dict) -> str:
+    # manifests قديمة بلا name: الملفات باسم stem الأصل
+    return m.get("name") or m["stem"]
+
+
+def rendition_rel(album_id: int, crop: str, width: int, name: str, fmt: str) -> str:
+    return f"albums/{album_id}/cover/{crop}/{width}/{name}.{fmt}"
+
+
+def _named_paths(album_id: int, name: str) -> List[Path]:
+    base = Path(settings.STORAGE_DIR)
+    return [
+        base / rendition_rel(album_id, crop, w, name, fmt)
+        for crop, (_, widths) in CROPS.items()
+        for w in widths
+        for fmt in ("avif", "webp", "jpg")
+    ]
+
+
+def rendition_paths(album_id: int, stem: str) -> List[Path]:
+    """Cover files of one asset on disk, every version (for deletion)."""
+    own = re.compile(re.escape(stem) + r"(?:\.[0-9a-f]{8})?\.(?:avif|webp|jpg)")
+    root = Path(settings.STORAGE_DIR) / f"albums/{album_id}/cover"
+    return [p for p in root.glob("*/*/*") if own.fullmatch(p.name)]
+
+
+def focal_crop(w: int, h: int, aspect: float, fx: float, fy: float) -> Tuple[int, int, int, int]:
+    """
+    Largest box of the given aspect inside w x h, centred on the focal
+    point (fx, fy in 0..1) as far as the image edges allow.
+    """
+    if w / h > aspect:
+        cw, ch = int(round(h * aspect)), h
+    else:
+        cw, ch = w, int(round(w / aspect))
+    left = min(max(int(round(fx * w - cw / 2)), 0), w - cw)
+    top = min(max(int(round(fy * h - ch / 2)), 0), h - ch)
+    return left, top, left + cw, top + ch
+
+
+def _source(asset: models.Asset) -> Tuple[Path, bool]:
+    """الأصل إن وُجد محليًا، وإلا أكبر مشتق (المشتقات مدوّرة أصلًا)."""
+    base = Path(settings.STORAGE_DIR)
+    f_rel = Path(str(asset.filename).replace("\\", "/"))
+    if (base / f_rel).exists():
+        return base / f_rel, True
+    for kind in ("big", "disp"):
+        p = base / f"albums/{asset.album_id}/{SUBDIRS[kind]}/{f_rel.stem}.jpg"
+        if p.exists():
+            return p, False
+    raise FileNotFoundError(f"No source image for asset {asset.id}")
+
+
+def render(asset: models.Asset) -> dict:
+    """
+    Write the cover renditions of an asset and return the manifest stored
+    in Album.cover_renditions.
+    """
+    src, is_original = _source(asset)
+    fx = 0.5 if asset.focal_x is None else asset.focal_x
+    fy = 0.5 if asset.focal_y is None else asset.focal_y
+    stem = Path(str(asset.filename).replace("\\", "/")).stem
+    name = rendition_name(stem, fx, fy, asset.media_rev or 0)
+    base = Path(settings.STORAGE_DIR)
+    fmts = formats()
+
+    manifest = {"asset_id": asset.id, "stem": stem, "name": name, "focal": [fx, fy], "formats": fmts, "crops": {}}
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as im0:
+        im0 = ImageOps.exif_transpose(im0).convert("RGB")
+        if is_original:
+            im0 = _rotate(im0, asset.orientation or 0)
+        for crop, (aspect, widths) in CROPS.items():
+            box = focal_crop(im0.width, im0.height, aspect, fx, fy)
+            cropped = im0.crop(box)
+            done = []
+            for w in widths:
+                # لا تكبير: أعرض مما في المصدر لا فائدة منه
+                if w > cropped.width and done:
+                    break
+                tw = min(w, cropped.width)
+                im = cropped.resize((tw, max(1, round(tw / aspect))), Image.Resampling.LANCZOS)
+                for fmt in fmts:
+                    out = base / rendition_rel(asset.album_id, crop, w, name, fmt)
+                    out.parent.mkdir(parents=True, exist_ok=True)
+                    kw = {"quality": QUALITY[fmt]}
+                    if fmt == "jpg":
+                        im.save(out, "JPEG", optimize=True, progressive=True, **kw)
+                    elif fmt == "webp":
+                        im.save(out, "WEBP", method=4, **kw)
+                    else:
+                        im.save(out, "AVIF", **kw)
+                done.append([w, tw])
+            manifest["crops"][crop] = {"aspect": aspect, "widths": done}
+    return manifest
+
+
+def generate_job(album_id: int) -> None:
+    """
+    Background job (own DB session): render the current cover of an album
+    and queue the previous renditions for deletion when their name changed
+    (another asset, focal point or rotation).
+    """
+    db = SessionLocal()
+    try:
+        album = db.get(models.Album, album_id)
+        if album is None:
+            return
+        old = load_manifest(album)
+        asset = db.get(models.Asset, album.cover_asset_id) if album.cover_asset_id else None
+        manifest = None
+        if asset is not None:
+            try:
+                manifest = render(asset)
+            except Exception:
+                log.exception("cover render failed", extra={"album_id": album_id})
+        if old and (manifest is None or manifest_name(old) != manifest["name"]):
+            trash.enqueue(db, _named_paths(album_id, manifest_name(old)), [])
+        album.cover_renditions = json.dumps(manifest) if manifest else None
+        db.commit()
+    finally:
+        db.close()
+
+
+def load_manifest(album: models.Album) -> Optional[dict]:
+    try:
+        return json.loads(album.cover_renditions) if album.cover_renditions else None
+    except ValueError:
+        return None
+
+
+def hero_picture(album: models.Album, asset_id: int) -> Optional[dict]:
+    """
+    <picture> sources + preload hint for the public hero, or None when the
+    album has no renditions for this asset yet.
+    """
+    m = load_manifest(album)
+    if not m or m.get("asset_id") != asset_id or not m.get("crops"):
+        return None
+
+    name = manifest_name(m)
+
+    def _srcset(crop: str, fmt: str) -> str:
+        return ", ".join(
+            f"{signing.media_url(rendition_rel(album.id, crop, w, name, fmt))} {tw}w"
+            for w, tw in m["crops"][crop]["widths"]
+        )
+
+    sources, preloads = [], []
+    for crop, media in (("portrait", "(orientation: portrait)"), ("landscape", "(orientation: landscape)")):
+        if crop not in m["crops"]:
+            continue
+        for fmt in m["formats"]:
+            sources.append({"media": media, "type": MIME[fmt], "srcset": _srcset(crop, fmt)})
+        # preload بـ WebP (مدعوم في كل المتصفحات الحديثة) لكل اتجاه
+        preloads.append({"media": media, "srcset": _srcset(crop, "webp"), "type": MIME["webp"]})
+
+    crop = "landscape" if "landscape" in m["crops"] else "portrait"
+    widths = m["crops"][crop]["widths"]
+    fallback_w = widths[min(1, len(widths) - 1)][0]
+    fx, fy = m.get("focal") or [0.5, 0.5]
+    return {
+        "sources": sources,
+        "fallback": signing.media_url(rendition_rel(album.id, crop, fallback_w, name, "jpg")),
+        "preloads": preloads,
+        "position": f"{fx * 100:.0f}% {fy * 100:.0f}%",
+    }
+
+
+def preload_link(picture: dict) -> str:
+    """``Link`` header preloading the hero (a proxy or CDN can turn it into 103 Early Hints)."""
+    return ", ".join(
+        f'<{p["srcset"].split(" ", 1)[0]}>; rel=preload; as=image; type="{p["type"]}"; '
+        f'media="{p["media"]}"; imagesrcset="{p["srcset"]}"; imagesizes="100vw"; fetchpriority=high'
+        for p in picture["preloads"]
+    )
@@ -0,0 +1,71 @@
+# app/services/delivery.py
+from __future__ import annotations
+
+import mimetypes
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from starlette.responses import FileResponse, Response
+
+from ..config import settings
+from ..metrics import set_source
+
+ACCEL = "x-accel"       # nginx: X-Accel-Redirect إلى location داخلي
+SENDFILE = "x-sendfile"  # Apache mod_xsendfile / lighttpd: المسار المطلق
+
+
+def _content_disposition(filename: str) -> str:
+    # نفس صيغة starlette FileResponse
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _accel_uri(path: Path) -> Optional[str]:
+    """Internal URI of a file under STORAGE_DIR, or None if it lives elsewhere."""
+    try:
+        rel = path.resolve().relative_to(Path(settings.STORAGE_DIR).resolve())
+    except ValueError:
+        return None
+    return settings.FILE_OFFLOAD_PREFIX.rstrip("/") + "/" + quote(rel.as_posix())
+
+
+def file_response(
+    path: Path,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Response:
+    """
+    Send a local file, authorized already by the caller.
+
+    With FILE_OFFLOAD set, only headers are returned and the front server
+    streams the bytes (sendfile, range requests) so workers are free
+    right away. Without it, or for files outside STORAGE_DIR in x-accel
+    mode, this is a plain FileResponse.
+    """
+    mode = (settings.FILE_OFFLOAD or "").lower()
+    if mode not in (ACCEL, SENDFILE):
+        set_source("local")
+        return FileResponse(path, media_type=media_type, filename=filename)
+
+    if mode == ACCEL:
+        target = _accel_uri(path)
+        if target is None:
+            set_source("local")
+            return FileResponse(path, media_type=media_type, filename=filename)
+        headers = {"X-Accel-Redirect": target}
+    else:
+        headers = {"X-Sendfile": str(path.resolve())}
+
+    # البايتات يرسلها الخادم الأمامي؛ نحسب حجم الملف بدل الجسم الفارغ
+    try:
+        set_source("offload", path.stat().st_size)
+    except OSError:
+        set_source("offload")
+
+    if filename:
+        headers["Content-Disposition"] = _content_disposition(filename)
+    media_type = media_type or mimetypes.guess_type(filename or path.name)[0] or "application/octet-stream"
+    return Response(status_code=200, media_type=media_type, headers=headers)
@@ -0,0 +1,101 @@
+# app/services/exif.py
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import Optional
+
+ORIENTATION_TAG = 0x0112
+
+# دورة قيم EXIF Orientation عند التدوير 90° مع عقارب الساعة
+_CW = {1: 6, 6: 3, 3: 8, 8: 1, 2: 7, 7: 4, 4: 5, 5: 2}
+_CCW = {v: k for k, v in _CW.items()}
+
+
+def next_orientation(current: int, clockwise: bool) -> int:
+    """Return the EXIF orientation value after a further 90° turn."""
+    table = _CW if clockwise else _CCW
+    return table.get(current, 6 if clockwise else 8)
+
+
+def _find_orientation_offset(f) -> Optional[tuple[int, str]]:
+    """
+    Locate the IFD0 Orientation entry of a JPEG file.
+
+    Returns:
+        (absolute offset of the SHORT value, struct byte-order prefix) or None
+        when the file is not a JPEG or carries no Orientation tag.
+    """
+    f.seek(0)
+    if f.read(2) != b"\xff\xd8":
+        return None
+
+    pos = 2
+    while True:
+        f.seek(pos)
+        head = f.read(4)
+        if len(head) < 4 or head[0] != 0xFF:
+            return None
+        code = head[1]
+        if code in (0xDA, 0xD9):  # SOS / EOI: لا ميتاداتا بعدها
+            return None
+        seglen = struct.unpack(">H", head[2:])[0]
+        if seglen < 2:
+            return None
+
+        if code == 0xE1:
+            data = f.read(seglen - 2)
+            if len(data) < seglen - 2:  # المقطع مقطوع: لا نثق بالإزاحات
+                return None
+            if data[:6] == b"Exif\x00\x00":
+                tiff = data[6:]
+                if tiff[:2] == b"II":
+                    bo = "<"
+                elif tiff[:2] == b"MM":
+                    bo = ">"
+                else:
+                    return None
+                ifd0 = struct.unpack(bo + "I", tiff[4:8])[0]
+                if ifd0 + 2 > len(tiff):
+                    return None
+                count = struct.unpack(bo + "H", tiff[ifd0:ifd0 + 2])[0]
+                for i in range(count):
+                    entry = ifd0 + 2 + i * 12
+                    if entry + 12 > len(tiff):
+                        return None
+                    tag, typ = struct.unpack(bo + "HH", tiff[entry:entry + 4])
+                    if tag == ORIENTATION_TAG and typ == 3:
+                        return pos + 4 + 6 + entry + 8, bo
+                return None
+
+        pos += 2 + seglen
+
+
+def rotate_orientation(path: Path, clockwise: bool) -> Optional[int]:
+    """
+    Rotate a JPEG by rewriting its EXIF Orientation value in place.
+
+    Only the two bytes of the tag are touched, so the image data is never
+    decoded or re-encoded.
+
+    Returns:
+        The new orientation value, or None if the file has no Orientation tag
+        (the caller should then record the rotation elsewhere).
+    """
+    path = Path(path)
+    if path.suffix.lower() not in (".jpg", ".jpeg"):
+        return None
+    try:
+        with open(path, "r+b") as f:
+            found = _find_orientation_offset(f)
+            if not found:
+                return None
+            offset, bo = found
+            f.seek(offset)
+            current = struct.unpack(bo + "H", f.read(2))[0]
+            new = next_orientation(current, clockwise)
+            f.seek(offset)
+            f.write(struct.pack(bo + "H", new))
+            return new
+    except (OSError, struct.error):
+        return None
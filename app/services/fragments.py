@@ -0,0 +1,76 @@
+# app/services/fragments.py
+"""
+Per-asset HTML fragments of the public gallery.
+
+Rendering a big album page is mostly the same ``<figure>`` repeated for
+every asset, and each one also signs its URLs and stats its thumbnail.
+Here every asset keeps its last rendered fragment, valid while these
+stay the same: ``updated_at``, the gallery_item macro source, the share
+context (slug + asset token) and the media signing bucket. After an edit
+the page cache misses and the page is reassembled; only the assets that
+changed are rendered again.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Hashable, Iterable, Tuple
+
+from markupsafe import Markup
+from sqlalchemy import event
+
+from .. import models, profiling
+from ..config import settings
+from ..templating import templates
+from . import signing
+from .share_cache import TTLCache
+
+TEMPLATE = "partials/_gallery_item.html"
+
+# asset_id -> (مفتاح الصلاحية, HTML)؛ جزء واحد لكل أصل
+fragments: TTLCache[Tuple[Hashable, Markup]] = TTLCache(settings.FRAGMENT_CACHE_TTL, maxsize=settings.FRAGMENT_CACHE_MAX)
+
+_compiled: tuple = (None, None, "")    # (Template, macro, إصدار المصدر)
+
+
+def _macro() -> Tuple[Callable[..., Markup], str]:
+    """The compiled gallery_item macro and a hash of its source (a reloaded template gets a new one)."""
+    global _compiled
+    tpl = templates.get_template(TEMPLATE)
+    if tpl is not _compiled[0]:
+        source, _, _ = templates.env.loader.get_source(templates.env, TEMPLATE)
+        _compiled = (tpl, tpl.module.gallery_item, hashlib.sha1(source.encode()).hexdigest()[:12])
+    return _compiled[1], _compiled[2]
+
+
+def render_items(
+    assets: Iterable[models.Asset],
+    context: Hashable,
+    to_dict: Callable[[models.Asset], dict],
+    fallback_alt: str,
+) -> Markup:
+    """
+    Gallery items of ``assets`` in order. ``context`` is whatever else
+    ends up in the markup besides the asset row (slug and asset token);
+    ``to_dict`` builds the macro input and only runs on a miss.
+    """
+    macro, version = _macro()
+    shared = (version, context, signing.media_epoch(), fallback_alt)
+    parts = []
+    with profiling.span("template", "gallery items"):
+        for a in assets:
+            key = (a.updated_at, shared)
+            hit = fragments.get(a.id, None)
+            if hit is not None and hit[0] == key:
+                parts.append(hit[1])
+                continue
+            html = macro(to_dict(a), fallback_alt)
+            fragments.set(a.id, (key, html))
+            parts.append(html)
+    return Markup("".join(parts))
+
+
+# updated_at بدقة ثانية في SQLite: تعديلات هذا العامل تُسقط الجزء فورًا
+@event.listens_for(models.Asset, "after_update")
+@event.listens_for(models.Asset, "after_delete")
+def _asset_changed(mapper, connection, target):
+    fragments.pop(target.id)
@@ -3,9 +3,11 @@ from __future__ import annotations
 
 import io
 import time
+from pathlib import Path
 from typing import Any, Dict, Iterator, Optional
 
 from app.config import settings
+from app.metrics import drive_call, set_source
 
 # ======================================================
 # Google Drive client bootstrap (lazy init)
@@ -57,6 +59,7 @@ def _service():
 # Utilities
 # ======================================================
 
+@drive_call("ensure_folder")
 def ensure_subfolder(service, parent_id: str, name: str) -> str:
     """
     يتأكد من وجود مجلد فرعي داخل parent، ويُنشئه إن لم يوجد.
@@ -92,6 +95,7 @@ def ensure_subfolder(service, parent_id: str, name: str) -> str:
     return folder["id"]
 
 
+@drive_call("upload")
 def upload_bytes(
     service,
     folder_id: str,
@@ -123,6 +127,44 @@ def upload_bytes(
     return file["id"]
 
 
+@drive_call("upload")
+def upload_file(
+    service,
+    folder_id: str,
+    path,
+    mime: Optional[str],
+    filename: Optional[str] = None,
+    chunk_size: int = 8 * 1024 * 1024,
+) -> str:
+    """
+    رفع ملف من القرص على دفعات (resumable): الذاكرة بحجم دفعة واحدة
+    مهما كبر الملف (فيديو، RAW).
+    """
+    if service is None:
+        service = _service()
+
+    from googleapiclient.http import MediaFileUpload
+
+    meta = {"name": filename or Path(path).name, "parents": [folder_id]}
+    media = MediaFileUpload(
+        str(path),
+        mimetype=mime or "application/octet-stream",
+        chunksize=chunk_size,
+        resumable=True,
+    )
+    request = service.files().create(
+        body=meta,
+        media_body=media,
+        fields="id",
+        supportsAllDrives=True,
+    )
+    response = None
+    while response is None:
+        _status, response = request.next_chunk()
+    return response["id"]
+
+
+@drive_call("get_meta")
 def get_meta(file_id: str) -> Dict[str, Any]:
     """
     جلب ميتاداتا باستخدام الخدمة العالمية.
@@ -135,6 +177,7 @@ def get_meta(file_id: str) -> Dict[str, Any]:
     ).execute()
 
 
+@drive_call("get_meta")
 def get_metadata(service, file_id: str, fields: str = "id,name,mimeType,size") -> Dict[str, Any]:
     """
     جلب ميتاداتا باستخدام خدمة معيّنة.
@@ -152,10 +195,12 @@ def get_metadata(service, file_id: str, fields: str = "id,name,mimeType,size") -
 # Download / Streaming (MediaIoBaseDownload)
 # ======================================================
 
+@drive_call("download")
 def download_to_generator(file_id: str, chunk_size: int = 1 * 1024 * 1024) -> Iterator[bytes]:
     """
     تنزيل ملف على دفعات باستخدام MediaIoBaseDownload.
     """
+    set_source("drive")
     service = _service()
     request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
 
@@ -180,12 +225,14 @@ def download_to_generator(file_id: str, chunk_size: int = 1 * 1024 * 1024) -> It
             backoff = min(backoff * 2, 10.0)
 
 
+@drive_call("download")
 def download_to_generator_with_service(
     service, file_id: str, chunk_size: int = 1_048_576
 ) -> Iterator[bytes]:
     """
     تنزيل ملف باستخدام خدمة صريحة (بدل الخدمة العالمية).
     """
+    set_source("drive")
     if service is None:
         service = _service()
     request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
@@ -220,10 +267,12 @@ def stream_file(file_id: str, chunk_size: int = 1_048_576) -> Iterator[bytes]:
 # Direct HTTP streaming via AuthorizedSession (Range requests)
 # ======================================================
 
+@drive_call("download")
 def stream_via_requests(file_id: str, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
     """
     بث مباشر باستخدام AuthorizedSession وRange.
     """
+    set_source("drive")
     _init_gdrive()
     # استيراد هنا لتكوين AuthorizedSession وقت الحاجة
     from google.auth.transport.requests import AuthorizedSession as _AuthorizedSession  # noqa: F401
@@ -260,6 +309,7 @@ def stream_via_requests(file_id: str, chunk_size: int = 256 * 1024) -> Iterator[
 # Permissions
 # ======================================================
 
+@drive_call("make_public")
 def make_public(file_id: str) -> None:
     """
     جعل الملف متاحًا لأي شخص معه الرابط.
@@ -274,3 +324,118 @@ def make_public(file_id: str) -> None:
     except Exception:
         # يمكن إضافة logging هنا إذا رغبت
         pass
+
+
+# ======================================================
+# Deletion / listing
+# ======================================================
+
+_BATCH_LIMIT = 100  # حد Drive لعدد الطلبات داخل batch واحد
+
+
+def _is_not_found(exc: Exception) -> bool:
+    resp = getattr(exc, "resp", None)
+    return getattr(resp, "status", None) == 404
+
+
+@drive_call("delete")
+def delete_file(file_id: str) -> None:
+    """
+    حذف ملف واحد نهائيًا. الملف غير الموجود (404) يُعتبر محذوفًا.
+    """
+    service = _service()
+    try:
+        service.files().delete(fileId=file_id, supportsAllDrives=True).execute()
+    except Exception as e:
+        if not _is_not_found(e):
+            raise
+
+
+@drive_call("delete_batch")
+def delete_files(file_ids: list[str]) -> Dict[str, Optional[str]]:
+    """
+    حذف عدة ملفات عبر Drive batch API (حتى 100 طلب في كل دفعة HTTP).
+
+    Returns:
+        dict: file_id -> None عند النجاح، أو نص الخطأ عند الفشل.
+    """
+    service = _service()
+    results: Dict[str, Optional[str]] = {}
+
+    def _callback(request_id, response, exception):
+        if exception is not None and not _is_not_found(exception):
+            results[request_id] = str(exception)
+        else:
+            results[request_id] = None
+
+    for i in range(0, len(file_ids), _BATCH_LIMIT):
+        chunk = file_ids[i:i + _BATCH_LIMIT]
+        batch = service.new_batch_http_request(callback=_callback)
+        for file_id in chunk:
+            batch.add(
+                service.files().delete(fileId=file_id, supportsAllDrives=True),
+                request_id=file_id,
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            for file_id in chunk:
+                results.setdefault(file_id, str(e))
+    return results
+
+
+@drive_call("find_folder")
+def find_subfolder(service, parent_id: str, name: str) -> Optional[str]:
+    """
+    مثل ensure_subfolder لكن بدون إنشاء: يعيد None إن لم يوجد المجلد.
+    """
+    if service is None:
+        service = _service()
+    query = (
+        f"'{parent_id}' in parents and name='{name}' and "
+        "mimeType='application/vnd.google-apps.folder' and trashed=false"
+    )
+    result = service.files().list(
+        q=query,
+        fields="files(id,name)",
+        supportsAllDrives=True,
+        includeItemsFromAllDrives=True,
+        corpora="allDrives",
+    ).execute()
+    files = result.get("files") or []
+    return files[0]["id"] if files else None
+
+
+@drive_call("list")
+def iter_children(service, folder_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    المرور على عناصر مجلد (مع الترقيم) بدون تحميل القائمة كاملة في الذاكرة.
+    """
+    if service is None:
+        service = _service()
+    page_token = None
+    while True:
+        result = service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            fields="nextPageToken, files(id,name,mimeType,size,createdTime)",
+            pageSize=1000,
+            pageToken=page_token,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True,
+            corpora="allDrives",
+        ).execute()
+        yield from result.get("files") or []
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            break
+
+
+def walk_files(service, folder_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    كل الملفات (غير المجلدات) تحت مجلد بشكل تعاودي.
+    """
+    for item in iter_children(service, folder_id):
+        if item.get("mimeType") == "application/vnd.google-apps.folder":
+            yield from walk_files(service, item["id"])
+        else:
+            yield item
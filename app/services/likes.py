@@ -0,0 +1,152 @@
+# app/services/likes.py
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from . import selections, writer
+
+log = logging.getLogger(__name__)
+
+Key = Tuple[int, str]  # (asset_id, visitor_id)
+
+# /s/<slug>/file/<id> أو /s/<slug>/thumb/<id>: صيغة url في العملاء القدامى وجدول likes القديم
+ASSET_URL_RE = re.compile(r"/s/([^/?#]+)/(?:file|thumb)/(\d+)")
+
+# آخر حالة مطلوبة لكل (asset, visitor) بانتظار الكتابة
+_pending: Dict[Key, bool] = {}
+# اختيارات الطباعة المصاحبة لكل نقرة: (share_id, visitor_id, asset_id)
+_picks: Dict[selections.Change, bool] = {}
+_lock = threading.Lock()
+_timer: Optional[threading.Timer] = None
+
+
+def parse_asset_url(url: str) -> Tuple[Optional[str], Optional[int]]:
+    """(slug, asset_id) from a public file/thumb URL, or (None, None)."""
+    m = ASSET_URL_RE.search(url or "")
+    return (m.group(1), int(m.group(2))) if m else (None, None)
+
+
+def _insert_ignore(db: Session):
+    """INSERT ... ON CONFLICT DO NOTHING حسب محرك قاعدة البيانات."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(models.Like)
+
+
+def apply(db: Session, changes: Dict[Key, bool]) -> Dict[int, int]:
+    """
+    Apply like/unlike changes idempotently and keep Asset.like_count in step.
+
+    A like is an upsert that inserts nothing when the row already exists;
+    an unlike deletes at most one row. Only rows that actually changed
+    move the counter, so repeated clicks never drift it. The caller commits.
+
+    Returns:
+        dict: asset_id -> applied counter delta.
+    """
+    deltas: Dict[int, int] = {}
+    for (asset_id, visitor_id), liked in changes.items():
+        if liked:
+            stmt = _insert_ignore(db).values(asset_id=asset_id, visitor_id=visitor_id)
+            stmt = stmt.on_conflict_do_nothing(index_elements=["asset_id", "visitor_id"])
+            # RETURNING بدل rowcount: psycopg يعيد -1 لـ INSERT عبر ORM
+            delta = len(db.execute(stmt.returning(models.Like.asset_id)).all())
+        else:
+            res = db.execute(
+                delete(models.Like).where(
+                    models.Like.asset_id == asset_id,
+                    models.Like.visitor_id == visitor_id,
+                )
+            )
+            delta = -(res.rowcount or 0)
+        if delta:
+            deltas[asset_id] = deltas.get(asset_id, 0) + delta
+
+    for asset_id, delta in deltas.items():
+        db.execute(
+            update(models.Asset)
+            .where(models.Asset.id == asset_id)
+            # updated_at يبقى كما هو: العدّاد ليس جزءًا من الصفحة المخزّنة (page_cache.album_version)
+            .values(like_count=models.Asset.like_count + delta, updated_at=models.Asset.updated_at)
+        )
+    return deltas
+
+
+def flush() -> int:
+    """
+    Write every pending like and selection change through the single
+    writer, in one job. Returns the number of like changes.
+    """
+    global _timer
+    with _lock:
+        changes, picks = dict(_pending), dict(_picks)
+        _pending.clear()
+        _picks.clear()
+        _timer = None
+    if not changes and not picks:
+        return 0
+
+    def _write(db: Session) -> None:
+        apply(db, changes)
+        selections.apply(db, picks)
+
+    try:
+        writer.run(_write)
+    except Exception:
+        log.exception("likes flush failed")
+        # أعد ما لم يُكتب دون أن نطغى على نقرات أحدث وصلت أثناء المحاولة
+        with _lock:
+            for key, liked in changes.items():
+                _pending.setdefault(key, liked)
+            for key, selected in picks.items():
+                _picks.setdefault(key, selected)
+        return 0
+    return len(changes)
+
+
+def record(asset_id: int, visitor_id: str, liked: bool, share_id: Optional[int] = None) -> None:
+    """
+    Queue a like/unlike, and with ``share_id`` the matching selection
+    change. Bursts within LIKES_FLUSH_DELAY are coalesced: only the last
+    state per (asset, visitor) is written, all in one commit.
+    """
+    global _timer
+    with _lock:
+        _pending[(asset_id, visitor_id)] = bool(liked)
+        if share_id is not None:
+            _picks[(share_id, visitor_id, asset_id)] = bool(liked)
+        if _timer is None:
+            delay = float(getattr(settings, "LIKES_FLUSH_DELAY", 0.5))
+            _timer = threading.Timer(delay, flush)
+            _timer.daemon = True
+            _timer.start()
+
+
+def has_pending() -> bool:
+    return bool(_pending or _picks)
+
+
+def album_counts(db: Session, album_id: int) -> Dict[int, int]:
+    """Like counts of every liked asset in an album, in one query on the counter column."""
+    rows = db.query(models.Asset.id, models.Asset.like_count).filter(
+        models.Asset.album_id == album_id,
+        models.Asset.like_count > 0,
+    )
+    return {asset_id: count for asset_id, count in rows}
+
+
+def delete_for_assets(db: Session, asset_ids: Iterable[int]) -> None:
+    """Remove like rows of deleted assets (SQLite does not cascade without PRAGMA foreign_keys)."""
+    ids = list(asset_ids)
+    if ids:
+        db.execute(delete(models.Like).where(models.Like.asset_id.in_(ids)))
@@ -0,0 +1,221 @@
+# app/services/page_cache.py
+"""
+Rendered public album pages.
+
+By default every worker keeps its own pages in memory. With
+PAGE_CACHE_DIR set (preload/multi-worker deployments) pages and their
+compressed forms live on disk instead: one copy shared by all workers
+through the OS page cache, compressed once for all of them.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .. import models
+from ..config import settings
+from ..metrics import set_source
+from .compression import choose_encoding, compress
+from .share_cache import TTLCache
+
+
+class CachedPage:
+    """A rendered page plus its compressed forms, each computed at most once."""
+
+    __slots__ = ("album_id", "body", "media_type", "headers", "path", "_encoded", "_lock")
+
+    def __init__(
+        self,
+        album_id: int,
+        body: bytes,
+        media_type: str,
+        headers: Optional[Dict[str, str]] = None,
+        path: Optional[Path] = None,
+    ):
+        self.album_id = album_id
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers or {}
+        self.path = path          # stem على القرص (DiskPages) أو None
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = self._load_encoded(encoding)
+        return data
+
+    def _load_encoded(self, encoding: str) -> bytes:
+        if self.path is None:
+            return compress(self.body, encoding)
+        f = self.path.with_suffix("." + encoding)
+        try:
+            return f.read_bytes()
+        except FileNotFoundError:
+            data = compress(self.body, encoding)
+            _write_atomic(f, data)   # عامل واحد يضغط، الباقون يقرؤون
+            return data
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class DiskPages:
+    """
+    Pages shared by all workers under one directory.
+
+    ``<digest>.body`` holds the HTML, ``<digest>.json`` the metadata and
+    ``<digest>.br``/``.gzip`` the compressed forms. An edit seen by any
+    worker writes ``album-<id>.gen``; pages written before it are misses.
+    """
+
+    PRUNE_EVERY = 50
+
+    def __init__(self, root: Path, ttl: float, maxsize: int):
+        self.root = root
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._puts = 0
+        root.mkdir(parents=True, exist_ok=True)
+
+    def _stem(self, key: Hashable) -> Path:
+        return self.root / hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def _gen(self, album_id: int) -> float:
+        try:
+            return float((self.root / f"album-{album_id}.gen").read_text())
+        except (OSError, ValueError):
+            return 0.0
+
+    def get(self, key: Hashable, default=None) -> Optional[CachedPage]:
+        stem = self._stem(key)
+        try:
+            meta = json.loads(stem.with_suffix(".json").read_bytes())
+            if meta["created"] + self.ttl < time.time() or meta["created"] <= self._gen(meta["album_id"]):
+                return default
+            body = stem.with_suffix(".body").read_bytes()
+        except (OSError, ValueError, KeyError):
+            return default
+        return CachedPage(meta["album_id"], body, meta["media_type"], meta["headers"], path=stem)
+
+    def set(self, key: Hashable, page: CachedPage) -> None:
+        stem = self._stem(key)
+        for old in stem.parent.glob(stem.name + ".*"):
+            if not old.name.endswith(".tmp"):
+                old.unlink(missing_ok=True)   # ضغطات نسخة سابقة بنفس المفتاح
+        _write_atomic(stem.with_suffix(".body"), page.body)
+        meta = {"album_id": page.album_id, "media_type": page.media_type, "headers": page.headers, "created": time.time()}
+        _write_atomic(stem.with_suffix(".json"), json.dumps(meta).encode())
+        page.path = stem
+        self._puts += 1
+        if self._puts % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def invalidate_album(self, album_id: int) -> None:
+        _write_atomic(self.root / f"album-{album_id}.gen", repr(time.time()).encode())
+
+    def prune(self) -> None:
+        """Drop expired pages, then the oldest beyond PAGE_CACHE_MAX."""
+        metas = sorted(self.root.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        cutoff = time.time() - self.ttl
+        for i, meta in enumerate(metas):
+            if i >= self.maxsize or meta.stat().st_mtime < cutoff:
+                for f in self.root.glob(meta.stem + ".*"):
+                    if not f.name.endswith(".tmp"):
+                        f.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for f in self.root.iterdir():
+            f.unlink(missing_ok=True)
+
+
+if settings.PAGE_CACHE_DIR:
+    pages = DiskPages(Path(settings.PAGE_CACHE_DIR), settings.PAGE_CACHE_TTL, settings.PAGE_CACHE_MAX)
+else:
+    pages = TTLCache(settings.PAGE_CACHE_TTL, maxsize=settings.PAGE_CACHE_MAX)
+
+
+def album_version(db: Session, album_id: int) -> tuple:
+    """
+    Cheap fingerprint of everything a public album page shows, from one
+    aggregate query: album row, asset and video counts and their latest
+    updated_at. It catches edits made by other workers; edits in this
+    worker also drop pages right away through the ORM events below
+    (updated_at only has one-second resolution on SQLite).
+    """
+    A, V = models.Asset, models.Video
+    row = db.execute(
+        select(
+            select(models.Album.updated_at).where(models.Album.id == album_id).scalar_subquery(),
+            select(func.count(A.id)).where(A.album_id == album_id).scalar_subquery(),
+            select(func.max(A.updated_at)).where(A.album_id == album_id).scalar_subquery(),
+            select(func.count(V.id)).where(V.album_id == album_id).scalar_subquery(),
+            select(func.max(V.updated_at)).where(V.album_id == album_id).scalar_subquery(),
+        )
+    ).one()
+    return tuple(row)
+
+
+def get(key: Hashable) -> Optional[CachedPage]:
+    return pages.get(key, None)
+
+
+def put(
+    key: Hashable, album_id: int, body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None
+) -> CachedPage:
+    page = CachedPage(album_id, body, media_type, headers)
+    pages.set(key, page)
+    return page
+
+
+def respond(page: CachedPage, request: Request) -> Response:
+    """Send the cached body, compressed once per encoding when the client accepts it."""
+    encoding = None
+    if len(page.body) >= settings.COMPRESS_MIN_SIZE:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    set_source("cache")
+    headers = {**page.headers, "Vary": "Accept-Encoding"}
+    if encoding is None:
+        return Response(page.body, media_type=page.media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(page.encoded(encoding), media_type=page.media_type, headers=headers)
+
+
+def invalidate_album(album_id: int) -> None:
+    if isinstance(pages, DiskPages):
+        pages.invalidate_album(album_id)
+    else:
+        pages.discard_where(lambda p: p.album_id == album_id)
+
+
+@event.listens_for(models.Asset, "after_insert")
+@event.listens_for(models.Asset, "after_update")
+@event.listens_for(models.Asset, "after_delete")
+@event.listens_for(models.Video, "after_insert")
+@event.listens_for(models.Video, "after_update")
+@event.listens_for(models.Video, "after_delete")
+def _child_changed(mapper, connection, target):
+    invalidate_album(target.album_id)
+
+
+@event.listens_for(models.Album, "after_update")
+@event.listens_for(models.Album, "after_delete")
+def _album_changed(mapper, connection, target):
+    invalidate_album(target.id)
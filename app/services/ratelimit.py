@@ -0,0 +1,53 @@
+# app/services/ratelimit.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Hashable, Tuple
+
+
+class TokenBucket:
+    """
+    Keyed token buckets (one per slug, one per IP, ...).
+
+    Each key holds up to ``burst`` tokens refilled at ``rate_per_min``;
+    idle buckets that are full again are dropped so memory stays bounded.
+    A rate of 0 disables the limit (every take() is allowed).
+    """
+
+    def __init__(self, burst: int, rate_per_min: float, max_keys: int = 50_000):
+        self.burst = float(burst)
+        self.rate = rate_per_min / 60.0
+        self.max_keys = max_keys
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}  # key -> (tokens, last)
+        self._lock = threading.Lock()
+
+    def take(self, key: Hashable) -> float:
+        """
+        Consume one token.
+
+        Returns:
+            float: 0 when allowed, otherwise seconds until a token is available.
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+
+    def _prune(self, now: float) -> None:
+        full_after = self.burst / self.rate
+        for k in [k for k, (_, last) in self._buckets.items() if now - last >= full_after]:
+            del self._buckets[k]
+        if len(self._buckets) >= self.max_keys:
+            # لا يزال ممتلئًا: تخلّص من الأقدم
+            for k in list(self._buckets)[: self.max_keys // 10]:
+                del self._buckets[k]
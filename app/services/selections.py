@@ -0,0 +1,205 @@
+# app/services/selections.py
+from __future__ import annotations
+
+import csv
+import io
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from . import gdrive
+from .zips import stream_zip
+
+Change = Tuple[int, str, int]  # (share_id, visitor_id, asset_id)
+
+
+def pack(ids: List[int]) -> bytes:
+    """قائمة مرتبة -> uint32 little-endian."""
+    arr = array("I", ids)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpack(data: bytes | None) -> List[int]:
+    arr = array("I")
+    if data:
+        arr.frombytes(data)
+        if sys.byteorder == "big":
+            arr.byteswap()
+    return arr.tolist()
+
+
+def get(db: Session, share_id: int, visitor_id: str) -> List[int]:
+    sel = db.get(models.Selection, (share_id, visitor_id))
+    return unpack(sel.asset_ids) if sel else []
+
+
+def _insert_empty(db: Session, share_id: int, visitor_id: str) -> None:
+    """Empty selection row; a concurrent first toggle may have created it already."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(models.Selection).values(share_id=share_id, visitor_id=visitor_id, asset_ids=b"", count=0)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["share_id", "visitor_id"]))
+
+
+def _update(db: Session, share_id: int, visitor_id: str, changes: Dict[int, bool]) -> int:
+    key = (share_id, visitor_id)
+    sel = db.get(models.Selection, key, with_for_update=True)
+    if sel is None:
+        if not any(changes.values()):
+            return 0
+        _insert_empty(db, share_id, visitor_id)
+        sel = db.get(models.Selection, key, with_for_update=True, populate_existing=True)
+
+    ids = unpack(sel.asset_ids)
+    changed = False
+    for asset_id, selected in changes.items():
+        i = bisect_left(ids, asset_id)
+        present = i < len(ids) and ids[i] == asset_id
+        if selected and not present:
+            ids.insert(i, asset_id)
+        elif not selected and present:
+            del ids[i]
+        else:
+            continue
+        changed = True
+
+    if changed:
+        sel.asset_ids = pack(ids)
+        sel.count = len(ids)
+    return len(ids)
+
+
+def toggle(db: Session, share: models.ShareLink, visitor_id: str, asset_id: int, selected: bool) -> int:
+    """
+    Add or remove one asset in a visitor's selection (binary search on the
+    sorted array). The caller commits.
+
+    The row is read ``FOR UPDATE``: on PostgreSQL two toggles of the same
+    visitor from different workers wait for each other instead of
+    overwriting the packed array. SQLite ignores the clause; its writer
+    connection takes the write lock at BEGIN (database.sqlite_split).
+
+    Returns:
+        int: the selection size after the change.
+    """
+    return _update(db, share.id, visitor_id, {asset_id: selected})
+
+
+def apply(db: Session, changes: Dict[Change, bool]) -> None:
+    """Apply buffered toggles (services/likes), one row update per visitor. The caller commits."""
+    grouped: Dict[Tuple[int, str], Dict[int, bool]] = {}
+    for (share_id, visitor_id, asset_id), selected in changes.items():
+        grouped.setdefault((share_id, visitor_id), {})[asset_id] = selected
+    for (share_id, visitor_id), per_asset in grouped.items():
+        _update(db, share_id, visitor_id, per_asset)
+
+
+def album_summary(db: Session, album_id: int) -> Dict[str, object]:
+    """
+    Summarize all selections of an album's share links with one query.
+
+    Returns:
+        dict with ``visitors`` (one entry per share/visitor) and ``assets``
+        (asset_id -> number of visitors who selected it).
+    """
+    rows = (
+        db.query(
+            models.Selection.share_id,
+            models.ShareLink.slug,
+            models.Selection.visitor_id,
+            models.Selection.asset_ids,
+            models.Selection.updated_at,
+        )
+        .join(models.ShareLink, models.ShareLink.id == models.Selection.share_id)
+        .filter(models.ShareLink.album_id == album_id, models.Selection.count > 0)
+        .order_by(models.Selection.updated_at.desc())
+        .all()
+    )
+    per_asset: Counter = Counter()
+    visitors = []
+    for share_id, slug, visitor, packed, updated_at in rows:
+        ids = unpack(packed)
+        per_asset.update(ids)
+        visitors.append({
+            "share_id": share_id,
+            "slug": slug,
+            "visitor_id": visitor,
+            "count": len(ids),
+            "asset_ids": ids,
+            "updated_at": updated_at,
+        })
+    return {"visitors": visitors, "assets": dict(per_asset.most_common())}
+
+
+def _selected_assets(db: Session, share: models.ShareLink, visitor_id: str) -> List[models.Asset]:
+    ids = get(db, share.id, visitor_id)
+    if not ids:
+        return []
+    assets = (
+        db.query(models.Asset)
+        .filter(models.Asset.album_id == share.album_id, models.Asset.id.in_(ids))
+        .all()
+    )
+    assets.sort(key=lambda a: ((a.sort_order or 0), a.id))
+    return assets
+
+
+def iter_csv(db: Session, share: models.ShareLink, visitor_id: str) -> Iterator[str]:
+    """CSV متدفق للصور المختارة (للمطبعة أو لبرامج التحرير)."""
+    # الاستعلام يتم فورًا، قبل إغلاق جلسة الطلب؛ الكتابة فقط متدفقة
+    assets = _selected_assets(db, share, visitor_id)
+
+    def _rows() -> Iterator[str]:
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(["asset_id", "original_name", "filename"])
+        for a in assets:
+            w.writerow([a.id, a.original_name, Path(str(a.filename).replace("\\", "/")).name])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+        yield buf.getvalue()
+
+    return _rows()
+
+
+def _iter_file(path: Path, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def zip_originals(db: Session, share: models.ShareLink, visitor_id: str):
+    """
+    Streaming ZIP of the selected originals (stored, not deflated: the
+    files are already compressed images). Files are read lazily while the
+    archive is sent; Drive is used when the local original is gone.
+    """
+    base = Path(settings.STORAGE_DIR)
+    pairs = []
+    used: set[str] = set()
+    for a in _selected_assets(db, share, visitor_id):
+        path = base / str(a.filename).replace("\\", "/")
+        if path.exists():
+            gen = _iter_file(path)
+        elif settings.USE_GDRIVE and a.gdrive_file_id:
+            gen = gdrive.stream_via_requests(a.gdrive_file_id)
+        else:
+            continue
+        name = a.original_name or path.name
+        if name in used:
+            name = f"{a.id}-{name}"
+        used.add(name)
+        pairs.append((name, gen))
+    return stream_zip(pairs, compression="stored")
@@ -0,0 +1,165 @@
+# app/services/share_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+
+T = TypeVar("T")
+_MISSING = object()
+
+
+class TTLCache(Generic[T]):
+    """
+    Small in-process cache with per-entry TTL and a size bound.
+
+    Every worker has its own copy; the TTL bounds how stale another
+    worker can be after an edit (local edits invalidate immediately).
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            return default
+        return item[1]
+
+    def set(self, key: Hashable, value: T) -> None:
+        with self._lock:
+            if len(self._data) >= self.maxsize:
+                # أقدم المدخلات أولًا (ترتيب الإدراج في dict)
+                for k in list(self._data)[: max(1, self.maxsize // 10)]:
+                    self._data.pop(k, None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[T]]) -> Optional[T]:
+        value = self.get(key)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)  # None أيضًا يُخزَّن (slug غير موجود) لصدّ التخمين المتكرر
+        return value
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, pred: Callable[[Any], bool]) -> None:
+        with self._lock:
+            for k in [k for k, (_, v) in self._data.items() if v is not None and pred(v)]:
+                self._data.pop(k, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+@dataclass(frozen=True)
+class ShareInfo:
+    """What public routes need to know about a share link, without the ORM row."""
+
+    id: int
+    slug: str
+    album_id: int
+    expires_at: Optional[datetime]
+    password_hash: Optional[str]
+    allow_zip: bool
+    archived: bool
+
+
+@dataclass(frozen=True)
+class AssetInfo:
+    """File location of an asset for thumbnail/file responses."""
+
+    id: int
+    album_id: int
+    filename: str
+    original_name: Optional[str]
+    mime_type: Optional[str]
+    gdrive_file_id: Optional[str]
+    gdrive_thumb_id: Optional[str]
+
+
+shares: TTLCache[ShareInfo] = TTLCache(settings.SHARE_CACHE_TTL)
+assets: TTLCache[AssetInfo] = TTLCache(settings.SHARE_CACHE_TTL, maxsize=50_000)
+
+
+def get_share(db: Session, slug: str) -> Optional[ShareInfo]:
+    def _load() -> Optional[ShareInfo]:
+        row = (
+            db.query(models.ShareLink, models.Album.archived_at)
+            .join(models.Album, models.Album.id == models.ShareLink.album_id)
+            .filter(models.ShareLink.slug == slug)
+            .first()
+        )
+        if not row:
+            return None
+        sl, archived_at = row
+        return ShareInfo(
+            id=sl.id,
+            slug=sl.slug,
+            album_id=sl.album_id,
+            expires_at=sl.expires_at,
+            password_hash=sl.password_hash,
+            allow_zip=bool(sl.allow_zip),
+            archived=archived_at is not None,
+        )
+
+    return shares.get_or_load(slug, _load)
+
+
+def get_asset(db: Session, asset_id: int) -> Optional[AssetInfo]:
+    def _load() -> Optional[AssetInfo]:
+        a = db.get(models.Asset, asset_id)
+        if a is None:
+            return None
+        return AssetInfo(
+            id=a.id,
+            album_id=a.album_id,
+            filename=a.filename,
+            original_name=a.original_name,
+            mime_type=a.mime_type,
+            gdrive_file_id=a.gdrive_file_id,
+            gdrive_thumb_id=a.gdrive_thumb_id,
+        )
+
+    return assets.get_or_load(asset_id, _load)
+
+
+def invalidate_album(album_id: int) -> None:
+    """For bulk (query-level) changes that bypass ORM events."""
+    shares.discard_where(lambda s: s.album_id == album_id)
+    assets.discard_where(lambda a: a.album_id == album_id)
+
+
+# ---- Invalidation on ORM edits ----
+@event.listens_for(models.ShareLink, "after_update")
+@event.listens_for(models.ShareLink, "after_delete")
+def _share_changed(mapper, connection, target):
+    shares.pop(target.slug)  # قد يكون مخزّنًا كـ None (slug جديد سبق تخمينه)
+    # بعد تغيير slug يبقى المدخل القديم تحت المفتاح القديم
+    shares.discard_where(lambda s: s.id == target.id)
+
+
+@event.listens_for(models.Album, "after_update")
+@event.listens_for(models.Album, "after_delete")
+def _album_changed(mapper, connection, target):
+    shares.discard_where(lambda s: s.album_id == target.id)
+
+
+@event.listens_for(models.Asset, "after_update")
+@event.listens_for(models.Asset, "after_delete")
+def _asset_changed(mapper, connection, target):
+    assets.pop(target.id)
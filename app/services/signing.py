@@ -0,0 +1,159 @@
+# app/services/signing.py
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import math
+import time
+from datetime import datetime
+from typing import Optional
+from urllib.parse import quote
+
+from ..config import settings
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def sign(message: str, purpose: str) -> str:
+    """HMAC-SHA256 مقتطع (128 بت) بمفتاح SECRET_KEY، مفصول حسب الغرض."""
+    key = f"{purpose}:{settings.SECRET_KEY}".encode()
+    return _b64(hmac.new(key, message.encode(), hashlib.sha256).digest()[:16])
+
+
+def _bucketed_expiry(ttl: int, bucket: int, cap: Optional[datetime] = None) -> int:
+    """
+    Round the expiry up to a bucket so every page rendered within the same
+    window carries identical URLs (cacheable HTML and browser caches).
+    """
+    exp = int(math.ceil((time.time() + ttl) / bucket) * bucket)
+    if cap is not None:
+        exp = min(exp, int(cap.timestamp()))
+    return exp
+
+
+# ======================================================
+# Asset tokens: /s/<slug>/thumb|file/<id>?t=<token>
+# ======================================================
+
+def make_asset_token(slug: str, album_id: int, expires_at: Optional[datetime] = None) -> str:
+    """
+    Token authorizing every asset of one album through one share link.
+
+    Format: ``<album_id>.<expires_hex>.<sig>``; it is checked with HMAC
+    only, so asset requests need neither the ShareLink row nor a password
+    check.
+    """
+    exp = _bucketed_expiry(settings.ASSET_TOKEN_TTL, settings.ASSET_TOKEN_BUCKET, expires_at)
+    sig = sign(f"{slug}:{album_id}:{exp}", "asset")
+    return f"{album_id}.{exp:x}.{sig}"
+
+
+def check_asset_token(token: Optional[str], slug: str) -> Optional[int]:
+    """Return the album id the token grants, or None if invalid/expired."""
+    if not token:
+        return None
+    try:
+        album_s, exp_s, sig = token.split(".", 2)
+        album_id, exp = int(album_s), int(exp_s, 16)
+    except ValueError:
+        return None
+    if exp < time.time():
+        return None
+    if not hmac.compare_digest(sig, sign(f"{slug}:{album_id}:{exp}", "asset")):
+        return None
+    return album_id
+
+
+# ======================================================
+# Unlock tokens: session["unlocked:<slug>"]
+# ======================================================
+
+def make_unlock_token(slug: str, password_hash: str) -> str:
+    """
+    Proof that the visitor entered the share password. Bound to the
+    current hash, so changing the password revokes every open session.
+    """
+    exp = int(time.time()) + settings.UNLOCK_TOKEN_TTL
+    return f"{exp:x}.{sign(f'{slug}:{password_hash}:{exp}', 'unlock')}"
+
+
+def check_unlock_token(token: object, slug: str, password_hash: str) -> bool:
+    if not isinstance(token, str):
+        return False
+    try:
+        exp_s, sig = token.split(".", 1)
+        exp = int(exp_s, 16)
+    except ValueError:
+        return False
+    if exp < time.time():
+        return False
+    return hmac.compare_digest(sig, sign(f"{slug}:{password_hash}:{exp}", "unlock"))
+
+
+# ======================================================
+# Media URLs: nginx secure_link compatible
+# ======================================================
+
+def _media_secret() -> str:
+    return settings.MEDIA_SIGNING_SECRET or settings.SECRET_KEY
+
+
+def secure_link_md5(uri: str, expires: int) -> str:
+    """base64url(md5("<expires><uri> <secret>")), as nginx ``secure_link_md5`` computes it."""
+    raw = hashlib.md5(f"{expires}{uri} {_media_secret()}".encode()).digest()
+    return _b64(raw)
+
+
+def media_epoch() -> int:
+    """Expiry carried by media URLs signed now (0 when unsigned); changes once per MEDIA_URL_BUCKET."""
+    if not settings.MEDIA_SIGNED_URLS:
+        return 0
+    return _bucketed_expiry(settings.MEDIA_URL_TTL, settings.MEDIA_URL_BUCKET)
+
+
+def media_url(rel: Optional[str], version: int = 0) -> Optional[str]:
+    """
+    URL of a file under STORAGE_DIR served through /media. With
+    MEDIA_SIGNED_URLS it carries ``md5``/``expires`` so nginx (or
+    SignedMediaMiddleware) can check it without the app or the DB.
+
+    ``version`` (Asset.media_rev) adds ``v=`` so files rewritten in place
+    get a new URL; it is not signed, like any argument nginx's ``$uri``
+    leaves out.
+
+    The query string only changes once per MEDIA_URL_BUCKET, and
+    StaticFilesCached caps the response's max-age at ``expires``, so a
+    cached copy never outlives its link.
+    """
+    if not rel:
+        return None
+    uri = "/media/" + rel.replace("\\", "/").lstrip("/")
+    params = []
+    if settings.MEDIA_SIGNED_URLS:
+        exp = media_epoch()
+        params += [f"md5={secure_link_md5(uri, exp)}", f"expires={exp}"]
+    if version:
+        params.append(f"v={version}")
+    return quote(uri) + ("?" + "&".join(params) if params else "")
+
+
+def check_media_signature(uri: str, md5: Optional[str], expires: Optional[str]) -> int:
+    """
+    Validate a signed media request (``uri`` is the decoded path).
+
+    Returns:
+        int: 200 if valid, 410 if expired, 403 if missing or forged
+        (the same codes nginx secure_link setups return).
+    """
+    if not md5 or not expires:
+        return 403
+    try:
+        exp = int(expires)
+    except ValueError:
+        return 403
+    if not hmac.compare_digest(md5, secure_link_md5(uri, exp)):
+        return 403
+    return 410 if exp < time.time() else 200
@@ -0,0 +1,139 @@
+# app/services/thumbhash.py
+"""
+ThumbHash encoder (https://evanw.github.io/thumbhash/).
+
+A ~25-byte placeholder holding the average colour, a few DCT terms of
+luminance/chroma and the aspect ratio; static/thumbhash.js decodes it
+in the browser. The DCT is done separably (rows, then columns) with
+precomputed cosine tables, so a 100x100 input costs a few hundred
+thousand multiply-adds in plain Python, with no numpy dependency.
+"""
+from __future__ import annotations
+
+import base64
+import math
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+MAX_SIDE = 100
+
+
+def _round(x: float) -> int:
+    # Math.round في JS (نصف لأعلى) وليس تقريب بايثون البنكي
+    return int(math.floor(x + 0.5))
+
+
+def _cos_table(n: int, size: int) -> List[List[float]]:
+    return [[math.cos(math.pi / size * c * (i + 0.5)) for i in range(size)] for c in range(n)]
+
+
+def _encode_channel(
+    channel: Sequence[float], w: int, h: int, nx: int, ny: int
+) -> Tuple[float, List[float], float]:
+    fx = _cos_table(nx, w)
+    fy = _cos_table(ny, h)
+    # المرحلة الأولى: جداء كل صف في جيب التمام الأفقي لكل cx
+    rows = [channel[y * w:(y + 1) * w] for y in range(h)]
+    row_dot = [[sum(v * c for v, c in zip(row, fx[cx])) for row in rows] for cx in range(nx)]
+
+    dc, ac, scale = 0.0, [], 0.0
+    for cy in range(ny):
+        cx = 0
+        while cx * ny < nx * (ny - cy):
+            f = sum(r * c for r, c in zip(row_dot[cx], fy[cy])) / (w * h)
+            if cx or cy:
+                ac.append(f)
+                scale = max(scale, abs(f))
+            else:
+                dc = f
+            cx += 1
+    if scale:
+        ac = [0.5 + 0.5 / scale * f for f in ac]
+    return dc, ac, scale
+
+
+def rgba_to_thumbhash(w: int, h: int, rgba: bytes) -> bytes:
+    """Encode RGBA pixels (at most 100x100) into a ThumbHash."""
+    if w > MAX_SIDE or h > MAX_SIDE:
+        raise ValueError(f"{w}x{h} doesn't fit in {MAX_SIDE}x{MAX_SIDE}")
+    n = w * h
+
+    avg_r = avg_g = avg_b = avg_a = 0.0
+    for j in range(0, n * 4, 4):
+        alpha = rgba[j + 3] / 255
+        avg_r += alpha / 255 * rgba[j]
+        avg_g += alpha / 255 * rgba[j + 1]
+        avg_b += alpha / 255 * rgba[j + 2]
+        avg_a += alpha
+    if avg_a:
+        avg_r /= avg_a
+        avg_g /= avg_a
+        avg_b /= avg_a
+
+    has_alpha = avg_a < n
+    l_limit = 5 if has_alpha else 7
+    lx = max(1, _round(l_limit * w / max(w, h)))
+    ly = max(1, _round(l_limit * h / max(w, h)))
+
+    # RGBA -> LPQA (مركّبة فوق اللون المتوسط)
+    l, p, q, a = [0.0] * n, [0.0] * n, [0.0] * n, [0.0] * n
+    for i in range(n):
+        j = i * 4
+        alpha = rgba[j + 3] / 255
+        r = avg_r * (1 - alpha) + alpha / 255 * rgba[j]
+        g = avg_g * (1 - alpha) + alpha / 255 * rgba[j + 1]
+        b = avg_b * (1 - alpha) + alpha / 255 * rgba[j + 2]
+        l[i] = (r + g + b) / 3
+        p[i] = (r + g) / 2 - b
+        q[i] = r - g
+        a[i] = alpha
+
+    l_dc, l_ac, l_scale = _encode_channel(l, w, h, max(3, lx), max(3, ly))
+    p_dc, p_ac, p_scale = _encode_channel(p, w, h, 3, 3)
+    q_dc, q_ac, q_scale = _encode_channel(q, w, h, 3, 3)
+    if has_alpha:
+        a_dc, a_ac, a_scale = _encode_channel(a, w, h, 5, 5)
+
+    is_landscape = w > h
+    header24 = (
+        _round(63 * l_dc)
+        | (_round(31.5 + 31.5 * p_dc) << 6)
+        | (_round(31.5 + 31.5 * q_dc) << 12)
+        | (_round(31 * l_scale) << 18)
+        | (int(has_alpha) << 23)
+    )
+    header16 = (
+        (ly if is_landscape else lx)
+        | (_round(63 * p_scale) << 3)
+        | (_round(63 * q_scale) << 9)
+        | (int(is_landscape) << 15)
+    )
+    out = [header24 & 255, (header24 >> 8) & 255, header24 >> 16, header16 & 255, header16 >> 8]
+    if has_alpha:
+        out.append(_round(15 * a_dc) | (_round(15 * a_scale) << 4))
+
+    ac_start = len(out)
+    factors = [l_ac, p_ac, q_ac, a_ac] if has_alpha else [l_ac, p_ac, q_ac]
+    index = 0
+    for ac in factors:
+        for f in ac:
+            pos = ac_start + (index >> 1)
+            if pos >= len(out):
+                out.append(0)
+            out[pos] |= _round(15 * f) << ((index & 1) << 2)
+            index += 1
+    return bytes(out)
+
+
+def image_to_thumbhash(im: Image.Image) -> str:
+    """ThumbHash of a PIL image as base64 (about 32 characters)."""
+    from PIL import Image
+
+    # resize بدل copy()+thumbnail(): لا نسخة بالحجم الكامل، و reducing_gap يصغّر على مراحل
+    w, h = im.size
+    scale = min(1.0, MAX_SIDE / max(w, h))
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    small = im.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0).convert("RGBA")
+    return base64.b64encode(rgba_to_thumbhash(small.width, small.height, small.tobytes())).decode("ascii")
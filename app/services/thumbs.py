@@ -1,16 +1,13 @@
 from __future__ import annotations
 from pathlib import Path
 from io import BytesIO
-from typing import Dict
-from PIL import Image, ImageOps
-import base64
+from typing import TYPE_CHECKING, Dict
 from ..config import settings
+from .variants import register_avif
 
-# ✅ فعّل كوديك AVIF إذا كانت الحزمة موجودة
-try:
-    import pillow_avif  # noqa: F401
-except Exception as e:
-    print("[avif] pillow-avif-plugin not available:", e)
+# Pillow وكوديك AVIF يُحمّلان عند أول استعمال
+if TYPE_CHECKING:
+    from PIL import Image
 
 # ✅ فلاغات من .env
 ENABLE_WEBP = getattr(settings, "ENABLE_WEBP", True)
@@ -39,6 +36,8 @@ def _variant_out_path(original: Path, suffix: str, ext: str) -> Path:
     return out_dir / f"{rel.stem}{suffix}.{ext}"
 
 def _normalize(img: Image.Image) -> Image.Image:
+    from PIL import ImageOps
+
     im = ImageOps.exif_transpose(img)
     if im.mode in ("P", "RGBA"):
         im = im.convert("RGB")
@@ -52,6 +51,8 @@ def ensure_thumb(original: Path) -> Path | None:
     if tpath.exists():
         return tpath
 
+    from PIL import Image
+
     with Image.open(original) as img:
         img = _normalize(img)
         w, h = img.size
@@ -78,6 +79,8 @@ def ensure_thumb(original: Path) -> Path | None:
     return tpath
 
 def make_thumb_bytes(original_bytes: bytes, max_w: int) -> bytes:
+    from PIL import Image
+
     img = Image.open(BytesIO(original_bytes))
     img = _normalize(img)
     w, h = img.size
@@ -89,6 +92,8 @@ def make_thumb_bytes(original_bytes: bytes, max_w: int) -> bytes:
     return out.getvalue()
 
 def ensure_variants(original: Path) -> Dict:
+    from PIL import Image
+
     out: Dict[str, Dict[int, str] | int] = {"jpg": {}, "webp": {}, "avif": {}}
     with Image.open(original) as im0:
         im0 = _normalize(im0)
@@ -116,7 +121,7 @@ def ensure_variants(original: Path) -> Dict:
                 out["webp"][target_w] = f"/static/thumbs/{rel}"
 
             # AVIF (حسب الفلاغ + توافر الكوديك)
-            if ENABLE_AVIF:
+            if ENABLE_AVIF and register_avif():
                 try:
                     avif_path = _variant_out_path(original, f"-{target_w}", "avif")
                     if not avif_path.exists():
@@ -127,14 +132,3 @@ def ensure_variants(original: Path) -> Dict:
                     pass
 
     return out
-
-def tiny_placeholder_base64(original: Path, size: int = 24) -> str:
-    with Image.open(original) as im:
-        im = _normalize(im)
-        w, h = im.size
-        ratio = h / w if w else 1.0
-        im_small = im.resize((size, max(1, int(size * ratio))), Image.Resampling.LANCZOS)
-        buf = BytesIO()
-        im_small.save(buf, format="JPEG", quality=30)
-        b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-        return f"data:image/jpeg;base64,{b64}"
@@ -0,0 +1,304 @@
+# app/services/trash.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+from . import gdrive
+
+log = logging.getLogger(__name__)
+
+LOCAL = "local"
+GDRIVE = "gdrive"
+
+_BACKOFF_BASE = 30          # ثوانٍ
+_BACKOFF_MAX = 6 * 3600
+
+_sweeper: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _storage_root() -> Path:
+    return Path(settings.STORAGE_DIR)
+
+
+def _rel(path: Path) -> str:
+    path = Path(path)
+    try:
+        return path.relative_to(_storage_root()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def enqueue(db: Session, paths: Iterable[Path] = (), gdrive_ids: Iterable[str] = ()) -> int:
+    """
+    Queue files for deletion inside the caller's transaction.
+
+    Nothing is removed here; the caller commits together with its own
+    changes (e.g. deleting the Asset row) and the sweeper does the I/O.
+
+    Returns:
+        int: number of queued items.
+    """
+    n = 0
+    for p in paths:
+        db.add(models.TrashItem(kind=LOCAL, target=_rel(p)))
+        n += 1
+    for file_id in gdrive_ids:
+        if file_id:
+            db.add(models.TrashItem(kind=GDRIVE, target=file_id))
+            n += 1
+    return n
+
+
+def _delete_local(target: str) -> Optional[str]:
+    p = Path(target)
+    if not p.is_absolute():
+        p = _storage_root() / p
+    try:
+        p.unlink(missing_ok=True)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def sweep(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Process one batch of due trash items.
+
+    Local files are unlinked; Drive files are deleted through a single
+    batch request. Failed items are rescheduled with exponential backoff
+    until TRASH_MAX_ATTEMPTS is reached.
+
+    Returns:
+        dict: counts of ``deleted`` and ``failed`` items.
+    """
+    batch_size = batch_size or settings.TRASH_BATCH_SIZE
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        items = (
+            db.query(models.TrashItem)
+            .filter(
+                models.TrashItem.next_attempt_at <= now,
+                models.TrashItem.attempts < settings.TRASH_MAX_ATTEMPTS,
+            )
+            .order_by(models.TrashItem.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not items:
+            return {"deleted": 0, "failed": 0}
+
+        errors: Dict[int, Optional[str]] = {}
+        drive_items = [it for it in items if it.kind == GDRIVE]
+        for it in items:
+            if it.kind == LOCAL:
+                errors[it.id] = _delete_local(it.target)
+
+        if drive_items:
+            if settings.USE_GDRIVE:
+                try:
+                    res = gdrive.delete_files([it.target for it in drive_items])
+                    for it in drive_items:
+                        # غياب النتيجة ليس نجاحًا: يُعاد المحاولة
+                        errors[it.id] = res.get(it.target, "no result from Drive batch")
+                except Exception as e:
+                    for it in drive_items:
+                        errors[it.id] = str(e)
+            else:
+                for it in drive_items:
+                    errors[it.id] = "Google Drive is disabled"
+
+        done = [item_id for item_id, err in errors.items() if err is None]
+        failed = [it for it in items if errors.get(it.id)]
+        for it in failed:
+            it.attempts = (it.attempts or 0) + 1
+            it.last_error = errors[it.id][:1000]
+            delay = min(_BACKOFF_BASE * (2 ** (it.attempts - 1)), _BACKOFF_MAX)
+            it.next_attempt_at = now + timedelta(seconds=delay)
+
+        if done:
+            # حذف جماعي بدون تحميل الكائنات (آمن لو عالج عامل آخر نفس الصفوف)
+            db.query(models.TrashItem).filter(models.TrashItem.id.in_(done)).delete(
+                synchronize_session=False
+            )
+        db.commit()
+        return {"deleted": len(done), "failed": len(failed)}
+    finally:
+        db.close()
+
+
+def sweep_all(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Run sweep() repeatedly until no due item can be deleted."""
+    total = {"deleted": 0, "failed": 0}
+    while True:
+        res = sweep(batch_size)
+        total["deleted"] += res["deleted"]
+        total["failed"] += res["failed"]
+        if res["deleted"] == 0:
+            return total
+
+
+def _run(interval: int) -> None:
+    while not _stop.wait(interval):
+        try:
+            sweep_all()
+        except Exception:
+            log.exception("trash sweep failed")
+
+
+def start_sweeper(interval: Optional[int] = None) -> None:
+    """Start the background sweeper thread once per process."""
+    global _sweeper
+    interval = settings.TRASH_SWEEP_INTERVAL if interval is None else interval
+    if interval <= 0 or (_sweeper is not None and _sweeper.is_alive()):
+        return
+    _stop.clear()
+    _sweeper = threading.Thread(target=_run, args=(interval,), name="trash-sweeper", daemon=True)
+    _sweeper.start()
+
+
+def stop_sweeper() -> None:
+    _stop.set()
+
+
+# ======================================================
+# Orphan scan
+# ======================================================
+
+def _album_stems(db: Session) -> Dict[int, set[str]]:
+    stems: Dict[int, set[str]] = {}
+    for album_id, filename in db.query(models.Asset.album_id, models.Asset.filename):
+        stems.setdefault(album_id, set()).add(Path(str(filename).replace("\\", "/")).stem)
+    for album_id, video_id in db.query(models.Video.album_id, models.Video.id):
+        stems.setdefault(album_id, set()).add(f"video-{video_id}")  # صور غلاف الفيديو
+    for (album_id,) in db.query(models.Album.id):
+        stems.setdefault(album_id, set())
+    return stems
+
+
+def _cover_stems(db: Session) -> Dict[int, str]:
+    """File stem of the current cover renditions per album (covers.render manifest)."""
+    out: Dict[int, str] = {}
+    for album_id, raw in db.query(models.Album.id, models.Album.cover_renditions).filter(
+        models.Album.cover_renditions.isnot(None)
+    ):
+        try:
+            m = json.loads(raw)
+            out[album_id] = m.get("name") or m["stem"]
+        except (ValueError, KeyError, TypeError):
+            pass
+    return out
+
+
+def _is_orphan(
+    stems: Dict[int, set[str]], album_key: str, filename: str, covers: Optional[Dict[int, str]] = None
+) -> bool:
+    try:
+        album_id = int(album_key)
+    except ValueError:
+        return False  # ليس مجلد ألبوم؛ لا نلمسه
+    live = stems.get(album_id)
+    if live is None:
+        return True
+    if covers is not None:
+        # ملفات cover/: حيّة لأصل الغلاف الحالي فقط، لا لكل أصول الألبوم
+        return covers.get(album_id) != Path(filename).stem
+    return Path(filename).stem not in live
+
+
+def _drive_created(f: Dict[str, object]) -> float:
+    try:
+        return datetime.fromisoformat(str(f["createdTime"]).replace("Z", "+00:00")).timestamp()
+    except (KeyError, ValueError):
+        return 0.0
+
+
+def scan_orphans(db: Session, apply: bool = False) -> Dict[str, object]:
+    """
+    Compare the storage tree (and the Drive albums folder) against the DB.
+
+    A file under ``albums/<album_id>/`` is an orphan when its album no
+    longer exists or its stem matches no asset (or ``video-<id>`` poster)
+    of that album; under ``cover/`` only the current cover's stem is
+    live. This also catches Drive variant copies whose ids were never
+    stored. Files younger than TRASH_ORPHAN_GRACE are skipped: uploads
+    write to disk before their Asset row commits.
+
+    Args:
+        apply: queue the orphans into the trash instead of only reporting.
+    """
+    cutoff = time.time() - settings.TRASH_ORPHAN_GRACE
+    stems = _album_stems(db)
+    covers = _cover_stems(db)
+    queued = {
+        (kind, target)
+        for kind, target in db.query(models.TrashItem.kind, models.TrashItem.target)
+    }
+
+    local: list[str] = []
+    local_bytes = 0
+    albums_root = _storage_root() / "albums"
+    if albums_root.is_dir():
+        for album_entry in os.scandir(albums_root):
+            if not album_entry.is_dir():
+                continue
+            for dirpath, _dirs, files in os.walk(album_entry.path):
+                in_cover = Path(dirpath).relative_to(album_entry.path).parts[:1] == ("cover",)
+                for name in files:
+                    if not _is_orphan(stems, album_entry.name, name, covers if in_cover else None):
+                        continue
+                    full = Path(dirpath) / name
+                    rel = _rel(full)
+                    if (LOCAL, rel) in queued:
+                        continue
+                    try:
+                        st = full.stat()
+                    except OSError:
+                        continue
+                    if st.st_mtime > cutoff:
+                        continue
+                    local.append(rel)
+                    local_bytes += st.st_size
+
+    drive: list[str] = []
+    drive_bytes = 0
+    if settings.USE_GDRIVE and settings.GDRIVE_ROOT_FOLDER_ID:
+        service = gdrive._service()
+        albums_folder = gdrive.find_subfolder(service, settings.GDRIVE_ROOT_FOLDER_ID, "albums")
+        if albums_folder:
+            for folder in gdrive.iter_children(service, albums_folder):
+                if folder.get("mimeType") != "application/vnd.google-apps.folder":
+                    continue
+                for f in gdrive.walk_files(service, folder["id"]):
+                    if (
+                        _is_orphan(stems, folder["name"], f["name"])
+                        and (GDRIVE, f["id"]) not in queued
+                        and _drive_created(f) <= cutoff
+                    ):
+                        drive.append(f["id"])
+                        drive_bytes += int(f.get("size") or 0)
+
+    if apply and (local or drive):
+        enqueue(db, [Path(p) for p in local], drive)
+        db.commit()
+
+    return {
+        "local": local,
+        "local_bytes": local_bytes,
+        "gdrive": drive,
+        "gdrive_bytes": drive_bytes,
+        "queued": bool(apply),
+    }
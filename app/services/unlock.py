@@ -0,0 +1,64 @@
+# app/services/unlock.py
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ..config import settings
+from ..utils import verify_password
+from .ratelimit import TokenBucket
+
+# bcrypt يحجز المعالج: عمّال قليلون مخصّصون بدل threadpool الطلبات العام
+_executor = ThreadPoolExecutor(max_workers=settings.UNLOCK_WORKERS, thread_name_prefix="unlock")
+_slots = threading.BoundedSemaphore(settings.UNLOCK_WORKERS + settings.UNLOCK_QUEUE)
+
+by_slug = TokenBucket(settings.UNLOCK_SLUG_BURST, settings.UNLOCK_SLUG_PER_MIN)
+by_ip = TokenBucket(settings.UNLOCK_IP_BURST, settings.UNLOCK_IP_PER_MIN)
+
+
+class Busy(Exception):
+    """Raised when the attempt is rate limited or the verifier queue is full."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("busy")
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+def check_rate(slug: str, ip: Optional[str]) -> None:
+    """Consume one attempt from the IP and slug buckets or raise Busy."""
+    wait = by_ip.take(ip or "-")
+    if not wait:
+        wait = by_slug.take(slug)
+    if wait:
+        raise Busy(wait)
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    try:
+        return verify_password(password, password_hash)
+    except ValueError:  # تجزئة تالفة
+        return False
+    finally:
+        _slots.release()
+
+
+async def verify(password: str, password_hash: str) -> bool:
+    """
+    Verify a share password on the dedicated executor without blocking
+    the event loop. Raises Busy when UNLOCK_WORKERS + UNLOCK_QUEUE
+    verifications are already in flight.
+    """
+    if not _slots.acquire(blocking=False):
+        raise Busy(1)
+    try:
+        fut = _executor.submit(_verify, password, password_hash)
+    except BaseException:
+        _slots.release()
+        raise
+    return await asyncio.wrap_future(fut)
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,16 @@
 from __future__ import annotations
+import functools
+import logging
+import time
 from pathlib import Path
-from typing import Iterable, Literal
-from PIL import Image, ImageOps
+from typing import TYPE_CHECKING, Iterable, Literal
+
+# Pillow يُستورد عند أول استعمال (لا يدفع العامل ثمنه عند الإقلاع)
+if TYPE_CHECKING:
+    from PIL import Image
+
+from ..metrics import observe_encode
+from .thumbhash import image_to_thumbhash
 
 VariantName = Literal["thumb", "disp", "big"]
 
@@ -12,6 +21,38 @@ SIZES: dict[VariantName, int] = {
     "big":  2048,   # اختيارية للشاشات الكبيرة
 }
 
+SUBDIRS: dict[VariantName, str] = {
+    "thumb": "thumb/400",
+    "disp": "disp/1600",
+    "big": "big/2048",
+}
+
+# تدوير إضافي (درجات مع عقارب الساعة) -> Transpose بدون إعادة تقطيع البكسلات
+_TRANSPOSE = {
+    90: "ROTATE_270",
+    180: "ROTATE_180",
+    270: "ROTATE_90",
+}
+
+@functools.lru_cache(maxsize=None)
+def register_avif() -> bool:
+    """Load pillow-avif-plugin once, on first AVIF need; True when Pillow can write AVIF."""
+    try:
+        import pillow_avif  # noqa: F401
+    except Exception as e:
+        logging.getLogger(__name__).info("pillow-avif-plugin not available: %s", e)
+    from PIL import Image
+
+    return "AVIF" in Image.SAVE
+
+def variant_paths(out_root: Path, album_id: int, stem: str) -> list[Path]:
+    """كل مسارات المشتقات (JPG + WebP لكل حجم) لأصل واحد."""
+    return [
+        out_root / f"albums/{album_id}/{SUBDIRS[kind]}/{stem}.{ext}"
+        for kind in SIZES
+        for ext in ("jpg", "webp")
+    ]
+
 def _ensure_dir(p: Path) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
 
@@ -27,38 +68,97 @@ def _resize_fit(im: Image.Image, target_w: int) -> Image.Image:
     w, h = im.size
     if w <= target_w:
         return im
+    from PIL import Image
+
     new_h = round(h * (target_w / w))
     return im.resize((target_w, new_h), Image.LANCZOS)
 
+def _rotate(im: Image.Image, degrees: int) -> Image.Image:
+    from PIL import Image
+
+    method = _TRANSPOSE.get(degrees % 360)
+    return im.transpose(Image.Transpose[method]) if method is not None else im
+
+def _write_all(
+    im0: Image.Image,
+    out_root: Path,
+    album_id: int,
+    filename_stem: str,
+    create: Iterable[VariantName],
+) -> dict[str, str]:
+    results: dict[str, str] = {}
+    smallest = im0
+    for kind in create:
+        im = _resize_fit(im0, SIZES[kind])
+        if im.width < smallest.width:
+            smallest = im
+
+        subdir = SUBDIRS[kind]
+        jpg_rel  = Path(f"albums/{album_id}/{subdir}/{filename_stem}.jpg")
+        webp_rel = Path(f"albums/{album_id}/{subdir}/{filename_stem}.webp")
+
+        t0 = time.perf_counter()
+        _save_jpeg(im, out_root / jpg_rel)
+        t1 = time.perf_counter()
+        _save_webp(im, out_root / webp_rel)
+        observe_encode(kind, "jpg", t1 - t0)
+        observe_encode(kind, "webp", time.perf_counter() - t1)
+
+        results[f"{kind}_jpg"]  = jpg_rel.as_posix()
+        results[f"{kind}_webp"] = webp_rel.as_posix()
+
+    # placeholder من أصغر مشتق جاهز (400px عادةً) بدل الأصل بدقته الكاملة
+    results["thumbhash"] = image_to_thumbhash(smallest)
+    return results
+
 def make_variants(
     original_path: Path,
     out_root: Path,
     album_id: int,
     filename_stem: str,
     create: Iterable[VariantName] = ("thumb", "disp", "big"),
+    rotate: int = 0,
 ) -> dict[str, str]:
     """
-    ينشئ JPG + WebP لكل حجم ويعيد مسارات نسبية يمكن استعمالها لاحقًا في القوالب.
+    ينشئ JPG + WebP لكل حجم ويعيد مسارات نسبية يمكن استعمالها لاحقًا في القوالب،
+    ومعها "thumbhash" (placeholder بصيغة base64).
     out_root = settings.STORAGE_DIR
+    rotate = تدوير إضافي مخزّن في Asset.orientation (0/90/180/270 مع عقارب الساعة)
     """
-    results: dict[str, str] = {}
+    from PIL import Image, ImageOps
 
     with Image.open(original_path) as im0:
-        # احترام اتجاه EXIF وتوحيد القناة
-        im0 = ImageOps.exif_transpose(im0).convert("RGB")
+        # احترام اتجاه EXIF وتوحيد القناة، دون نسخ إضافية بالحجم الكامل
+        ImageOps.exif_transpose(im0, in_place=True)
+        if im0.mode != "RGB":
+            im0 = im0.convert("RGB")
+        im0 = _rotate(im0, rotate)
+        return _write_all(im0, out_root, album_id, filename_stem, create)
 
-        for kind in create:
-            width = SIZES[kind]
-            im = _resize_fit(im0, width)
-
-            subdir = {"thumb": "thumb/400", "disp": "disp/1600", "big": "big/2048"}[kind]
-            jpg_rel  = Path(f"albums/{album_id}/{subdir}/{filename_stem}.jpg")
-            webp_rel = Path(f"albums/{album_id}/{subdir}/{filename_stem}.webp")
+def rotate_variants(
+    out_root: Path,
+    album_id: int,
+    filename_stem: str,
+    degrees: int,
+    create: Iterable[VariantName] = ("thumb", "disp", "big"),
+) -> dict[str, str] | None:
+    """
+    يدوّر المشتقات الموجودة انطلاقًا من أكبر مشتق متوفر، حين لا يوجد الأصل
+    محليًا (يُعاد ترميزها: المصدر المفضّل هو الأصل عبر make_variants).
 
-            _save_jpeg(im, out_root / jpg_rel)
-            _save_webp(im, out_root / webp_rel)
+    يعيد None إن لم يوجد أي مشتق.
+    """
+    source = None
+    for kind in ("big", "disp", "thumb"):
+        p = out_root / f"albums/{album_id}/{SUBDIRS[kind]}/{filename_stem}.jpg"
+        if p.exists():
+            source = p
+            break
+    if source is None:
+        return None
 
-            results[f"{kind}_jpg"]  = jpg_rel.as_posix()
-            results[f"{kind}_webp"] = webp_rel.as_posix()
+    from PIL import Image
 
-    return results
+    with Image.open(source) as im0:
+        im0 = _rotate(im0.convert("RGB"), degrees)
+        return _write_all(im0, out_root, album_id, filename_stem, create)
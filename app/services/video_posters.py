@@ -0,0 +1,173 @@
+# app/services/video_posters.py
+"""
+Poster images for album videos.
+
+Public pages show a click-to-load facade (poster + play button) instead
+of one provider iframe per video; the poster is fetched once from the
+provider, resized and stored next to the image variants under
+``albums/<album_id>/video/``, then refreshed in the background after
+VIDEO_POSTER_TTL.
+"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+from . import trash
+
+log = logging.getLogger(__name__)
+
+USER_AGENT = "dichfoto-poster/1.0"
+
+_lock = threading.Lock()
+_inflight: set[int] = set()
+_failed: Dict[int, float] = {}      # video id -> وقت آخر فشل (monotonic)
+
+
+def http_get(url: str) -> bytes:
+    """GET a URL and return the body; raises on HTTP errors and timeouts."""
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=settings.VIDEO_POSTER_TIMEOUT) as resp:
+        return resp.read()
+
+
+# ---- Providers: candidate image URLs, best first ----
+
+def _youtube(v: models.Video) -> List[str]:
+    # maxresdefault غير موجود لكل الفيديوهات؛ hqdefault متوفر دائمًا
+    return [
+        f"https://i.ytimg.com/vi/{quote(v.video_id)}/maxresdefault.jpg",
+        f"https://i.ytimg.com/vi/{quote(v.video_id)}/hqdefault.jpg",
+    ]
+
+
+def _vimeo(v: models.Video) -> List[str]:
+    # oEmbed يعمل مع الفيديوهات غير المدرجة إذا مُرّر الـ hash
+    page = f"https://vimeo.com/{v.video_id}" + (f"/{v.vimeo_hash}" if v.vimeo_hash else "")
+    data = json.loads(http_get(f"https://vimeo.com/api/oembed.json?width=1280&url={quote(page, safe='')}"))
+    url = data.get("thumbnail_url")
+    return [url] if url else []
+
+
+def _cloudflare(v: models.Video) -> List[str]:
+    return [f"https://videodelivery.net/{quote(v.video_id)}/thumbnails/thumbnail.jpg?time=1s&height=720"]
+
+
+PROVIDERS: Dict[str, Callable[[models.Video], List[str]]] = {
+    "youtube": _youtube,
+    "vimeo": _vimeo,
+    "cloudflare": _cloudflare,
+}
+
+
+def poster_rel(v: models.Video, ext: str) -> str:
+    # stem "video-<id>" يحسبه فحص الملفات اليتيمة في trash
+    return f"albums/{v.album_id}/video/video-{v.id}.{ext}"
+
+
+def poster_paths(v: models.Video) -> List[Path]:
+    base = Path(settings.STORAGE_DIR)
+    return [base / poster_rel(v, ext) for ext in ("jpg", "webp")]
+
+
+def fetch(v: models.Video) -> bytes:
+    """Image bytes of the provider's thumbnail; the first candidate that downloads wins."""
+    provider = PROVIDERS.get((v.provider or "").lower())
+    if provider is None:
+        raise ValueError(f"No poster provider for {v.provider!r}")
+    last: Optional[Exception] = None
+    for url in provider(v):
+        try:
+            return http_get(url)
+        except (urllib.error.URLError, OSError) as e:
+            last = e
+    raise last or LookupError(f"No poster for video {v.id}")
+
+
+def store(v: models.Video, data: bytes) -> str:
+    """Resize the poster and write JPEG + WebP; returns the JPEG path relative to STORAGE_DIR."""
+    from PIL import Image, ImageOps
+
+    base = Path(settings.STORAGE_DIR)
+    with Image.open(io.BytesIO(data)) as im:
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        im.thumbnail((settings.VIDEO_POSTER_WIDTH, settings.VIDEO_POSTER_WIDTH), Image.Resampling.LANCZOS)
+        jpg = base / poster_rel(v, "jpg")
+        jpg.parent.mkdir(parents=True, exist_ok=True)
+        im.save(jpg, "JPEG", quality=82, optimize=True, progressive=True)
+        if settings.ENABLE_WEBP:
+            im.save(base / poster_rel(v, "webp"), "WEBP", quality=78, method=4)
+    return poster_rel(v, "jpg")
+
+
+def is_stale(v: models.Video, now: Optional[datetime] = None) -> bool:
+    if v.poster_path is None or v.poster_fetched_at is None:
+        failed = _failed.get(v.id)
+        return failed is None or time.monotonic() - failed >= settings.VIDEO_POSTER_RETRY
+    now = now or datetime.utcnow()
+    return now - v.poster_fetched_at >= timedelta(seconds=settings.VIDEO_POSTER_TTL)
+
+
+def refresh(db: Session, v: models.Video) -> bool:
+    """
+    Fetch and store the poster of one video in the caller's session.
+
+    A failed fetch keeps the previous poster (if any) and is retried
+    after VIDEO_POSTER_RETRY.
+    """
+    try:
+        v.poster_path = store(v, fetch(v))
+    except Exception:
+        _failed[v.id] = time.monotonic()
+        log.warning("poster fetch failed", exc_info=True,
+                    extra={"video_id": v.id, "provider": v.provider, "provider_id": v.video_id})
+        return False
+    _failed.pop(v.id, None)
+    v.poster_fetched_at = datetime.utcnow()
+    db.commit()
+    return True
+
+
+def refresh_job(video_ids: Iterable[int]) -> None:
+    """Background job (own DB session); skips videos another job is already fetching."""
+    with _lock:
+        ids = [i for i in video_ids if i not in _inflight]
+        _inflight.update(ids)
+    if not ids:
+        return
+    db = SessionLocal()
+    try:
+        for vid in ids:
+            v = db.get(models.Video, vid)
+            if v is not None:
+                refresh(db, v)
+    finally:
+        db.close()
+        with _lock:
+            _inflight.difference_update(ids)
+
+
+def stale_ids(videos: Iterable[models.Video]) -> List[int]:
+    """Ids worth a background refresh (missing or old poster, not already being fetched)."""
+    now = datetime.utcnow()
+    return [v.id for v in videos if v.id not in _inflight and is_stale(v, now)]
+
+
+def discard(db: Session, v: models.Video) -> None:
+    """Queue the poster files of a deleted video into the trash."""
+    if v.poster_path:
+        trash.enqueue(db, poster_paths(v))
@@ -0,0 +1,116 @@
+# app/services/writer.py
+"""
+Single writer for small, frequent writes (likes, selections, admin edits).
+
+SQLite has one write lock; many tiny transactions from concurrent
+requests queue up in busy_timeout and, under load, fail with
+``database is locked``. Jobs submitted here run on one thread over the
+dedicated write connection; every job that arrives within
+WRITE_BATCH_DELAY_MS, or while the previous batch was committing,
+shares one transaction. On PostgreSQL the same queue just batches
+commits on the main engine.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import settings
+from ..database import write_engine
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Job = Tuple[Callable[[Session], object], Future]
+
+WriteSession = sessionmaker(bind=write_engine, autocommit=False, autoflush=False, future=True)
+
+_queue: "queue.SimpleQueue[Job]" = queue.SimpleQueue()
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def submit(job: Callable[[Session], T]) -> "Future[T]":
+    """
+    Queue ``job(session)`` for the next batch. The job must not commit
+    and should return plain values (ORM objects expire on commit); it
+    may run twice when another job in its batch fails.
+    """
+    fut: Future = Future()
+    _queue.put((job, fut))
+    _ensure_thread()
+    return fut
+
+
+def run(job: Callable[[Session], T]) -> T:
+    """Submit and wait for the commit, so the caller reads its own write."""
+    return submit(job).result(timeout=settings.WRITE_WAIT_TIMEOUT)
+
+
+def flush() -> None:
+    """Wait until everything queued so far is committed."""
+    run(lambda db: None)
+
+
+def _ensure_thread() -> None:
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="db-writer", daemon=True)
+            _thread.start()
+
+
+def _run() -> None:
+    while True:
+        batch = [_queue.get()]
+        deadline = time.monotonic() + settings.WRITE_BATCH_DELAY_MS / 1000
+        while len(batch) < settings.WRITE_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            try:
+                # بعد النافذة: ما وصل أثناء الالتزام السابق يدخل الدفعة دون انتظار
+                batch.append(_queue.get(timeout=remaining) if remaining > 0 else _queue.get_nowait())
+            except queue.Empty:
+                break
+        batch = [(job, fut) for job, fut in batch if fut.set_running_or_notify_cancel()]
+        if batch:
+            _commit(batch)
+
+
+def _commit(batch: List[Job]) -> None:
+    db = WriteSession()
+    try:
+        results = [job(db) for job, _ in batch]
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if len(batch) > 1:
+            # مهمة فاشلة لا تُسقط الدفعة: كل مهمة في معاملتها الخاصة
+            for item in batch:
+                _commit([item])
+        else:
+            log.exception("write job failed")
+            batch[0][1].set_exception(e)
+        return
+    finally:
+        db.close()
+    for (_, fut), result in zip(batch, results):
+        fut.set_result(result)
+
+
+def _reset_after_fork() -> None:
+    # الخيط لا ينجو من fork؛ يبدأ من جديد مع أول مهمة في العامل
+    global _thread, _lock
+    _thread = None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -2,7 +2,6 @@ from pathlib import Path
 from typing import Iterable
 import zipfile
 import io
-from zipstream import ZipStream
 
 
 def make_zip_in_memory(files: Iterable[Path], base_prefix: str = "") -> bytes:
@@ -30,7 +29,7 @@ def make_zip_in_memory(files: Iterable[Path], base_prefix: str = "") -> bytes:
     return mem.read()
 
 
-def stream_zip(pairs: Iterable[tuple[str, bytes]]):
+def stream_zip(pairs: Iterable[tuple[str, bytes]], compression: str = "deflated"):
     """
     Create a streaming ZIP archive from pairs of archive names and content generators.
 
@@ -38,11 +37,16 @@ def stream_zip(pairs: Iterable[tuple[str, bytes]]):
         pairs (Iterable[tuple[str, bytes]]): Iterable of tuples, where each tuple contains:
             - arcname (str): Name of the file inside the ZIP.
             - gen (bytes): Byte content or generator yielding chunks of data for the file.
+        compression (str, optional): "deflated" or "stored". Use "stored" for
+            already-compressed media (JPEG/WebP) to avoid burning CPU for ~0% gain.
 
     Returns:
         ZipStream: A ZipStream object representing the streaming ZIP archive.
     """
-    z = ZipStream(mode="w", compression="deflated")
+    from zipstream import ZipStream  # lazy: فقط عند أول تنزيل ZIP
+
+    compress_type = zipfile.ZIP_STORED if compression == "stored" else zipfile.ZIP_DEFLATED
+    z = ZipStream(compress_type=compress_type)
     for arcname, gen in pairs:
-        z.add(arcname, gen)
+        z.add(gen, arcname)
     return z
@@ -0,0 +1,94 @@
+# app/static_assets.py
+from __future__ import annotations
+
+import json
+import mimetypes
+import stat
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Scope
+
+STATIC_DIR = Path("static")
+DIST_PREFIX = "dist/"
+
+# ترتيب التفضيل عند قبول العميل لأكثر من ترميز
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@lru_cache(maxsize=1)
+def _manifest() -> Dict[str, str]:
+    """static/dist/manifest.json من build_static.py؛ فارغ قبل أول build."""
+    try:
+        return json.loads((STATIC_DIR / "dist" / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def static_url(name: str) -> str:
+    """Fingerprinted URL of a static file, or the plain /static path when not built."""
+    name = name.lstrip("/")
+    return "/static/" + _manifest().get(name, name)
+
+
+def _accepted(header: str) -> set[str]:
+    out = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        out.add(token.strip().lower())
+    return out
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a ``.br``/``.gz`` sibling when the client
+    accepts it, and caches fingerprinted files (dist/) forever.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        accepted = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, ext in _ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + ext)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                resp = self.file_response(full_path, stat_result, scope)
+                # نوع المحتوى من الاسم الأصلي، والترميز من الامتداد
+                resp.headers["Content-Type"] = self._media_type(path)
+                resp.headers["Content-Encoding"] = encoding
+                resp.headers["Vary"] = "Accept-Encoding"
+                return self._cache(resp, path)
+        resp = await super().get_response(path, scope)
+        if path.startswith(DIST_PREFIX):
+            resp.headers["Vary"] = "Accept-Encoding"
+        return self._cache(resp, path)
+
+    @staticmethod
+    def _media_type(path: str) -> str:
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        return media_type
+
+    @staticmethod
+    def _cache(resp: Response, path: str) -> Response:
+        if resp.status_code not in (200, 304):
+            return resp
+        content_type = resp.headers.get("content-type", "")
+        if path.startswith(DIST_PREFIX) or content_type.startswith("image/"):
+            resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        elif content_type.split(";")[0] in ("text/css", "application/javascript", "text/javascript"):
+            resp.headers["Cache-Control"] = "public, max-age=86400"
+        return resp
@@ -1,6 +1,12 @@
 # app/templating.py
+from pathlib import Path
+
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from . import profiling
 from .config import settings
+from .static_assets import static_url
 
 def build_embed_url(provider: str, vid: str, vimeo_hash: str | None = None) -> str:
     p = (provider or "").lower()
@@ -18,6 +24,34 @@ def build_embed_url(provider: str, vid: str, vimeo_hash: str | None = None) -> s
         return f"https://iframe.videodelivery.net/{vid}"
     return str(vid)
 
-templates = Jinja2Templates(directory="templates")
+class ProfiledTemplates(Jinja2Templates):
+    """Jinja2Templates whose renders show up as "template" spans in profiled requests."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        name = kwargs.get("name") or next((a for a in args if isinstance(a, str)), "?")
+        with profiling.span("template", name):
+            return super().TemplateResponse(*args, **kwargs)
+
+def _bytecode_cache() -> FileSystemBytecodeCache | None:
+    """Compiled templates on disk: a worker (or restart) loads them instead of re-parsing."""
+    if not settings.TEMPLATE_CACHE_DIR:
+        return None
+    path = Path(settings.TEMPLATE_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(path))
+
+templates = ProfiledTemplates(
+    directory="templates",
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=settings.TEMPLATE_AUTO_RELOAD,   # prod: لا stat لكل قالب مع كل عرض
+)
 templates.env.globals["settings"] = settings
 templates.env.globals["build_embed_url"] = build_embed_url
+templates.env.globals["static_url"] = static_url
+
+def precompile() -> int:
+    """Load every template now (gunicorn master with preload_app: shared by the workers)."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
@@ -1,4 +1,5 @@
 import re
+import functools
 import secrets
 import unicodedata
 import uuid
@@ -6,10 +7,13 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from passlib.context import CryptContext
 
+@functools.lru_cache(maxsize=1)
+def pwd_context():
+    """bcrypt context, built on first login (passlib is slow to import)."""
+    from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def gen_slug(n: int = 8) -> str:
@@ -36,7 +40,7 @@ def verify_password(plain: str, hashed: str) -> bool:
     Returns:
         bool: True if the password matches, False otherwise.
     """
-    return pwd_context.verify(plain, hashed)
+    return pwd_context().verify(plain, hashed)
 
 
 def hash_password(plain: str) -> str:
@@ -49,7 +53,7 @@ def hash_password(plain: str) -> str:
     Returns:
         str: Hashed password.
     """
-    return pwd_context.hash(plain)
+    return pwd_context().hash(plain)
 
 
 def is_expired(expires_at: Optional[datetime]) -> bool:
@@ -0,0 +1,51 @@
+"""
+Compute Asset.thumbhash for assets uploaded before ThumbHash placeholders,
+and drop their old base64 LQIP.
+
+    python migrate_schema.py      # adds the thumbhash column first
+    python backfill_thumbhash.py
+"""
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services.thumbhash import image_to_thumbhash
+
+BATCH = 200
+
+
+def _source(asset: models.Asset) -> Path:
+    base = Path(settings.STORAGE_DIR)
+    f_rel = Path(str(asset.filename).replace("\\", "/"))
+    thumb = base / f"albums/{asset.album_id}/thumb/400/{f_rel.stem}.jpg"
+    return thumb if thumb.exists() else base / f_rel
+
+
+def main():
+    db = SessionLocal()
+    done = skipped = 0
+    try:
+        q = db.query(models.Asset).filter(models.Asset.thumbhash.is_(None)).order_by(models.Asset.id)
+        for asset in q.yield_per(BATCH):
+            path = _source(asset)
+            try:
+                with Image.open(path) as im:
+                    asset.thumbhash = image_to_thumbhash(ImageOps.exif_transpose(im))
+                asset.lqip = None
+                done += 1
+            except Exception as e:
+                print(f"⚠️ {asset.id}: {e}")
+                skipped += 1
+            if done % BATCH == 0:
+                db.commit()
+        db.commit()
+    finally:
+        db.close()
+    print(f"✅ thumbhash: {done} updated, {skipped} skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# benchmarks/fake_drive.py
+"""
+Local stand-in for Google Drive, good enough for app/services/gdrive.py.
+
+A threaded HTTP server keeps files in memory and answers the few
+endpoints the app uses (list/create/get metadata, ``alt=media`` with
+Range). ``install()`` points the gdrive module at it: a minimal
+``service`` object with the googleapiclient call shape, and a requests
+session that rewrites www.googleapis.com to the local server. Every call
+goes through a real socket, so latency and copying costs are counted.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+GOOGLE = "https://www.googleapis.com"
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files: Dict[str, dict] = {}
+        self.ids = itertools.count(1)
+
+    def add(self, name: str, parents, mime: str, data: bytes = b"") -> str:
+        with self.lock:
+            fid = f"fake{next(self.ids)}"
+            self.files[fid] = {"id": fid, "name": name, "parents": list(parents or []), "mimeType": mime, "data": data}
+            return fid
+
+
+class _Handler(BaseHTTPRequestHandler):
+    store: _Store
+
+    def log_message(self, *args):  # هادئ
+        pass
+
+    def _json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        m = re.fullmatch(r"/drive/v3/files/([^/]+)", url.path)
+        if m:
+            f = self.store.files.get(m.group(1))
+            if f is None:
+                return self._json({"error": "not found"}, 404)
+            if qs.get("alt") != "media":
+                return self._json({k: v for k, v in f.items() if k != "data"} | {"size": str(len(f["data"]))})
+            data, status = f["data"], 200
+            rng = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if rng:
+                start = int(rng.group(1))
+                end = int(rng.group(2)) if rng.group(2) else len(data) - 1
+                data, status = data[start:end + 1], 206
+            self.send_response(status)
+            self.send_header("Content-Type", f["mimeType"])
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if url.path == "/drive/v3/files":
+            q = qs.get("q", "")
+            parent = re.search(r"'([^']+)' in parents", q)
+            name = re.search(r"name='([^']+)'", q)
+            files = [
+                {k: v for k, v in f.items() if k != "data"}
+                for f in list(self.store.files.values())
+                if (not parent or parent.group(1) in f["parents"]) and (not name or f["name"] == name.group(1))
+            ]
+            return self._json({"files": files})
+        self._json({"error": "unknown"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if url.path == "/drive/v3/files":
+            meta = json.loads(body or b"{}")
+            fid = self.store.add(meta.get("name", ""), meta.get("parents"), meta.get("mimeType", ""))
+            return self._json({"id": fid})
+        if url.path == "/upload/drive/v3/files":
+            qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+            fid = self.store.add(qs.get("name", ""), [qs.get("parent", "")], qs.get("mime", ""), body)
+            return self._json({"id": fid})
+        self._json({"error": "unknown"}, 404)
+
+
+class FakeDriveServer:
+    def __init__(self):
+        self.store = _Store()
+        handler = type("Handler", (_Handler,), {"store": self.store})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-drive", daemon=True)
+
+    def __enter__(self) -> "FakeDriveServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def put(self, name: str, data: bytes, mime: str = "image/jpeg", parent: str = "root") -> str:
+        return self.store.add(name, [parent], mime, data)
+
+
+# ---- googleapiclient-shaped client ----
+
+class _Call:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class _Files:
+    def __init__(self, session: requests.Session, base: str):
+        self.s = session
+        self.base = base
+
+    def list(self, q: str = "", **kw):
+        return _Call(lambda: self.s.get(f"{self.base}/drive/v3/files", params={"q": q}).json())
+
+    def get(self, fileId: str, **kw):
+        return _Call(lambda: self.s.get(f"{self.base}/drive/v3/files/{fileId}").json())
+
+    def create(self, body: dict, media_body=None, **kw):
+        if media_body is None:
+            return _Call(lambda: self.s.post(f"{self.base}/drive/v3/files", json=body).json())
+
+        def _upload():
+            data = media_body.getbytes(0, media_body.size())
+            params = {"name": body.get("name", ""), "parent": (body.get("parents") or [""])[0],
+                      "mime": media_body.mimetype()}
+            return self.s.post(f"{self.base}/upload/drive/v3/files", params=params, data=data).json()
+        return _Call(_upload)
+
+    def delete(self, fileId: str, **kw):
+        return _Call(lambda: None)
+
+
+class FakeService:
+    def __init__(self, base: str):
+        self._files = _Files(requests.Session(), base)
+
+    def files(self) -> _Files:
+        return self._files
+
+
+class _RewritingSession(requests.Session):
+    """requests session sending www.googleapis.com calls to the fake server."""
+
+    def __init__(self, base: str):
+        super().__init__()
+        self._base = base
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(GOOGLE):
+            url = self._base + url[len(GOOGLE):]
+        return super().request(method, url, *args, **kwargs)
+
+
+def install(server: FakeDriveServer, root_folder: Optional[str] = None) -> None:
+    """Point app.services.gdrive at the fake server and turn Drive on."""
+    from app.config import settings
+    from app.services import gdrive
+
+    gdrive._service_obj = FakeService(server.base)
+    gdrive._sess = _RewritingSession(server.base)
+    settings.USE_GDRIVE = True
+    settings.GDRIVE_ROOT_FOLDER_ID = root_folder or server.store.add("root", [], "application/vnd.google-apps.folder")
+
+
+def uninstall() -> None:
+    from app.config import settings
+    from app.services import gdrive
+
+    gdrive._service_obj = gdrive._sess = None
+    settings.USE_GDRIVE = False
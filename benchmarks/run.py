@@ -0,0 +1,354 @@
+# benchmarks/run.py
+"""
+Benchmark suite for the public gallery, downloads and uploads.
+
+Usage (from the project root)::
+
+    python -m benchmarks.run                           # 100 and 1000 assets
+    python -m benchmarks.run --sizes 100,1000,5000 --requests 500 -c 16
+    python -m benchmarks.run --sizes 2000 --skip-upload --no-drive   # gallery templates
+    python -m benchmarks.run --compare benchmarks/results/<old>.json
+
+Each run gets a fresh SQLite DB and storage tree in a temp directory
+(or --workdir), seeds synthetic albums (benchmarks/seed.py) and drives
+the app in-process over ASGI with httpx, so numbers measure the app and
+not the network. Drive scenarios use a local fake Drive server
+(benchmarks/fake_drive.py).
+
+Scenarios, per album size:
+  page_cold      /s/{slug}, page and fragment caches cleared before every request
+  page_edit      /s/{slug} right after one asset changed (page rebuilt from fragments)
+  page_warm      /s/{slug} served from the page cache
+  page_render    public_album.html rendered from prepared data (template cost only)
+  thumb_local    /s/{slug}/thumb/{id}?t=...   (local 400px variant)
+  media_signed   signed /media URL of the same file
+  thumb_drive    /s/{slug}/thumb/{id} streamed from (fake) Drive
+  zip            selection ZIP export (50 originals)
+and once per run:
+  upload         POST /admin/albums/{id}/upload, 3000x2000 JPEGs + variants
+  upload_drive   the same with the Drive copy enabled
+
+Results (p50/p95/p99 latency, req/s, MB/s) are printed and saved as JSON
+under benchmarks/results/; --compare exits with status 1 when a p95
+regressed by more than --threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+ADMIN_PASSWORD = "bench"
+
+
+def _configure(workdir: Path) -> None:
+    """Settings are read at import time: point them at the scratch dir before importing app."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{(workdir / 'bench.db').as_posix()}"
+    os.environ["STORAGE_DIR"] = str(workdir / "storage")
+    os.environ["THUMBS_DIR"] = str(workdir / "storage" / "_thumbs")
+    os.environ["PROFILE_DIR"] = str(workdir / "profiles")
+    os.environ["ADMIN_PASSWORD"] = ADMIN_PASSWORD
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ["TRASH_SWEEP_INTERVAL"] = "0"
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    if len(latencies) < 2:
+        v = latencies[0] if latencies else 0.0
+        return {"p50": v, "p95": v, "p99": v}
+    q = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": q[49], "p95": q[94], "p99": q[98]}
+
+
+async def measure(fn: Callable[[], Awaitable[int]], requests: int, concurrency: int, warmup: int = 5) -> dict:
+    """
+    Run ``fn`` ``requests`` times with ``concurrency`` in flight, after
+    ``warmup`` unmeasured calls. ``fn`` returns the response size in
+    bytes and raises on a bad status.
+    """
+    for _ in range(warmup):
+        await fn()
+    latencies: List[float] = []
+    total_bytes = 0
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal total_bytes, errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            try:
+                total_bytes += await fn()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mb_per_s": round(total_bytes / wall / 1e6, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        **{k: round(v * 1000, 3) for k, v in percentiles(latencies).items()},
+    }
+
+
+def _ok(resp) -> int:
+    if resp.status_code != 200:
+        raise RuntimeError(f"{resp.request.url} -> {resp.status_code}")
+    return len(resp.content)
+
+
+def _page_context(album, token: str) -> dict:
+    """What open_share passes to public_album.html, built once (no DB or URL signing in the loop)."""
+    from app import models
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.routers.public import _asset_to_dict
+
+    db = SessionLocal()
+    try:
+        row = db.get(models.Album, album.album_id)
+        assets = [_asset_to_dict(a, album.slug, token) for a in row.assets]
+        share = db.get(models.ShareLink, album.share_id)
+        return {
+            "request": None, "album": row, "share": share, "locked": False, "site_title": settings.SITE_TITLE,
+            "hero": None, "gallery_assets": assets, "gallery_videos": [],
+        }
+    finally:
+        db.close()
+
+
+async def bench_album(client, size: int, args, drive) -> Dict[str, dict]:
+    from app import models
+    from app.database import SessionLocal
+    from app.services import fragments, page_cache, signing
+    from app.services.variants import SUBDIRS
+    from app.templating import templates
+    from benchmarks import fake_drive
+    from benchmarks.seed import seed_album
+
+    t0 = time.perf_counter()
+    album = seed_album(size, drive=drive)
+    print(f"  seeded {size} assets in {time.perf_counter() - t0:.1f}s")
+    token = signing.make_asset_token(album.slug, album.album_id, None)
+    n, c = args.requests, args.concurrency
+    out: Dict[str, dict] = {}
+
+    async def page_cold():
+        page_cache.pages.clear()
+        fragments.fragments.clear()
+        return _ok(await client.get(f"/s/{album.slug}"))
+
+    async def page_edit():
+        db = SessionLocal()
+        try:
+            a = db.get(models.Asset, random.choice(album.asset_ids))
+            a.sort_order = (a.sort_order or 0) + 1    # ORM events drop the page and this fragment
+            db.commit()
+        finally:
+            db.close()
+        return _ok(await client.get(f"/s/{album.slug}"))
+
+    async def page_warm():
+        return _ok(await client.get(f"/s/{album.slug}"))
+
+    page_ctx = _page_context(album, token)
+
+    async def page_render():
+        return len(templates.get_template("public_album.html").render(page_ctx))
+
+    async def thumb():
+        aid = random.choice(album.asset_ids)
+        return _ok(await client.get(f"/s/{album.slug}/thumb/{aid}", params={"t": token}))
+
+    stems = [f"img{i:05d}" for i in range(size)]
+
+    async def media():
+        url = signing.media_url(f"albums/{album.album_id}/{SUBDIRS['thumb']}/{random.choice(stems)}.jpg")
+        return _ok(await client.get(url))
+
+    async def zip_export():
+        return _ok(await client.get(f"/admin/shares/{album.share_id}/selections/{album.visitor}.zip"))
+
+    # الصفحة الكاملة ثقيلة مع 5000 صورة: عدد أقل من الطلبات
+    page_n = max(5, n // 10) if size >= 1000 else n
+    out["page_cold"] = await measure(page_cold, page_n, 1, warmup=1)
+    out["page_edit"] = await measure(page_edit, page_n, 1, warmup=1)
+    out["page_warm"] = await measure(page_warm, n, c)
+    out["page_render"] = await measure(page_render, page_n, 1, warmup=1)
+    out["thumb_local"] = await measure(thumb, n, c)
+    out["media_signed"] = await measure(media, n, c)
+    if drive is not None:
+        fake_drive.install(drive)
+        try:
+            out["thumb_drive"] = await measure(thumb, n, c)
+        finally:
+            fake_drive.uninstall()
+    out["zip"] = await measure(zip_export, max(3, n // 50), min(c, 4), warmup=1)
+    return out
+
+
+async def bench_upload(client, args, drive) -> Dict[str, dict]:
+    from benchmarks import fake_drive
+    from benchmarks.seed import seed_album, synthetic_jpeg
+
+    images = [synthetic_jpeg(i) for i in range(args.upload_batch)]
+    results: Dict[str, dict] = {}
+
+    async def one_round(album_id: int):
+        files = [("files", (f"u{i}.jpg", data, "image/jpeg")) for i, data in enumerate(images)]
+        resp = await client.post(f"/admin/albums/{album_id}/upload", files=files, follow_redirects=False)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"upload -> {resp.status_code}")
+        return sum(len(d) for d in images)
+
+    modes = [("upload", None)] + ([("upload_drive", drive)] if drive is not None else [])
+    for name, srv in modes:
+        album = seed_album(0, title=f"Upload {name}")
+        if srv is not None:
+            fake_drive.install(srv)
+        try:
+            r = await measure(lambda: one_round(album.album_id), args.upload_rounds, 1, warmup=0)
+        finally:
+            if srv is not None:
+                fake_drive.uninstall()
+        r["images_per_s"] = round(r["rps"] * args.upload_batch, 2)
+        results[name] = r
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def print_table(results: Dict[str, Dict[str, dict]]) -> None:
+    print(f"\n{'group':<8} {'scenario':<14} {'req/s':>9} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>4}")
+    for group, scenarios in results.items():
+        for name, r in scenarios.items():
+            print(f"{group:<8} {name:<14} {r['rps']:>9} {r['mb_per_s']:>8} {r['p50']:>9} {r['p95']:>9} {r['p99']:>9} {r['errors']:>4}")
+
+
+def compare(new: dict, old_path: Path, threshold: float) -> bool:
+    """Print p95 / req/s changes against an older result file; True if nothing regressed."""
+    old = json.loads(old_path.read_text(encoding="utf-8"))["results"]
+    ok = True
+    print(f"\nCompared with {old_path.name} (regression: p95 > x{threshold}):")
+    for group, scenarios in new["results"].items():
+        for name, r in scenarios.items():
+            prev = old.get(group, {}).get(name)
+            if not prev or not prev.get("p95"):
+                continue
+            ratio = r["p95"] / prev["p95"]
+            flag = "REGRESSION" if ratio > threshold else ""
+            ok = ok and not flag
+            print(f"  {group:<8} {name:<14} p95 {prev['p95']:>9} -> {r['p95']:>9} (x{ratio:.2f})  "
+                  f"req/s {prev['rps']} -> {r['rps']}  {flag}")
+    return ok
+
+
+async def main_async(args) -> dict:
+    import httpx
+
+    from app.main import app
+    from benchmarks.fake_drive import FakeDriveServer
+
+    results: Dict[str, Dict[str, dict]] = {}
+    transport = httpx.ASGITransport(app=app)
+    with FakeDriveServer() as drive:
+        drive = None if args.no_drive else drive
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            r = await client.post("/admin/login", data={"password": ADMIN_PASSWORD}, follow_redirects=False)
+            if r.status_code >= 400:
+                raise SystemExit(f"admin login failed: {r.status_code}")
+            for size in args.sizes:
+                print(f"[bench] album with {size} assets")
+                results[str(size)] = await bench_album(client, size, args, drive)
+            if not args.skip_upload:
+                print("[bench] uploads")
+                results["upload"] = await bench_upload(client, args, drive)
+    return results
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--sizes", default="100,1000", help="comma-separated album sizes (assets)")
+    p.add_argument("--requests", "-n", type=int, default=200, help="requests per scenario")
+    p.add_argument("--concurrency", "-c", type=int, default=8)
+    p.add_argument("--upload-batch", type=int, default=4, help="images per upload request")
+    p.add_argument("--upload-rounds", type=int, default=3)
+    p.add_argument("--skip-upload", action="store_true")
+    p.add_argument("--no-drive", action="store_true", help="skip the fake Drive scenarios")
+    p.add_argument("--workdir", type=Path, help="scratch dir for DB + storage (default: temp dir)")
+    p.add_argument("--out", type=Path, help="result file (default: benchmarks/results/<timestamp>.json)")
+    p.add_argument("--compare", type=Path, help="older result file to compare against")
+    p.add_argument("--threshold", type=float, default=1.2, help="p95 ratio counted as a regression")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    tmp = None
+    workdir = args.workdir
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="dichfoto-bench-")
+        workdir = Path(tmp.name)
+    workdir.mkdir(parents=True, exist_ok=True)
+    _configure(workdir)
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)  # templates/ و static/ نسبيان
+
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        },
+        "results": results,
+    }
+    print_table(results)
+    out = args.out or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nsaved {out}")
+
+    if args.compare and not compare(report, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# benchmarks/seed.py
+"""
+Synthetic albums for the benchmarks.
+
+A handful of distinct source images are encoded once with the real
+variant pipeline; every asset then gets hard links (copies where links
+are not supported) to one of them, so a 5,000-asset album costs seconds
+and almost no disk. Rows are bulk-inserted.
+"""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from PIL import Image, ImageDraw
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import selections
+from app.services.variants import SUBDIRS, make_variants
+from app.utils import gen_slug
+
+DISTINCT = 8
+
+
+@dataclass
+class SeededAlbum:
+    album_id: int
+    share_id: int
+    slug: str
+    asset_ids: List[int]
+    visitor: str
+
+
+def synthetic_jpeg(i: int, size=(3000, 2000)) -> bytes:
+    """Gradient + shapes: large enough to behave like a camera JPEG when encoded."""
+    w, h = size
+    im = Image.linear_gradient("L").resize(size).convert("RGB")
+    d = ImageDraw.Draw(im)
+    for k in range(12):
+        x, y = (i * 997 + k * 331) % w, (i * 613 + k * 271) % h
+        d.ellipse([x, y, x + w // 6, y + h // 6], fill=((i * 40 + k * 20) % 255, (k * 60) % 255, (i * 90) % 255))
+    b = io.BytesIO()
+    im.save(b, "JPEG", quality=90)
+    return b.getvalue()
+
+
+def _link(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _templates(album_id: int) -> List[dict]:
+    """Originals + variants for the DISTINCT source images of one album."""
+    root = Path(settings.STORAGE_DIR)
+    out = []
+    for i in range(DISTINCT):
+        stem = f"tpl{i}"
+        orig = root / f"albums/{album_id}/original/{stem}.jpg"
+        orig.parent.mkdir(parents=True, exist_ok=True)
+        orig.write_bytes(synthetic_jpeg(i, (1600, 1067)))
+        info = make_variants(orig, root, album_id, stem)
+        out.append({"stem": stem, "thumbhash": info["thumbhash"], "size": orig.stat().st_size})
+    return out
+
+
+def seed_album(n_assets: int, title: Optional[str] = None, drive=None) -> SeededAlbum:
+    """
+    Create an album of ``n_assets`` assets with a share link and one
+    visitor selection covering the first 50 assets (for the ZIP export).
+    ``drive`` (a FakeDriveServer) also gets the originals and thumbnails.
+    """
+    db = SessionLocal()
+    try:
+        album = models.Album(title=title or f"Bench {n_assets}")
+        db.add(album)
+        db.commit()
+        root = Path(settings.STORAGE_DIR)
+        tpls = _templates(album.id)
+
+        drive_ids = {}
+        if drive is not None:
+            for t in tpls:
+                orig = (root / f"albums/{album.id}/original/{t['stem']}.jpg").read_bytes()
+                thumb = (root / f"albums/{album.id}/{SUBDIRS['thumb']}/{t['stem']}.jpg").read_bytes()
+                drive_ids[t["stem"]] = (drive.put(f"{t['stem']}.jpg", orig), drive.put(f"{t['stem']}-t.jpg", thumb))
+
+        rows = []
+        for i in range(n_assets):
+            t = tpls[i % DISTINCT]
+            stem = f"img{i:05d}"
+            base = f"albums/{album.id}"
+            _link(root / f"{base}/original/{t['stem']}.jpg", root / f"{base}/original/{stem}.jpg")
+            for sub in SUBDIRS.values():
+                for ext in ("jpg", "webp"):
+                    _link(root / f"{base}/{sub}/{t['stem']}.{ext}", root / f"{base}/{sub}/{stem}.{ext}")
+            gfile, gthumb = drive_ids.get(t["stem"], (None, None))
+            rows.append({
+                "album_id": album.id,
+                "filename": f"{base}/original/{stem}.jpg",
+                "original_name": f"{stem}.jpg",
+                "mime_type": "image/jpeg",
+                "size": t["size"],
+                "width": 1600,
+                "height": 1067,
+                "thumbhash": t["thumbhash"],
+                "sort_order": (i + 1) * 10,
+                "gdrive_file_id": gfile,
+                "gdrive_thumb_id": gthumb,
+            })
+        db.bulk_insert_mappings(models.Asset, rows)
+
+        share = models.ShareLink(album_id=album.id, slug=f"bench-{n_assets}-{gen_slug(4)}", allow_zip=True)
+        db.add(share)
+        db.commit()
+
+        ids = [i for (i,) in db.query(models.Asset.id).filter(models.Asset.album_id == album.id).order_by(models.Asset.id)]
+        visitor = "bench-visitor"
+        picked = ids[:50]
+        db.add(models.Selection(share_id=share.id, visitor_id=visitor, asset_ids=selections.pack(picked), count=len(picked)))
+        db.commit()
+        return SeededAlbum(album.id, share.id, share.slug, ids, visitor)
+    finally:
+        db.close()
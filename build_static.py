@@ -0,0 +1,64 @@
+"""
+Fingerprint static/ into static/dist/ with .br and .gz siblings.
+
+    python build_static.py
+
+Writes static/dist/<name>.<hash><ext> for every file in static/, brotli
+and gzip siblings for text assets, and static/dist/manifest.json mapping "style.css" to its
+fingerprinted name. Run it on deploy; static_url() falls back to the
+plain /static paths when no manifest exists.
+"""
+import gzip
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import brotli
+
+SRC = Path("static")
+DIST_NAME = "dist"
+COMPRESS_EXT = {".css", ".js", ".svg", ".json", ".txt", ".html", ".ico", ".map"}
+MIN_SIZE = 256  # ملفات أصغر لا تستفيد من الضغط
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _write_compressed(path: Path, data: bytes) -> None:
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        path.with_name(path.name + ".gz").write_bytes(gz)
+    br = brotli.compress(data, quality=11)
+    if len(br) < len(data):
+        path.with_name(path.name + ".br").write_bytes(br)
+
+
+def build(src: Path = SRC) -> dict:
+    dist = src / DIST_NAME
+    if dist.exists():
+        shutil.rmtree(dist)
+    dist.mkdir(parents=True)
+
+    manifest = {}
+    for f in sorted(src.rglob("*")):
+        if not f.is_file() or dist in f.parents:
+            continue
+        rel = f.relative_to(src)
+        data = f.read_bytes()
+        out = dist / rel.parent / f"{f.stem}.{fingerprint(data)}{f.suffix}"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(data)
+        if f.suffix.lower() in COMPRESS_EXT and len(data) >= MIN_SIZE:
+            _write_compressed(out, data)
+        manifest[rel.as_posix()] = out.relative_to(src).as_posix()
+        print(f"✅ {rel.as_posix()} -> {manifest[rel.as_posix()]}")
+
+    (dist / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+if __name__ == "__main__":
+    build(Path(sys.argv[1]) if len(sys.argv) > 1 else SRC)
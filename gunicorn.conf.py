@@ -0,0 +1,54 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py app.main:app
+import gc
+import os
+import shutil
+
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+bind = os.environ.get("BIND", "127.0.0.1:8000")
+
+# تحميل التطبيق في الـ master قبل fork: الكود والقوالب والإعدادات صفحات مشتركة بين العمّال
+preload_app = os.environ.get("PRELOAD_APP", "1") != "0"
+
+# مقاييس Prometheus مجمّعة من كل العمّال (app/metrics.py)؛ يجب ضبطها قبل استيراد التطبيق
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/dichfoto-metrics")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)  # preload يستورد المقاييس قبل on_starting
+
+
+def on_starting(server):
+    # ملفات mmap من تشغيل سابق تُفسد المجاميع
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+    # الجداول مرة واحدة في الـ master بدل كل عامل (AUTO_CREATE_SCHEMA=False في prod)
+    from app.database import engine, init_schema
+
+    init_schema()
+    engine.dispose()  # لا اتصالات مفتوحة تُورَّث عبر fork
+
+
+def when_ready(server):
+    # بعد تحميل التطبيق وقبل أول fork
+    if server.cfg.preload_app:
+        from app.main import warm_up
+
+        warm_up()
+        # كائنات الـ master خارج جامع القمامة: لا يلمسها GC العامل فتبقى الصفحات مشتركة
+        gc.collect()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app.database import all_engines
+
+        for engine in all_engines():
+            engine.dispose(close=False)  # اتصالات الـ master (إن وُجدت) ليست لهذا العامل
+
+
+def child_exit(server, worker):
+    from app.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
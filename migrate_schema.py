@@ -0,0 +1,145 @@
+import sqlite3
+import sys
+
+DB_PATH = "app.db"
+
+# أعمدة أُضيفت إلى النماذج بعد إنشاء الجداول (create_all لا يعدّل جداول موجودة)
+COLUMNS = [
+    ("assets", "orientation INTEGER NOT NULL DEFAULT 0"),
+    ("albums", "archived_at DATETIME"),
+    ("assets", "like_count INTEGER NOT NULL DEFAULT 0"),
+    ("assets", "thumbhash VARCHAR(48)"),
+    ("assets", "focal_x FLOAT"),
+    ("assets", "focal_y FLOAT"),
+    ("albums", "cover_renditions TEXT"),
+    ("videos", "poster_path VARCHAR"),
+    ("videos", "poster_fetched_at DATETIME"),
+    ("assets", "media_rev INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def add_column_if_not_exists(cur, table, column_def):
+    """
+    يضيف عمود لو مش موجود بالفعل.
+    table: اسم الجدول
+    column_def: تعريف العمود مثل "orientation INTEGER NOT NULL DEFAULT 0"
+    """
+    col_name = column_def.split()[0]
+    cur.execute(f"PRAGMA table_info({table})")
+    cols = [row[1] for row in cur.fetchall()]
+    if col_name not in cols:
+        print(f"➕ Adding column {col_name} to {table}")
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
+    else:
+        print(f"✅ Column {col_name} already exists in {table}")
+
+
+def migrate_legacy_likes(cur):
+    """
+    ينسخ الإعجابات من جدول likes القديم (صف لكل نقرة: url + liked) إلى
+    asset_likes، ثم يعيد حساب Asset.like_count من الصفوف.
+
+    الجدول القديم لا يعرف الزائر: صفوف user_id تأخذ آخر حالة لكل
+    (صورة، مستخدم)، وصفوف المجهولين يُحسب لها الصافي (إعجاب − إلغاء)
+    لكل صورة، كل إعجاب متبقٍّ بزائر legacy-<id>. الجدول القديم يبقى كما هو.
+    """
+    import re
+    from pathlib import PurePosixPath
+    from app.services.likes import parse_asset_url
+
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='likes'")
+    if cur.fetchone():
+        # روابط /media/albums/<album>/<subdir>/<stem>.<ext> تُطابق الأصل باسم الملف
+        stems = {
+            (album_id, PurePosixPath(str(filename).replace("\\", "/")).stem): asset_id
+            for asset_id, album_id, filename in cur.execute("SELECT id, album_id, filename FROM assets").fetchall()
+        }
+        media_re = re.compile(r"albums/(\d+)/(?:[^?#]*/)?([^/?#]+)\.\w+")
+
+        def asset_of(url):
+            _slug, asset_id = parse_asset_url(url)
+            if asset_id is None:
+                m = media_re.search(url or "")
+                asset_id = stems.get((int(m.group(1)), m.group(2))) if m else None
+            return asset_id
+
+        last = {}       # (asset_id, "legacy-u<user_id>") -> آخر حالة
+        anon = {}       # asset_id -> [ids of liked rows]
+        for row_id, url, user_id, liked in cur.execute("SELECT id, url, user_id, liked FROM likes ORDER BY id").fetchall():
+            asset_id = asset_of(url)
+            if asset_id is None:
+                continue
+            if user_id is not None:
+                last[(asset_id, f"legacy-u{user_id}")] = bool(liked)
+            elif liked:
+                anon.setdefault(asset_id, []).append(row_id)
+            elif anon.get(asset_id):
+                anon[asset_id].pop()   # إلغاء إعجاب يلغي أحدث إعجاب مجهول للصورة نفسها
+        rows = [key for key, liked in last.items() if liked]
+        rows += [(asset_id, f"legacy-{row_id}") for asset_id, ids in anon.items() for row_id in ids]
+        cur.executemany(
+            "INSERT OR IGNORE INTO asset_likes (asset_id, visitor_id) "
+            "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM assets WHERE id = ?)",
+            [(asset_id, visitor, asset_id) for asset_id, visitor in rows],
+        )
+        print(f"➕ Copied {cur.rowcount} legacy likes into asset_likes")
+
+    # العدّاد من الصفوف الفعلية (يصلح أي انحراف أيضًا)
+    cur.execute(
+        "WITH c AS (SELECT asset_id, COUNT(*) AS n FROM asset_likes GROUP BY asset_id) "
+        "UPDATE assets SET like_count = COALESCE((SELECT n FROM c WHERE c.asset_id = assets.id), 0)"
+    )
+    print("✅ Backfilled assets.like_count")
+
+
+def move_legacy_archives(cur):
+    """
+    tarballs الأرشيف كانت تحت STORAGE_DIR/archive (مكشوفة عبر /media)؛
+    تُنقل إلى ARCHIVE_DIR ويُحدَّث archive_path إلى اسم الملف فقط.
+    """
+    import shutil
+    from pathlib import Path
+    from app.config import settings
+
+    old_dir = Path(settings.STORAGE_DIR) / "archive"
+    if not old_dir.is_dir():
+        return
+    new_dir = Path(settings.ARCHIVE_DIR)
+    new_dir.mkdir(parents=True, exist_ok=True)
+    for tar in old_dir.glob("album_*.tar"):
+        print(f"📦 Moving {tar.name} to {new_dir}")
+        shutil.move(str(tar), new_dir / tar.name)
+    cur.execute(
+        "UPDATE album_jobs SET archive_path = substr(archive_path, length('archive/') + 1) "
+        "WHERE archive_path LIKE 'archive/%'"
+    )
+    try:
+        old_dir.rmdir()
+    except OSError:
+        pass
+
+
+def main(db_path: str = DB_PATH):
+    # الجداول الناقصة أولًا (نفس ما يفعله gunicorn on_starting)
+    from sqlalchemy import create_engine
+    from app.database import init_schema
+
+    init_schema(create_engine(f"sqlite:///{db_path}"))
+
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+
+    for table, column_def in COLUMNS:
+        add_column_if_not_exists(cur, table, column_def)
+
+    conn.commit()
+    migrate_legacy_likes(cur)
+    conn.commit()
+    move_legacy_archives(cur)
+    conn.commit()
+    conn.close()
+    print("✅ Migration finished successfully.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DB_PATH)
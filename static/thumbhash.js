@@ -0,0 +1,121 @@
+/* ThumbHash decoder (https://evanw.github.io/thumbhash/)
+   يرسم placeholder لكل <img data-thumbhash> حتى تُحمَّل الصورة الحقيقية. */
+(function () {
+  "use strict";
+
+  function aspectRatio(hash) {
+    var header = hash[3];
+    var hasAlpha = hash[2] & 0x80;
+    var isLandscape = hash[4] & 0x80;
+    var lx = isLandscape ? (hasAlpha ? 5 : 7) : header & 7;
+    var ly = isLandscape ? header & 7 : (hasAlpha ? 5 : 7);
+    return lx / ly;
+  }
+
+  function toRGBA(hash) {
+    var PI = Math.PI, min = Math.min, max = Math.max, cos = Math.cos, round = Math.round;
+    var header24 = hash[0] | (hash[1] << 8) | (hash[2] << 16);
+    var header16 = hash[3] | (hash[4] << 8);
+    var l_dc = (header24 & 63) / 63;
+    var p_dc = ((header24 >> 6) & 63) / 31.5 - 1;
+    var q_dc = ((header24 >> 12) & 63) / 31.5 - 1;
+    var l_scale = ((header24 >> 18) & 31) / 31;
+    var hasAlpha = header24 >> 23;
+    var p_scale = ((header16 >> 3) & 63) / 63;
+    var q_scale = ((header16 >> 9) & 63) / 63;
+    var isLandscape = header16 >> 15;
+    var lx = max(3, isLandscape ? (hasAlpha ? 5 : 7) : header16 & 7);
+    var ly = max(3, isLandscape ? header16 & 7 : (hasAlpha ? 5 : 7));
+    var a_dc = hasAlpha ? (hash[5] & 15) / 15 : 1;
+    var a_scale = (hash[5] >> 4) / 15;
+
+    var ac_start = hasAlpha ? 6 : 5, ac_index = 0;
+    function channel(nx, ny, scale) {
+      var ac = [];
+      for (var cy = 0; cy < ny; cy++)
+        for (var cx = cy ? 0 : 1; cx * ny < nx * (ny - cy); cx++, ac_index++)
+          ac.push((((hash[ac_start + (ac_index >> 1)] >> ((ac_index & 1) << 2)) & 15) / 7.5 - 1) * scale);
+      return ac;
+    }
+    var l_ac = channel(lx, ly, l_scale);
+    var p_ac = channel(3, 3, p_scale * 1.25);  // تعويض فقد التشبّع بالتكميم
+    var q_ac = channel(3, 3, q_scale * 1.25);
+    var a_ac = hasAlpha && channel(5, 5, a_scale);
+
+    var ratio = aspectRatio(hash);
+    var w = round(ratio > 1 ? 32 : 32 * ratio);
+    var h = round(ratio > 1 ? 32 / ratio : 32);
+    var rgba = new Uint8ClampedArray(w * h * 4), fx = [], fy = [];
+    for (var y = 0, i = 0; y < h; y++) {
+      for (var x = 0; x < w; x++, i += 4) {
+        var l = l_dc, p = p_dc, q = q_dc, a = a_dc, cx, cy, j, n, fy2;
+        for (cx = 0, n = max(lx, hasAlpha ? 5 : 3); cx < n; cx++) fx[cx] = cos(PI / w * (x + 0.5) * cx);
+        for (cy = 0, n = max(ly, hasAlpha ? 5 : 3); cy < n; cy++) fy[cy] = cos(PI / h * (y + 0.5) * cy);
+
+        for (cy = 0, j = 0; cy < ly; cy++)
+          for (cx = cy ? 0 : 1, fy2 = fy[cy] * 2; cx * ly < lx * (ly - cy); cx++, j++)
+            l += l_ac[j] * fx[cx] * fy2;
+
+        for (cy = 0, j = 0; cy < 3; cy++)
+          for (cx = cy ? 0 : 1, fy2 = fy[cy] * 2; cx < 3 - cy; cx++, j++) {
+            var f = fx[cx] * fy2;
+            p += p_ac[j] * f;
+            q += q_ac[j] * f;
+          }
+
+        if (hasAlpha)
+          for (cy = 0, j = 0; cy < 5; cy++)
+            for (cx = cy ? 0 : 1, fy2 = fy[cy] * 2; cx < 5 - cy; cx++, j++)
+              a += a_ac[j] * fx[cx] * fy2;
+
+        var b = l - 2 / 3 * p;
+        var r = (3 * l - b + q) / 2;
+        var g = r - q;
+        rgba[i] = max(0, 255 * min(1, r));
+        rgba[i + 1] = max(0, 255 * min(1, g));
+        rgba[i + 2] = max(0, 255 * min(1, b));
+        rgba[i + 3] = max(0, 255 * min(1, a));
+      }
+    }
+    return { w: w, h: h, rgba: rgba };
+  }
+
+  function decode(b64) {
+    var s = atob(b64), out = new Uint8Array(s.length);
+    for (var i = 0; i < s.length; i++) out[i] = s.charCodeAt(i);
+    return out;
+  }
+
+  function toDataURL(b64) {
+    var img = toRGBA(decode(b64));
+    var canvas = document.createElement("canvas");
+    canvas.width = img.w;
+    canvas.height = img.h;
+    canvas.getContext("2d").putImageData(new ImageData(img.rgba, img.w, img.h), 0, 0);
+    return canvas.toDataURL();
+  }
+
+  function apply(el) {
+    var b64 = el.getAttribute("data-thumbhash");
+    if (!b64 || el.complete && el.naturalWidth) return;
+    try {
+      var hash = decode(b64);
+      if (!el.getAttribute("width")) el.style.aspectRatio = String(aspectRatio(hash));
+      el.style.backgroundImage = "url(" + toDataURL(b64) + ")";
+      el.style.backgroundSize = "cover";
+      el.addEventListener("load", function () {
+        el.style.backgroundImage = "";
+        el.style.aspectRatio = "";
+      }, { once: true });
+    } catch (e) { /* hash تالف: بدون placeholder */ }
+  }
+
+  window.thumbhash = { toRGBA: toRGBA, toDataURL: toDataURL, aspectRatio: aspectRatio, apply: apply };
+  if (typeof document !== "undefined") {
+    var run = function () {
+      document.querySelectorAll("img[data-thumbhash]").forEach(apply);
+    };
+    if (document.readyState === "loading") document.addEventListener("DOMContentLoaded", run);
+    else run();
+  }
+})();
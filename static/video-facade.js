@@ -0,0 +1,28 @@
+/* Click-to-load video embeds: يستبدل .video-facade بـ iframe المزوّد عند النقر فقط،
+   فلا يُحمَّل JavaScript يوتيوب/فيميو لكل فيديو مع الصفحة. */
+(function () {
+  "use strict";
+
+  function withAutoplay(url, provider) {
+    // Cloudflare Stream يتوقع autoplay=true، يوتيوب وفيميو autoplay=1
+    var value = provider === "cloudflare" ? "true" : "1";
+    return url + (url.indexOf("?") === -1 ? "?" : "&") + "autoplay=" + value;
+  }
+
+  function activate(btn) {
+    var iframe = document.createElement("iframe");
+    iframe.className = "video-facade-frame";
+    iframe.src = withAutoplay(btn.getAttribute("data-embed"), btn.getAttribute("data-provider"));
+    iframe.title = btn.getAttribute("data-title") || "Video";
+    iframe.allow = "accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share";
+    iframe.referrerPolicy = "strict-origin-when-cross-origin";
+    iframe.allowFullscreen = true;
+    btn.replaceWith(iframe);
+    iframe.focus();
+  }
+
+  document.addEventListener("click", function (e) {
+    var btn = e.target.closest && e.target.closest(".video-facade");
+    if (btn) activate(btn);
+  });
+})();
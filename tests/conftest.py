@@ -0,0 +1,79 @@
+# tests/conftest.py
+"""
+Shared test setup. The environment is set before anything imports
+app.config, so the app under test never touches the real app.db,
+storage/ or .env.local values.
+"""
+import io
+import os
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="dichfoto-tests-")
+os.environ.update(
+    ENV="dev",
+    DATABASE_URL=f"sqlite:///{_TMP}/app.db",
+    STORAGE_DIR=f"{_TMP}/storage",
+    THUMBS_DIR=f"{_TMP}/storage/_thumbs",
+    ARCHIVE_DIR=f"{_TMP}/archive",
+    ADMIN_PASSWORD="test-admin",
+    SECRET_KEY="test-secret",
+    USE_GDRIVE="false",
+    LOG_REQUESTS="0",
+)
+
+ADMIN_PASSWORD = os.environ["ADMIN_PASSWORD"]
+
+
+def jpeg(size=(64, 48), color=(200, 30, 30)) -> bytes:
+    from PIL import Image
+
+    b = io.BytesIO()
+    Image.new("RGB", size, color).save(b, "JPEG")
+    return b.getvalue()
+
+
+@pytest.fixture
+def client():
+    """TestClient on a freshly created schema with every in-process cache emptied."""
+    from fastapi.testclient import TestClient
+
+    from app.database import Base, engine
+    from app.main import app
+    from app.services import fragments, likes, page_cache, share_cache
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    for cache in (share_cache.shares, share_cache.assets, page_cache.pages, fragments.fragments):
+        cache.clear()
+    likes._pending.clear()
+    likes._picks.clear()
+    yield TestClient(app)
+    likes.flush()
+
+
+@pytest.fixture
+def admin(client):
+    client.post("/admin/login", data={"password": ADMIN_PASSWORD}, follow_redirects=False)
+    return client
+
+
+def make_album(admin, n_assets=0, title="Album") -> int:
+    """Album (with ``n_assets`` uploaded JPEGs) created through the admin routes."""
+    from app import models
+    from app.database import SessionLocal
+
+    admin.post("/admin/albums/new", data={"title": title, "event_date": "2024-01-01"})
+    with SessionLocal() as db:
+        album_id = db.query(models.Album.id).order_by(models.Album.id.desc()).first()[0]
+    if n_assets:
+        files = [("files", (f"img{i}.jpg", jpeg(color=(i * 40 % 255, 30, 30)), "image/jpeg")) for i in range(n_assets)]
+        admin.post(f"/admin/albums/{album_id}/upload", files=files)
+    return album_id
+
+
+def make_share(admin, album_id: int, **form) -> str:
+    """Create a share link and return its slug."""
+    loc = admin.post(f"/admin/albums/{album_id}/share", data=form, follow_redirects=False).headers["location"]
+    return loc.rsplit("/", 1)[-1]
@@ -0,0 +1,114 @@
+# tests/test_album_jobs.py
+import tarfile
+from pathlib import Path
+
+from conftest import make_album, make_share
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import album_jobs, gdrive
+
+
+def _archive(admin, album_id):
+    r = admin.post(f"/admin/albums/{album_id}/archive", data={"mode": "tar"})
+    assert r.status_code == 200, r.text
+    return admin.get(f"/admin/jobs/{r.json()['job_id']}").json()
+
+
+def test_archive_is_outside_media_and_admin_only(admin):
+    album_id = make_album(admin, n_assets=2)
+    make_share(admin, album_id, password="secret")
+    job = _archive(admin, album_id)
+    assert job["status"] == "done", job
+
+    tar_path = album_jobs.archive_file(album_id)
+    assert tar_path.exists()
+    assert Path(settings.STORAGE_DIR).resolve() not in tar_path.resolve().parents
+    with tarfile.open(tar_path) as tar:
+        assert len(tar.getnames()) == 2
+
+    assert admin.get(f"/media/archive/{tar_path.name}").status_code == 404
+    r = admin.get(job["archive_url"])
+    assert r.status_code == 200 and r.content == tar_path.read_bytes()
+
+    admin.cookies.clear()
+    assert admin.get(job["archive_url"]).status_code == 403
+
+
+def test_delete_removes_archive(admin):
+    album_id = make_album(admin, n_assets=1)
+    _archive(admin, album_id)
+    assert album_jobs.archive_file(album_id).exists()
+
+    r = admin.post(f"/admin/albums/{album_id}/delete")
+    job = admin.get(f"/admin/jobs/{r.json()['job_id']}").json()
+    assert job["status"] == "done", job
+    assert not album_jobs.archive_file(album_id).exists()
+
+
+def test_one_job_per_album(admin):
+    album_id = make_album(admin, n_assets=1)
+    with SessionLocal() as db:
+        album_jobs.create_job(db, album_id, album_jobs.ARCHIVE_TAR)
+        db.commit()
+
+    assert admin.post(f"/admin/albums/{album_id}/archive", data={"mode": "tar"}).status_code == 409
+    assert admin.post(f"/admin/albums/{album_id}/delete").status_code == 409
+    with SessionLocal() as db:
+        assert db.query(models.AlbumJob).filter_by(album_id=album_id).count() == 1
+
+
+class _FakeDrive:
+    """files().create(...).next_chunk() كما في googleapiclient، يسجّل حجم كل دفعة."""
+
+    def __init__(self):
+        self.chunks = []
+        self.uploaded = {}
+
+    def files(self):
+        return self
+
+    def create(self, body, media_body, fields, supportsAllDrives):
+        drive = self
+
+        class _Request:
+            offset = 0
+
+            def next_chunk(self):
+                data = media_body.getbytes(self.offset, media_body.chunksize())
+                drive.chunks.append(len(data))
+                self.offset += len(data)
+                if self.offset < media_body.size():
+                    return None, None
+                file_id = f"drive-{len(drive.uploaded) + 1}"
+                drive.uploaded[file_id] = body
+                return None, {"id": file_id}
+
+        return _Request()
+
+
+def test_drive_upload_is_chunked(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"v" * 5000)
+    drive = _FakeDrive()
+    assert gdrive.upload_file(drive, "folder", path, "video/mp4", chunk_size=1024) == "drive-1"
+    assert drive.chunks == [1024, 1024, 1024, 1024, 904]
+    assert drive.uploaded["drive-1"] == {"name": "clip.mp4", "parents": ["folder"]}
+
+
+def test_archive_to_drive(admin, monkeypatch):
+    album_id = make_album(admin, n_assets=2)
+    drive = _FakeDrive()
+    monkeypatch.setattr(settings, "USE_GDRIVE", True)
+    monkeypatch.setattr(settings, "GDRIVE_ROOT_FOLDER_ID", "root")
+    monkeypatch.setattr(gdrive, "_service", lambda: drive)
+    monkeypatch.setattr(gdrive, "ensure_subfolder", lambda service, parent, name: f"{parent}/{name}")
+
+    r = admin.post(f"/admin/albums/{album_id}/archive", data={"mode": "drive"})
+    job = admin.get(f"/admin/jobs/{r.json()['job_id']}").json()
+    assert job["status"] == "done", job
+    assert {b["parents"][0] for b in drive.uploaded.values()} == {f"root/albums/{album_id}/original"}
+    with SessionLocal() as db:
+        assert {a.gdrive_file_id for a in db.query(models.Asset).filter_by(album_id=album_id)} == set(drive.uploaded)
+    assert not album_jobs.album_root(album_id).exists()
@@ -0,0 +1,55 @@
+# tests/test_batch.py
+from conftest import make_album
+
+from app import models
+from app.database import SessionLocal
+
+
+def _assets(album_id):
+    with SessionLocal() as db:
+        return [a.id for a in db.query(models.Asset).filter_by(album_id=album_id).order_by(models.Asset.id)]
+
+
+def test_per_op_results_and_partial_failure(admin):
+    album_id = make_album(admin, n_assets=3)
+    other = _assets(make_album(admin, n_assets=1, title="Other"))[0]
+    a1, a2, a3 = _assets(album_id)
+    with SessionLocal() as db:
+        a1_file = db.get(models.Asset, a1).filename
+
+    ops = [
+        {"op": "hide", "asset_id": a2},
+        {"op": "cover", "asset_id": a1},
+        {"op": "delete", "asset_id": a1},
+        {"op": "hide", "asset_id": a1},                 # حُذف في نفس الدفعة
+        {"op": "unhide", "asset_id": other},            # من ألبوم آخر
+        {"op": "reorder", "asset_ids": [a3, a1]},       # a1 محذوف
+        {"op": "reorder", "asset_ids": [a3]},
+        {"op": "rotate", "asset_id": a3, "dir": "cw"},
+    ]
+    body = admin.post(f"/admin/albums/{album_id}/assets/batch", json={"ops": ops}).json()
+
+    assert body["ok"] is False
+    assert [r["index"] for r in body["results"]] == list(range(len(ops)))
+    assert [r["ok"] for r in body["results"]] == [True, True, True, False, False, False, True, True]
+    assert body["results"][3] == {"index": 3, "op": "hide", "asset_id": a1, "ok": False, "error": "Asset not found in album"}
+    assert body["results"][4]["error"] == "Asset not found in album"
+    assert body["results"][5]["error"] == f"Unknown assets: [{a1}]"
+
+    # العمليات الناجحة محفوظة رغم فشل غيرها
+    with SessionLocal() as db:
+        album = db.get(models.Album, album_id)
+        assert album.cover_asset_id is None             # الغلاف حُذف مع أصله
+        assert db.get(models.Asset, a1) is None
+        assert db.get(models.Asset, a2).is_hidden
+        assert not db.get(models.Asset, other).is_hidden
+        assert [a.id for a in sorted(album.assets, key=lambda a: a.sort_order)] == [a3, a2]
+        assert db.get(models.Asset, a3).orientation == 90
+        assert a1_file in [t.target for t in db.query(models.TrashItem)]
+
+
+def test_missing_album_and_auth(admin):
+    assert admin.post("/admin/albums/999/assets/batch", json={"ops": []}).status_code == 404
+    assert admin.post("/admin/albums/1/assets/batch", json={"ops": [{"op": "explode"}]}).status_code == 422
+    admin.cookies.clear()
+    assert admin.post("/admin/albums/1/assets/batch", json={"ops": []}).status_code == 403
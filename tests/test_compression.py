@@ -0,0 +1,99 @@
+# tests/test_compression.py
+import gzip
+
+import brotli
+import pytest
+from conftest import make_album, make_share
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import CompressionMiddleware
+from app.services import compression
+
+HTML = "<p>" + "سلام " * 500 + "</p>"
+
+
+def _stream(request):
+    return StreamingResponse(iter([HTML.encode()[:2000], HTML.encode()[2000:]]), media_type="text/html")
+
+
+def _precompressed(request):
+    return Response(gzip.compress(HTML.encode()), media_type="text/html", headers={"Content-Encoding": "gzip"})
+
+
+app = Starlette(routes=[
+    Route("/html", lambda r: HTMLResponse(HTML)),
+    Route("/small", lambda r: HTMLResponse("<p>hi</p>")),
+    Route("/image", lambda r: Response(b"\xff\xd8" * 2000, media_type="image/jpeg")),
+    Route("/stream", _stream),
+    Route("/precompressed", _precompressed),
+])
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@pytest.fixture
+def raw():
+    client = TestClient(app)
+
+    def get(path, enc="gzip"):
+        # بدون فك تلقائي: البايتات كما خرجت من الوسيط
+        with client.stream("GET", path, headers={"Accept-Encoding": enc}) as r:
+            r.raw_body = b"".join(r.iter_raw())
+        return r
+
+    return get
+
+
+def _body(r):
+    return r.raw_body
+
+
+def test_compresses_large_text(raw):
+    r = raw("/html")
+    assert r.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in r.headers["vary"].lower()
+    data = _body(r)
+    assert int(r.headers["content-length"]) == len(data)
+    assert gzip.decompress(data).decode() == HTML
+
+
+def test_prefers_brotli(raw):
+    r = raw("/html", "gzip, br")
+    assert r.headers["content-encoding"] == "br"
+    assert brotli.decompress(_body(r)).decode() == HTML
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/stream"])
+def test_passthrough(raw, path):
+    r = raw(path)
+    assert "content-encoding" not in r.headers
+    assert len(_body(r)) > 0
+
+
+def test_streamed_body_is_not_buffered(raw):
+    r = raw("/stream")
+    assert "content-encoding" not in r.headers
+    assert _body(r).decode() == HTML
+
+
+def test_already_encoded_is_untouched(raw):
+    r = raw("/precompressed")
+    assert r.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(_body(r)).decode() == HTML      # لم يُضغط مرتين
+
+
+def test_identity_and_q0(raw):
+    assert "content-encoding" not in raw("/html", "identity").headers
+    assert "content-encoding" not in raw("/html", "gzip;q=0").headers
+    assert compression.choose_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_album_page_served_compressed_from_cache(admin):
+    slug = make_share(admin, make_album(admin, n_assets=2))
+    first = admin.get(f"/s/{slug}", headers={"Accept-Encoding": "gzip"})
+    second = admin.get(f"/s/{slug}", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == second.status_code == 200
+    assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+    assert first.text == second.text and "</html>" in first.text
@@ -0,0 +1,75 @@
+# tests/test_covers.py
+import json
+from pathlib import Path
+
+import pytest
+from conftest import make_album, make_share
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import covers
+
+
+@pytest.mark.parametrize(
+    "size, aspect, focal, box",
+    [
+        ((4000, 3000), 16 / 9, (0.5, 0.5), (0, 375, 4000, 2625)),
+        ((4000, 3000), 16 / 9, (0.5, 0.0), (0, 0, 4000, 2250)),        # الحافة العليا
+        ((4000, 3000), 9 / 16, (0.9, 0.5), (2312, 0, 4000, 3000)),     # محصور عند اليمين
+        ((4000, 3000), 9 / 16, (0.25, 0.5), (156, 0, 1844, 3000)),
+        ((1000, 3000), 16 / 9, (0.5, 1.0), (0, 2438, 1000, 3000)),
+    ],
+)
+def test_focal_crop(size, aspect, focal, box):
+    got = covers.focal_crop(*size, aspect, *focal)
+    assert got == box
+    assert abs((got[2] - got[0]) / (got[3] - got[1]) - aspect) < 0.01
+
+
+def _manifest(album_id):
+    with SessionLocal() as db:
+        raw = db.get(models.Album, album_id).cover_renditions
+    return json.loads(raw) if raw else None
+
+
+def test_cover_renditions_and_hero(admin):
+    album_id = make_album(admin, n_assets=2)
+    slug = make_share(admin, album_id)
+    with SessionLocal() as db:
+        a1, a2 = [a.id for a in db.query(models.Asset).filter_by(album_id=album_id).order_by(models.Asset.id)]
+        stem1 = Path(db.get(models.Asset, a1).filename).stem
+
+    admin.post(f"/admin/albums/{album_id}/cover/{a1}")
+    m = _manifest(album_id)
+    assert m["asset_id"] == a1 and m["stem"] == stem1 and set(m["crops"]) == {"landscape", "portrait"}
+    files = covers.rendition_paths(album_id, stem1)
+    assert files and all(p.suffix.lstrip(".") in m["formats"] for p in files)
+    assert {p.name.rsplit(".", 1)[0] for p in files} == {m["name"]}
+
+    r = admin.get(f"/s/{slug}")
+    assert "rel=preload" in r.headers["link"] and "/cover/landscape/" in r.headers["link"]
+    assert "(orientation: portrait)" in r.text
+
+    # نقطة التركيز على الغلاف تعيد التوليد باسم جديد (الرابط immutable)
+    assert admin.post(f"/admin/assets/{a1}/focal", data={"x": 0.1, "y": 0.9}).json()["ok"]
+    m2 = _manifest(album_id)
+    assert m2["focal"] == [0.1, 0.9] and m2["name"] != m["name"] and m2["name"].startswith(stem1 + ".")
+    assert f"/{m2['name']}.webp" in admin.get(f"/s/{slug}").headers["link"]
+    with SessionLocal() as db:
+        trashed = {t.target for t in db.query(models.TrashItem)}
+    base = Path(settings.STORAGE_DIR)
+    assert {p.relative_to(base).as_posix() for p in files} <= trashed
+    files = [p for p in covers.rendition_paths(album_id, stem1) if m2["name"] in p.name]
+    assert files
+
+    # تغيير الغلاف: قصّات الأصل السابق إلى سلة المحذوفات
+    admin.post(f"/admin/albums/{album_id}/cover/{a2}")
+    assert _manifest(album_id)["asset_id"] == a2
+    with SessionLocal() as db:
+        trashed = {t.target for t in db.query(models.TrashItem)}
+    base = Path(settings.STORAGE_DIR)
+    assert {p.relative_to(base).as_posix() for p in files} <= trashed
+
+    admin.post(f"/admin/albums/{album_id}/cover/clear")
+    assert _manifest(album_id) is None
@@ -0,0 +1,174 @@
+# tests/test_db_compat.py
+"""
+Queries whose SQL differs between backends, run against SQLite and,
+when TEST_POSTGRES_URL is set, PostgreSQL.
+
+The PostgreSQL database is wiped (drop_all/create_all). A throwaway
+cluster needs no Docker::
+
+    initdb -D /tmp/pgtest -U postgres --auth=trust
+    pg_ctl -D /tmp/pgtest -o "-k /tmp/pgtest -h ''" -l /tmp/pgtest/log start
+    TEST_POSTGRES_URL="postgresql://postgres@/postgres?host=/tmp/pgtest" pytest tests/test_db_compat.py
+"""
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models
+from app.database import Base, make_engine
+from app.services import likes, page_cache, selections, share_cache
+
+BACKENDS = [
+    "sqlite",
+    pytest.param(
+        "postgresql",
+        marks=pytest.mark.skipif(not os.environ.get("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set"),
+    ),
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def db(request, tmp_path):
+    if request.param == "sqlite":
+        engine = make_engine(f"sqlite:///{(tmp_path / 'compat.db').as_posix()}")
+    else:
+        engine = make_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    album = models.Album(title="A")
+    session.add(album)
+    session.flush()
+    session.add_all([models.Asset(album_id=album.id, filename=f"albums/1/original/{i}.jpg", original_name=f"{i}.jpg") for i in range(3)])
+    session.add(models.ShareLink(album_id=album.id, slug="compat", allow_zip=True))
+    session.commit()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def _asset_ids(db):
+    return [a.id for a in db.query(models.Asset).order_by(models.Asset.id)]
+
+
+def test_like_upsert_is_idempotent(db):
+    a1, a2, _ = _asset_ids(db)
+    stamp = db.get(models.Asset, a1).updated_at
+
+    assert likes.apply(db, {(a1, "v1"): True, (a2, "v1"): True}) == {a1: 1, a2: 1}
+    assert likes.apply(db, {(a1, "v1"): True}) == {}        # ON CONFLICT DO NOTHING
+    assert likes.apply(db, {(a2, "v1"): False}) == {a2: -1}
+    db.commit()
+
+    db.expire_all()
+    assert likes.album_counts(db, 1) == {a1: 1}
+    assert db.get(models.Asset, a1).updated_at == stamp    # العدّاد لا يغيّر إصدار الصفحة
+
+
+def test_album_version_changes_with_assets(db):
+    before = page_cache.album_version(db, 1)
+    assert before[1] == 3
+    db.add(models.Asset(album_id=1, filename="albums/1/original/new.jpg", original_name="new.jpg"))
+    db.commit()
+    assert page_cache.album_version(db, 1)[1] == 4
+
+
+def test_selection_binary_roundtrip(db):
+    share = db.query(models.ShareLink).one()
+    ids = _asset_ids(db)
+    for asset_id in reversed(ids):
+        selections.toggle(db, share, "v1", asset_id, True)
+    db.commit()
+
+    db.expire_all()
+    assert selections.get(db, share.id, "v1") == ids
+    summary = selections.album_summary(db, 1)
+    assert summary["visitors"][0]["count"] == 3
+    assert summary["assets"] == {i: 1 for i in ids}
+
+
+def test_selection_toggle_add_remove_noop(db):
+    share = db.query(models.ShareLink).one()
+    a1, a2, _ = _asset_ids(db)
+
+    assert selections.toggle(db, share, "v1", a1, False) == 0      # لا صف لإلغاء تحديد
+    assert db.get(models.Selection, (share.id, "v1")) is None
+    assert selections.toggle(db, share, "v1", a2, True) == 1
+    assert selections.toggle(db, share, "v1", a1, True) == 2
+    assert selections.toggle(db, share, "v1", a1, True) == 2       # موجود: لا تغيير
+    assert selections.toggle(db, share, "v1", a2, False) == 1
+    assert selections.toggle(db, share, "v1", a2, False) == 1
+    db.commit()
+
+    db.expire_all()
+    sel = db.get(models.Selection, (share.id, "v1"))
+    assert selections.unpack(sel.asset_ids) == [a1] and sel.count == 1
+
+
+def test_concurrent_toggles_from_two_workers(db):
+    """A second worker toggling the same visitor waits for the first instead of overwriting it."""
+    share = db.query(models.ShareLink).one()
+    share_id = share.id
+    a1, a2, a3 = _asset_ids(db)
+    selections.toggle(db, share, "v1", a3, True)
+    db.commit()
+
+    url = db.get_bind().url.render_as_string(hide_password=False)
+    if url.startswith("sqlite"):
+        engines = [database.sqlite_split(url)[1] for _ in range(2)]   # كاتب كل عامل
+    else:
+        engines = [make_engine(url)] * 2
+    first, second = (sessionmaker(bind=e)() for e in engines)
+    errors = []
+
+    def other_worker():
+        try:
+            selections.toggle(second, second.get(models.ShareLink, share_id), "v1", a2, True)
+            second.commit()
+        except Exception as e:   # pragma: no cover - يظهر في التأكيد أدناه
+            errors.append(e)
+
+    try:
+        selections.toggle(first, first.get(models.ShareLink, share_id), "v1", a1, True)
+        t = threading.Thread(target=other_worker)
+        t.start()
+        time.sleep(0.3)
+        first.commit()
+        t.join(10)
+    finally:
+        first.close()
+        second.close()
+        for e in set(engines):
+            e.dispose()
+
+    assert errors == []
+    db.expire_all()
+    sel = db.get(models.Selection, (share_id, "v1"))
+    assert selections.unpack(sel.asset_ids) == [a1, a2, a3] and sel.count == 3
+
+
+def test_share_lookup_join(db):
+    share_cache.shares.clear()
+    info = share_cache.get_share(db, "compat")
+    assert info.album_id == 1 and info.allow_zip and not info.archived
+    share_cache.shares.clear()
+
+
+def test_url_and_pool_sizing(monkeypatch):
+    from app import database
+    from app.config import settings
+
+    assert database.normalize_url("postgres://u:p@h/db") == "postgresql+psycopg://u:p@h/db"
+    assert database.normalize_url("postgresql://u@h/db") == "postgresql+psycopg://u@h/db"
+    assert database.normalize_url("sqlite:///./app.db") == "sqlite:///./app.db"
+
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", None)
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 90)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 5)
+    assert database.pool_size(workers=4) == 17     # 4 × (17 + 5) <= 90
+    assert database.pool_size(workers=1) == database.THREADPOOL_SIZE
+    assert database.pool_size(workers=64) == 2
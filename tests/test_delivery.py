@@ -0,0 +1,42 @@
+# tests/test_delivery.py
+from starlette.responses import FileResponse
+
+from app.config import settings
+from app.services import delivery
+
+
+def _file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path)
+    f = tmp_path / "albums" / "1" / "thumb" / "400" / "a b.jpg"
+    f.parent.mkdir(parents=True)
+    f.write_bytes(b"jpeg")
+    return f
+
+def test_disabled_serves_directly(tmp_path, monkeypatch):
+    f = _file(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "FILE_OFFLOAD", "")
+    resp = delivery.file_response(f, media_type="image/jpeg")
+    assert isinstance(resp, FileResponse)
+    assert "x-accel-redirect" not in resp.headers
+
+def test_x_accel_redirect(tmp_path, monkeypatch):
+    f = _file(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "FILE_OFFLOAD", "x-accel")
+    monkeypatch.setattr(settings, "FILE_OFFLOAD_PREFIX", "/_protected/")
+    resp = delivery.file_response(f, filename="صورة.jpg")
+    assert resp.body == b""
+    assert resp.headers["x-accel-redirect"] == "/_protected/albums/1/thumb/400/a%20b.jpg"
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["content-disposition"].startswith("attachment; filename*=utf-8''")
+
+def test_x_accel_outside_storage_falls_back(tmp_path, monkeypatch):
+    f = _file(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path / "other")
+    monkeypatch.setattr(settings, "FILE_OFFLOAD", "x-accel")
+    assert isinstance(delivery.file_response(f), FileResponse)
+
+def test_x_sendfile(tmp_path, monkeypatch):
+    f = _file(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "FILE_OFFLOAD", "x-sendfile")
+    resp = delivery.file_response(f, media_type="image/jpeg")
+    assert resp.headers["x-sendfile"] == str(f.resolve())
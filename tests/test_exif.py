@@ -0,0 +1,127 @@
+# tests/test_exif.py
+import io
+import struct
+
+import pytest
+from PIL import Image
+
+from app import models
+from app.config import settings
+from app.services import exif
+
+
+def _tiff(bo: str, entries) -> bytes:
+    """Minimal TIFF block: header + IFD0 with the given (tag, type, value) SHORT entries."""
+    head = (b"II" if bo == "<" else b"MM") + struct.pack(bo + "HI", 42, 8)
+    ifd = struct.pack(bo + "H", len(entries))
+    for tag, typ, value in entries:
+        ifd += struct.pack(bo + "HHI", tag, typ, 1) + struct.pack(bo + "H", value) + b"\0\0"
+    return head + ifd + struct.pack(bo + "I", 0)
+
+
+def _jpeg(app1_payload: bytes = None, seglen: int = None) -> bytes:
+    b = io.BytesIO()
+    Image.new("RGB", (32, 16), (10, 120, 200)).save(b, "JPEG")
+    data = b.getvalue()
+    if app1_payload is None:
+        return data
+    seg = b"\xff\xe1" + struct.pack(">H", seglen or len(app1_payload) + 2) + app1_payload
+    return data[:2] + seg + data[2:]
+
+
+def _exif_jpeg(bo: str, orientation: int) -> bytes:
+    return _jpeg(b"Exif\0\0" + _tiff(bo, [(0x010F, 3, 0), (exif.ORIENTATION_TAG, 3, orientation)]))
+
+
+def _write(tmp_path, data: bytes, name="a.jpg"):
+    p = tmp_path / name
+    p.write_bytes(data)
+    return p
+
+
+def _changed_bytes(before: bytes, after: bytes) -> list:
+    assert len(before) == len(after)
+    return [i for i, (x, y) in enumerate(zip(before, after)) if x != y]
+
+
+@pytest.mark.parametrize("bo", ["<", ">"])
+def test_rewrites_only_the_tag(tmp_path, bo):
+    before = _exif_jpeg(bo, 1)
+    p = _write(tmp_path, before)
+
+    assert exif.rotate_orientation(p, clockwise=True) == 6
+    after = p.read_bytes()
+    changed = _changed_bytes(before, after)
+    assert 1 <= len(changed) <= 2 and changed[-1] - changed[0] <= 1
+    # كل ما بعد APP1 (بيانات الصورة) مطابق بايتًا ببايت
+    app1_end = 4 + struct.unpack(">H", before[4:6])[0]
+    assert after[app1_end:] == before[app1_end:]
+    with Image.open(p) as im:
+        assert im.getexif()[exif.ORIENTATION_TAG] == 6
+        assert im.size == (32, 16)
+
+
+@pytest.mark.parametrize(
+    "start, turns, expected",
+    [
+        (6, [True], 3),            # مدوّرة مسبقًا: 90° إضافية
+        (6, [False], 1),
+        (6, [True, True], 8),      # 180°
+        (3, [False], 6),
+        (8, [True], 1),
+        (2, [True], 7),            # معكوسة
+        (1, [True] * 4, 1),        # دورة كاملة
+    ],
+)
+def test_composes_with_existing_value(tmp_path, start, turns, expected):
+    p = _write(tmp_path, _exif_jpeg(">", start))
+    for cw in turns:
+        value = exif.rotate_orientation(p, clockwise=cw)
+    assert value == expected
+    with Image.open(p) as im:
+        assert im.getexif()[exif.ORIENTATION_TAG] == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(_jpeg(), id="no-exif"),
+        pytest.param(_jpeg(b"Exif\0\0" + _tiff("<", [(0x010F, 3, 0)])), id="no-orientation-tag"),
+        pytest.param(_jpeg(b"Exif\0\0" + _tiff("<", [(exif.ORIENTATION_TAG, 3, 1)])[:14]), id="truncated-ifd"),
+        pytest.param(_jpeg(b"Exif\0\0XX*\0\x08\0\0\0"), id="bad-byte-order"),
+        pytest.param(_jpeg(b"Exif\0\0II*\0\xff\xff\0\0"), id="ifd-offset-past-end"),
+        pytest.param(_jpeg(b"Exif\0\0" + _tiff(">", [(exif.ORIENTATION_TAG, 3, 1)]), seglen=0xFFF0), id="segment-past-eof"),
+        pytest.param(b"\xff\xd8\xff\xe1\x00", id="truncated-file"),
+        pytest.param(b"\xff\xd8\xff\xe1\x00\x01Exif\0\0" + _tiff("<", [(exif.ORIENTATION_TAG, 3, 1)]), id="length-below-2"),
+        pytest.param(b"GIF89a", id="not-jpeg"),
+    ],
+)
+def test_missing_or_corrupt_exif_is_left_alone(tmp_path, data):
+    p = _write(tmp_path, data)
+    assert exif.rotate_orientation(p, clockwise=True) is None
+    assert p.read_bytes() == data
+
+
+def test_non_jpeg_suffix_is_skipped(tmp_path):
+    data = _exif_jpeg("<", 1)
+    p = _write(tmp_path, data, "a.png")
+    assert exif.rotate_orientation(p, clockwise=True) is None
+    assert p.read_bytes() == data
+
+
+def test_without_tag_rotation_falls_back_to_asset_orientation(tmp_path, monkeypatch):
+    from app.routers import admin
+
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path)
+    data = _jpeg()
+    orig = tmp_path / "albums" / "1" / "original" / "a.jpg"
+    orig.parent.mkdir(parents=True)
+    orig.write_bytes(data)
+    asset = models.Asset(album_id=1, filename="albums/1/original/a.jpg", width=32, height=16, orientation=90)
+
+    admin._rotate_asset_files(asset, clockwise=True)
+    assert asset.orientation == 180
+    admin._rotate_asset_files(asset, clockwise=False)
+    admin._rotate_asset_files(asset, clockwise=False)
+    assert asset.orientation == 0
+    assert orig.read_bytes() == data
@@ -0,0 +1,88 @@
+# tests/test_fragments.py
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import make_album, make_share
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base, SessionLocal
+from app.services import fragments
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(models.Album(title="A"))
+    session.add_all(
+        models.Asset(album_id=1, filename=f"albums/1/original/{i}.jpg", original_name=f"{i}.jpg", width=64, height=48)
+        for i in range(3)
+    )
+    session.commit()
+    fragments.fragments.clear()
+    yield session
+    session.close()
+    fragments.fragments.clear()
+
+
+def _render(db, context="slug:t1"):
+    calls = []
+
+    def to_dict(a):
+        calls.append(a.id)
+        return {"name": a.original_name, "url": f"/f/{a.id}", "thumb": None, "width": a.width, "height": a.height}
+
+    assets = db.query(models.Asset).order_by(models.Asset.id).all()
+    return str(fragments.render_items(assets, context, to_dict, "photo")), calls
+
+
+def test_only_changed_assets_are_rendered_again(db):
+    html, calls = _render(db)
+    assert calls == [1, 2, 3] and html.count("<figure") == 3
+    assert 'data-name="0.jpg"' in html
+
+    assert _render(db) == (html, [])
+
+    db.get(models.Asset, 2).width = 48                      # after_update يُسقط الجزء
+    db.commit()
+    html2, calls = _render(db)
+    assert calls == [2]
+    assert html2.count('width="48"') == 1
+
+
+def test_edit_from_another_worker_is_caught_by_updated_at(db):
+    _render(db)
+    # تحديث Core لا يطلق أحداث ORM، كتعديل من عامل آخر
+    db.execute(update(models.Asset).where(models.Asset.id == 1).values(updated_at=datetime.utcnow() + timedelta(seconds=5)))
+    db.commit()
+    db.expire_all()
+    assert _render(db)[1] == [1]
+
+
+def test_context_change_renders_everything(db):
+    _render(db)
+    assert _render(db, context="slug:t2")[1] == [1, 2, 3]
+
+
+def test_public_page_reflects_asset_edit(admin):
+    album_id = make_album(admin, n_assets=2)
+    slug = make_share(admin, album_id)
+    with SessionLocal() as db:
+        # الأول غلاف (hero) خارج الشبكة
+        asset_id = db.query(models.Asset.id).filter_by(album_id=album_id).order_by(models.Asset.sort_order).all()[1][0]
+
+    def placeholder():
+        html = admin.get(f"/s/{slug}").text
+        return re.search(r'<figure class="card">.*?data-thumbhash="([^"]+)"', html).group(1)
+
+    before = placeholder()
+    assert placeholder() == before                             # من الكاش
+    admin.post(f"/admin/assets/{asset_id}/rotate", data={"dir": "cw"})
+    with SessionLocal() as db:
+        rotated = db.get(models.Asset, asset_id).thumbhash
+    assert rotated != before                                   # ThumbHash يحمل نسبة الأبعاد
+    assert placeholder() == rotated
@@ -0,0 +1,57 @@
+# tests/test_import_time.py
+"""
+Cold-start budget: what every gunicorn worker pays to import app.main.
+
+Runs ``python -X importtime`` in a fresh interpreter. Heavy libraries
+must stay deferred until first use, schema work must not run at import
+with AUTO_CREATE_SCHEMA off, and the total stays under
+IMPORT_BUDGET_MS (generous: CI machines vary; the deferred-module check
+is the precise one).
+"""
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFERRED = ("PIL", "pillow_avif", "googleapiclient", "zipstream", "passlib", "slugify")
+BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "2500"))
+
+
+def _import_app(tmp_path):
+    db = tmp_path / "app.db"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db.as_posix()}",
+        STORAGE_DIR=str(tmp_path / "storage"),
+        THUMBS_DIR=str(tmp_path / "thumbs"),
+        AUTO_CREATE_SCHEMA="0",
+        METRICS_ENABLED="0",
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    # "import time: self [us] | cumulative | name"
+    rows = {}
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if m:
+            rows[m.group(4)] = int(m.group(2))
+    return rows, db
+
+
+def test_import_budget(tmp_path):
+    rows, db = _import_app(tmp_path)
+
+    eager = sorted(name for name in rows if name.split(".")[0] in DEFERRED)
+    assert not eager, f"imported at start-up: {eager}"
+
+    tables = sqlite3.connect(db).execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall() if db.exists() else []
+    assert not tables, "schema work ran at import time"
+
+    total_ms = rows["app.main"] / 1000
+    assert total_ms < BUDGET_MS, f"import app.main took {total_ms:.0f} ms (budget {BUDGET_MS:.0f} ms)"
@@ -0,0 +1,126 @@
+# tests/test_likes.py
+import sqlite3
+
+from conftest import make_album, make_share
+from sqlalchemy import create_engine
+
+import migrate_schema
+from app import models
+from app.database import SessionLocal, init_schema
+from app.services import likes
+
+
+def _count(asset_id):
+    likes.flush()
+    with SessionLocal() as db:
+        return db.get(models.Asset, asset_id).like_count
+
+
+def test_toggle_is_idempotent_and_counted(admin):
+    album_id = make_album(admin, n_assets=2)
+    slug = make_share(admin, album_id)
+    with SessionLocal() as db:
+        a1, a2 = [a.id for a in db.query(models.Asset).order_by(models.Asset.id)]
+
+    for _ in range(3):
+        assert admin.post("/api/like", json={"asset_id": a1, "slug": slug}).status_code == 200
+    assert _count(a1) == 1
+    # العملاء القدامى: url فقط
+    admin.post("/api/like", json={"url": f"/s/{slug}/thumb/{a2}?t=x"})
+    assert admin.get(f"/api/s/{slug}/likes").json()["counts"] == {str(a1): 1, str(a2): 1}
+
+    admin.post("/api/like", json={"asset_id": a1, "slug": slug, "liked": False})
+    admin.post("/api/like", json={"asset_id": a1, "slug": slug, "liked": False})
+    assert _count(a1) == 0
+    with SessionLocal() as db:
+        assert db.query(models.Like).count() == 1
+
+
+def test_like_click_selection_is_buffered_with_the_counter(admin, monkeypatch):
+    album_id = make_album(admin, n_assets=2)
+    slug = make_share(admin, album_id)
+    with SessionLocal() as db:
+        a1, a2 = [a.id for a in db.query(models.Asset).order_by(models.Asset.id)]
+    monkeypatch.setattr(likes.settings, "LIKES_FLUSH_DELAY", 60)
+
+    admin.post("/api/like", json={"asset_id": a2, "slug": slug})
+    admin.post("/api/like", json={"asset_id": a1, "slug": slug})
+    with SessionLocal() as db:
+        assert db.query(models.Selection).count() == 0          # لا كتابة في مسار الطلب
+
+    jobs = []
+    run = likes.writer.run
+    monkeypatch.setattr(likes.writer, "run", lambda job: jobs.append(job) or run(job))
+    assert admin.get(f"/s/{slug}/selection").json() == {"asset_ids": [a1, a2]}
+    assert len(jobs) == 1 and _count(a1) == 1                   # العدّاد والاختيار في مهمة واحدة
+
+    admin.post("/api/like", json={"asset_id": a1, "slug": slug, "liked": False})
+    # تبديل صريح أحدث من النقرة المعلّقة
+    assert admin.post(f"/s/{slug}/selection", json={"asset_id": a1, "selected": True}).json()["count"] == 2
+    assert _count(a1) == 0
+    assert admin.get(f"/s/{slug}/selection").json() == {"asset_ids": [a1, a2]}
+
+
+def test_invalid_share_writes_nothing(admin):
+    album_id = make_album(admin, n_assets=1)
+    other_slug = make_share(admin, make_album(admin, n_assets=1, title="Other"))
+    with SessionLocal() as db:
+        asset_id = db.query(models.Asset.id).filter_by(album_id=album_id).scalar()
+
+    assert admin.post("/api/like", json={"asset_id": asset_id, "slug": "nope"}).status_code == 404
+    assert admin.post("/api/like", json={"asset_id": asset_id, "slug": other_slug}).status_code == 404
+    assert admin.post("/api/like", json={"asset_id": asset_id}).status_code == 400
+    assert not likes.has_pending()
+    assert _count(asset_id) == 0
+
+
+def test_locked_share(admin):
+    album_id = make_album(admin, n_assets=1)
+    slug = make_share(admin, album_id, password="secret")
+    with SessionLocal() as db:
+        asset_id = db.query(models.Asset.id).filter_by(album_id=album_id).scalar()
+
+    assert admin.get(f"/api/s/{slug}/likes").status_code == 403
+    assert admin.post("/api/like", json={"asset_id": asset_id, "slug": slug}).status_code == 403
+    assert _count(asset_id) == 0
+
+    admin.post(f"/s/{slug}/unlock", data={"password": "secret"}, follow_redirects=False)
+    assert admin.get(f"/api/s/{slug}/likes").status_code == 200
+
+
+def test_migrate_legacy_likes(tmp_path):
+    path = tmp_path / "legacy.db"
+    init_schema(create_engine(f"sqlite:///{path}"))
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO albums (id, title) VALUES (1, 'A')")
+    cur.executemany(
+        "INSERT INTO assets (id, album_id, filename, original_name, is_hidden, like_count) VALUES (?, 1, ?, ?, 0, 0)",
+        [(1, "albums/1/original/a.jpg", "a.jpg"), (2, "albums/1/original/b.jpg", "b.jpg")],
+    )
+    cur.execute("CREATE TABLE likes (id INTEGER PRIMARY KEY, url VARCHAR, user_id INTEGER, liked BOOLEAN)")
+    cur.executemany(
+        "INSERT INTO likes (url, user_id, liked) VALUES (?, ?, ?)",
+        [
+            ("/s/abc/file/1", None, 1),
+            ("/s/abc/file/1", None, 1),
+            ("/s/abc/thumb/1?t=x", None, 0),       # يلغي أحد الإعجابين المجهولين
+            ("/media/albums/1/thumb/400/b.webp", None, 1),
+            ("/s/abc/file/2", 7, 1),
+            ("/s/abc/file/2", 7, 1),               # نفس المستخدم: مرة واحدة
+            ("/s/abc/file/1", 8, 1),
+            ("/s/abc/file/1", 8, 0),               # آخر حالة: ألغى
+            ("/s/abc/file/99", None, 1),           # أصل محذوف
+            ("https://example.com/x.jpg", None, 1),
+        ],
+    )
+    conn.commit()
+
+    migrate_schema.migrate_legacy_likes(cur)
+    conn.commit()
+    assert dict(cur.execute("SELECT id, like_count FROM assets")) == {1: 1, 2: 2}
+    assert cur.execute("SELECT count(*) FROM asset_likes").fetchone()[0] == 3
+
+    migrate_schema.migrate_legacy_likes(cur)     # إعادة التشغيل لا تكرر الصفوف
+    assert dict(cur.execute("SELECT id, like_count FROM assets")) == {1: 1, 2: 2}
+    conn.close()
@@ -0,0 +1,55 @@
+# tests/test_logs.py
+import json
+import logging
+
+from conftest import make_album, make_share
+
+from app import logs
+from app.config import settings
+
+
+def _records(caplog, name):
+    return [r for r in caplog.records if r.name == name]
+
+
+def test_json_formatter_carries_request_id_and_extras():
+    record = logging.makeLogRecord({"name": "app.x", "levelname": "INFO", "msg": "سلام %s", "args": ("x",), "n": 3})
+    token = logs._request.set({"id": "abc", "queries": 0, "db_ms": 0.0})
+    try:
+        out = json.loads(logs.JsonFormatter().format(record))
+    finally:
+        logs._request.reset(token)
+    assert out["msg"] == "سلام x" and out["request_id"] == "abc" and out["n"] == 3
+    assert "args" not in out and "request_id" not in json.loads(logs.JsonFormatter().format(record))
+
+
+def test_request_line_with_route_and_query_count(admin, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_REQUESTS", True)
+    slug = make_share(admin, make_album(admin, n_assets=1))
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="app.request"):
+        r = admin.get(f"/s/{slug}", headers={"X-Request-ID": "from-nginx.1"})
+        admin.get("/healthz")
+    assert r.headers["x-request-id"] == "from-nginx.1"
+    (line,) = _records(caplog, "app.request")                   # /healthz لا يُسجَّل
+    assert line.route == "/s/{slug}" and line.status == 200 and line.bytes == int(r.headers["content-length"])  # بعد الضغط
+    assert line.queries > 0 and line.db_ms >= 0
+
+
+def test_bad_incoming_request_id_is_replaced(client):
+    rid = client.get("/admin/login", headers={"X-Request-ID": "bad id\n"}).headers["x-request-id"]
+    assert rid != "bad id\n" and len(rid) == 32
+
+
+def test_slow_query_log(client, caplog, monkeypatch):
+    monkeypatch.setattr(logs, "_slow_query_ms", 1e-6)
+    with caplog.at_level(logging.WARNING, logger="app.sql"):
+        client.get("/s/nope")
+    slow = _records(caplog, "app.sql")
+    assert slow and all(r.msg == "slow query" and r.duration_ms >= 0 for r in slow)
+    assert not any(hasattr(r, "params") for r in slow)
+
+    monkeypatch.setattr(logs, "_slow_query_ms", 0.0)              # 0 يعطّل
+    caplog.clear()
+    client.get("/s/nope")
+    assert _records(caplog, "app.sql") == []
@@ -0,0 +1,32 @@
+# tests/test_metrics_auth.py
+import pytest
+
+from app import metrics
+from app.config import settings
+
+pytestmark = pytest.mark.skipif(metrics.prom is None, reason="prometheus_client not installed")
+
+
+@pytest.fixture
+def metrics_on(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+
+
+def test_hidden_outside_dev_without_token(client, metrics_on, monkeypatch):
+    monkeypatch.setattr(settings, "ENV", "prod")
+    assert client.get("/metrics").status_code == 404
+
+
+def test_token_required_when_set(client, metrics_on, monkeypatch):
+    monkeypatch.setattr(settings, "ENV", "prod")
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    r = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200 and r.headers["cache-control"] == "no-store"
+
+
+def test_dev_without_token_is_open(client, metrics_on):
+    assert settings.ENV == "dev"
+    assert client.get("/metrics").status_code == 200
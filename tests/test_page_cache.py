@@ -0,0 +1,72 @@
+# tests/test_page_cache.py
+import gzip
+import time
+
+import pytest
+from conftest import make_album, make_share
+
+from app.main import warm_up
+from app.services import page_cache
+from app.services.page_cache import CachedPage, DiskPages
+
+BODY = b"<p>" + "سلام ".encode() * 400 + b"</p>"
+
+
+@pytest.fixture
+def workers(tmp_path):
+    # عاملان يتشاركان المجلد نفسه
+    return DiskPages(tmp_path, ttl=60, maxsize=10), DiskPages(tmp_path, ttl=60, maxsize=10)
+
+
+def test_page_is_shared_and_compressed_once(workers, tmp_path):
+    w1, w2 = workers
+    w1.set("k", CachedPage(1, BODY, "text/html", {"X-A": "1"}))
+    page = w2.get("k")
+    assert page.body == BODY and page.headers == {"X-A": "1"} and page.album_id == 1
+
+    assert gzip.decompress(page.encoded("gzip")) == BODY
+    (gz,) = tmp_path.glob("*.gzip")
+    gz.write_bytes(b"from-disk")                                # العامل الآخر يقرأ ولا يضغط
+    assert w1.get("k").encoded("gzip") == b"from-disk"
+
+    w1.set("k", CachedPage(1, b"new", "text/html"))             # نسخة جديدة تحذف الضغطات القديمة
+    assert list(tmp_path.glob("*.gzip")) == []
+
+
+def test_invalidation_from_any_worker(workers):
+    w1, w2 = workers
+    w1.set("a1", CachedPage(1, BODY, "text/html"))
+    w1.set("a2", CachedPage(2, BODY, "text/html"))
+    time.sleep(0.01)
+    w2.invalidate_album(1)
+    assert w1.get("a1") is None and w1.get("a2") is not None
+    w1.set("a1", CachedPage(1, BODY, "text/html"))
+    assert w2.get("a1") is not None
+
+
+def test_ttl_and_prune(tmp_path):
+    cache = DiskPages(tmp_path, ttl=60, maxsize=2)
+    for i in range(3):
+        cache.set(i, CachedPage(1, BODY, "text/html"))
+        time.sleep(0.01)
+    cache.prune()
+    assert cache.get(0) is None and cache.get(1) is not None and cache.get(2) is not None
+
+    cache.ttl = 0
+    assert cache.get(2) is None
+
+
+def test_public_page_from_disk_cache(admin, tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache, "pages", DiskPages(tmp_path, ttl=60, maxsize=10))
+    album_id = make_album(admin, n_assets=2, title="قبل")
+    slug = make_share(admin, album_id)
+    first = admin.get(f"/s/{slug}")
+    assert "قبل" in first.text and list(tmp_path.glob("*.body"))
+    assert admin.get(f"/s/{slug}").text == first.text
+
+    admin.post(f"/admin/albums/{album_id}/edit", data={"title": "بعد", "event_date": "2024-05-01"})
+    assert "بعد" in admin.get(f"/s/{slug}").text
+
+
+def test_warm_up_runs_without_a_request():
+    warm_up()
@@ -0,0 +1,57 @@
+# tests/test_profiling.py
+import json
+
+import pytest
+from conftest import make_album, make_share
+
+from app import profiling
+from app.config import settings
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(settings, "PROFILE_INTERVAL_MS", 0)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(profiling, "_slowest", [])
+    return tmp_path
+
+
+def test_only_admin_can_request_a_profile(client, profiles):
+    assert "server-timing" not in client.get("/admin/login", headers={"X-Profile": "1"}).headers
+    assert list(profiles.iterdir()) == []
+
+
+def test_admin_profile_has_sql_and_template_spans(admin, profiles):
+    slug = make_share(admin, make_album(admin, n_assets=2))
+    r = admin.get(f"/s/{slug}", headers={"X-Profile": "1"})
+    timing = r.headers["server-timing"]
+    assert timing.startswith("total;dur=") and "sql;dur=" in timing and "template;dur=" in timing
+
+    dump = json.loads(next(profiles.glob(f"*-{r.headers['x-profile-id']}.json")).read_text())
+    assert dump["route"] == "/s/{slug}"
+    assert dump["totals"]["sql"]["count"] == sum(1 for s in dump["spans"] if s["kind"] == "sql")
+    assert len(list(profiles.glob("*.collapsed"))) == 1
+    assert "server-timing" not in admin.get(f"/s/{slug}").headers
+
+
+def test_keeps_only_the_slowest(profiles, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_KEEP", 2)
+    kept = []
+    for seconds in (0.010, 0.030, 0.020, 0.005):
+        prof = profiling.Profile("GET", "/x")
+        prof.duration = seconds
+        if profiling.maybe_dump(prof):
+            kept.append(seconds)
+    assert kept == [0.010, 0.030, 0.020]
+    names = sorted(p.name.split("-")[0] for p in profiles.glob("*.json"))
+    assert names == ["0000020.0", "0000030.0"]
+    assert len(list(profiles.glob("*.collapsed"))) == 2
+
+
+def test_recording_is_a_noop_outside_profiled_requests():
+    assert profiling.current() is None
+    profiling.record("sql", "SELECT 1", 0.1)
+    with profiling.span("template", "x"):
+        pass
+    assert profiling.current() is None
@@ -0,0 +1,100 @@
+# tests/test_share_cache.py
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.database import Base
+from app.services import share_cache, signing
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    album = models.Album(title="A")
+    session.add(album)
+    session.flush()
+    session.add(models.ShareLink(album_id=album.id, slug="old", allow_zip=True))
+    session.add(models.Asset(album_id=album.id, filename="albums/1/original/a.jpg", original_name="a.jpg"))
+    session.commit()
+    share_cache.shares.clear()
+    share_cache.assets.clear()
+    yield session
+    session.close()
+    share_cache.shares.clear()
+    share_cache.assets.clear()
+
+
+def test_renamed_slug_is_not_served_from_cache(db):
+    assert share_cache.get_share(db, "old").slug == "old"
+    assert share_cache.get_share(db, "new") is None          # المفقود يُخزَّن أيضًا
+
+    db.query(models.ShareLink).one().slug = "new"
+    db.commit()
+
+    assert share_cache.get_share(db, "old") is None
+    assert share_cache.get_share(db, "new").slug == "new"
+
+
+def test_share_and_album_edits_invalidate(db):
+    assert share_cache.get_share(db, "old").password_hash is None
+    sl = db.query(models.ShareLink).one()
+    sl.password_hash = "h"
+    db.commit()
+    assert share_cache.get_share(db, "old").password_hash == "h"
+
+    assert not share_cache.get_share(db, "old").archived
+    db.get(models.Album, 1).archived_at = datetime.utcnow()
+    db.commit()
+    assert share_cache.get_share(db, "old").archived
+
+    db.delete(sl)
+    db.commit()
+    assert share_cache.get_share(db, "old") is None
+
+
+def test_asset_edits_invalidate(db):
+    assert share_cache.get_asset(db, 1).mime_type is None
+    db.get(models.Asset, 1).mime_type = "image/jpeg"
+    db.commit()
+    assert share_cache.get_asset(db, 1).mime_type == "image/jpeg"
+
+    db.delete(db.get(models.Asset, 1))
+    db.commit()
+    assert share_cache.get_asset(db, 1) is None
+
+
+def test_ttl_and_size_bound():
+    cache = share_cache.TTLCache(ttl=60, maxsize=10)
+    for k in range(10):
+        cache.set(k, k)
+    cache.set("x", "x")                                       # يطرد أقدم عُشر
+    assert cache.get(0, None) is None and cache.get(1) == 1 and cache.get("x") == "x"
+
+    stale = share_cache.TTLCache(ttl=-1)
+    stale.set("k", 1)
+    assert stale.get("k", None) is None
+
+
+def test_asset_token(monkeypatch):
+    token = signing.make_asset_token("slug", 7)
+    assert signing.check_asset_token(token, "slug") == 7
+    assert signing.check_asset_token(token, "other") is None
+
+    album, exp, sig = token.split(".")
+    assert signing.check_asset_token(f"8.{exp}.{sig}", "slug") is None
+    assert signing.check_asset_token(f"{album}.{int(exp, 16) + 1:x}.{sig}", "slug") is None
+    assert signing.check_asset_token(f"{album}.{exp}.{sig[:-1]}A", "slug") is None
+    for bad in (None, "", "garbage", "7.zz.sig"):
+        assert signing.check_asset_token(bad, "slug") is None
+
+    # انتهاء رابط المشاركة يقصّ عمر الرمز
+    capped = signing.make_asset_token("slug", 7, datetime.now() + timedelta(seconds=5))
+    assert int(capped.split(".")[1], 16) <= time.time() + 5
+    monkeypatch.setattr(time, "time", lambda: int(capped.split(".")[1], 16) + 1)
+    assert signing.check_asset_token(capped, "slug") is None
@@ -0,0 +1,102 @@
+# tests/test_signed_media.py
+import base64
+import hashlib
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.config import settings
+from app.services import signing
+
+REL = "albums/1/thumb/400/صورة 1.jpg"      # غير ASCII ومسافة: التوقيع على المسار المفكوك
+
+
+@pytest.fixture
+def media(client):
+    p = Path(settings.STORAGE_DIR) / REL
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(b"jpeg-bytes")
+    yield client
+    p.unlink()
+
+
+def _split(url):
+    parts = urlsplit(url)
+    qs = {k: v[0] for k, v in parse_qs(parts.query).items()}
+    return parts.path, qs
+
+
+def test_signed_url_is_served(media):
+    url = signing.media_url(REL)
+    assert url == signing.media_url(REL)                 # نفس الرابط داخل النافذة
+    r = media.get(url)
+    assert r.status_code == 200 and r.content == b"jpeg-bytes"
+
+    # لا يُخزَّن بعد انتهاء الرابط
+    expires = int(_split(url)[1]["expires"])
+    max_age = int(r.headers["cache-control"].split("max-age=")[1].split(",")[0])
+    assert expires - time.time() - 5 <= max_age <= expires - time.time() + 5
+    assert max_age >= settings.MEDIA_URL_TTL - settings.MEDIA_URL_BUCKET - 5
+
+
+def test_unsigned_original_is_forbidden(client):
+    rel = "albums/1/original/img.jpg"
+    p = Path(settings.STORAGE_DIR) / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(b"original")
+    try:
+        assert not settings.MEDIA_REQUIRE_SIGNATURE
+        assert client.get("/media/" + rel).status_code == 403
+        assert client.get(signing.media_url(rel)).status_code == 200
+    finally:
+        p.unlink()
+
+
+def test_server_config_requires_signature():
+    from app.config.server import Settings
+
+    assert Settings.model_fields["MEDIA_REQUIRE_SIGNATURE"].default is True
+
+
+def test_matches_nginx_secure_link(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_SIGNING_SECRET", "nginx-secret")
+    _, qs = _split(signing.media_url(REL))
+    raw = f"{qs['expires']}/media/{REL} nginx-secret".encode()
+    assert qs["md5"] == base64.urlsafe_b64encode(hashlib.md5(raw).digest()).rstrip(b"=").decode()
+    assert int(qs["expires"]) % settings.MEDIA_URL_BUCKET == 0
+
+
+def test_tampered_links_are_rejected(media):
+    path, qs = _split(signing.media_url(REL))
+    other = path.replace("400", "1600")
+    assert media.get(path, params={**qs, "md5": qs["md5"][:-2] + "AA"}).status_code == 403
+    assert media.get(path, params={**qs, "expires": str(int(qs["expires"]) + 3600)}).status_code == 403
+    assert media.get(other, params=qs).status_code == 403
+    assert media.get(path, params={"md5": qs["md5"]}).status_code == 403
+    assert media.get(path, params={**qs, "expires": "soon"}).status_code == 403
+
+
+def test_expired_link_is_gone(media):
+    exp = int(time.time()) - 10
+    md5 = signing.secure_link_md5(f"/media/{REL}", exp)
+    path, _ = _split(signing.media_url(REL))
+    r = media.get(path, params={"md5": md5, "expires": str(exp)})
+    assert r.status_code == 410
+
+
+def test_unsigned_requests(media, monkeypatch):
+    path, _ = _split(signing.media_url(REL))
+    assert media.get(path).status_code == 200
+    monkeypatch.setattr(settings, "MEDIA_REQUIRE_SIGNATURE", True)
+    assert media.get(path).status_code == 403
+    assert media.get(signing.media_url(REL)).status_code == 200
+
+
+def test_unsigned_mode(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_SIGNED_URLS", False)
+    assert signing.media_url(REL) == "/media/albums/1/thumb/400/%D8%B5%D9%88%D8%B1%D8%A9%201.jpg"
+    assert signing.media_epoch() == 0
+    assert signing.media_url(REL, 3).endswith(".jpg?v=3")
+    assert signing.media_url(None) is None
@@ -0,0 +1,78 @@
+# tests/test_static_assets.py
+import gzip
+import json
+
+import brotli
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+import build_static
+from app import static_assets
+
+CSS = "body { color: #123456; }\n" * 40
+
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    src = tmp_path / "static"
+    (src / "js").mkdir(parents=True)
+    (src / "style.css").write_text(CSS)
+    (src / "js" / "app.js").write_text("console.log(1)")          # أصغر من MIN_SIZE: بلا .gz
+    manifest = build_static.build(src)
+
+    monkeypatch.setattr(static_assets, "STATIC_DIR", src)
+    static_assets._manifest.cache_clear()
+    app = Starlette(routes=[Mount("/static", static_assets.PrecompressedStaticFiles(directory=src))])
+    yield manifest, TestClient(app)
+    static_assets._manifest.cache_clear()
+
+
+def _get(client, url, enc="gzip"):
+    with client.stream("GET", url, headers={"Accept-Encoding": enc}) as r:
+        r.raw_body = b"".join(r.iter_raw())
+    return r
+
+
+def test_build_fingerprints_and_compresses(built, tmp_path):
+    manifest, _ = built
+    dist = tmp_path / "static" / "dist"
+    assert manifest["style.css"] == f"dist/style.{build_static.fingerprint(CSS.encode())}.css"
+    assert manifest["js/app.js"].startswith("dist/js/app.")
+    assert json.loads((dist / "manifest.json").read_text()) == manifest
+    for ext in (".br", ".gz"):
+        assert (tmp_path / "static" / (manifest["style.css"] + ext)).exists()
+        assert not (tmp_path / "static" / (manifest["js/app.js"] + ext)).exists()
+
+
+def test_static_url(built):
+    manifest, _ = built
+    assert static_assets.static_url("/style.css") == "/static/" + manifest["style.css"]
+    assert static_assets.static_url("missing.png") == "/static/missing.png"
+
+
+def test_serves_precompressed_sibling(built):
+    manifest, client = built
+    r = _get(client, "/static/" + manifest["style.css"])
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["content-type"] == "text/css; charset=utf-8"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert gzip.decompress(r.raw_body).decode() == CSS
+
+    r = _get(client, "/static/" + manifest["style.css"], "gzip, br")
+    assert r.headers["content-encoding"] == "br"
+    assert brotli.decompress(r.raw_body).decode() == CSS
+
+    for enc in ("identity", "gzip;q=0"):
+        r = _get(client, "/static/" + manifest["style.css"], enc)
+        assert "content-encoding" not in r.headers and r.raw_body.decode() == CSS
+
+
+def test_unbuilt_files_keep_short_cache(built):
+    _, client = built
+    r = _get(client, "/static/style.css")
+    assert "content-encoding" not in r.headers
+    assert r.headers["cache-control"] == "public, max-age=86400"
+    assert _get(client, "/static/nope.css").status_code == 404
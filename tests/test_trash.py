@@ -0,0 +1,161 @@
+# tests/test_trash.py
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+from conftest import ADMIN_PASSWORD
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import gdrive, trash
+
+
+@pytest.fixture
+def storage(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(settings, "USE_GDRIVE", False)
+    return tmp_path
+
+
+def _touch(root, rel, age=2 * 3600):
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(b"x")
+    os.utime(p, (time.time() - age,) * 2)
+    return p
+
+
+def _items():
+    with SessionLocal() as db:
+        return {(t.kind, t.target): t for t in db.query(models.TrashItem)}
+
+
+def test_sweep_deletes_and_backs_off(storage, monkeypatch):
+    f = _touch(storage, "albums/1/original/a.jpg")
+    with SessionLocal() as db:
+        trash.enqueue(db, [f, storage / "albums/1/original/gone.jpg"], ["drive-1", ""])
+        db.commit()
+    assert set(_items()) == {
+        (trash.LOCAL, "albums/1/original/a.jpg"),
+        (trash.LOCAL, "albums/1/original/gone.jpg"),
+        (trash.GDRIVE, "drive-1"),
+    }
+
+    assert trash.sweep_all() == {"deleted": 2, "failed": 1}
+    assert not f.exists()
+    item = _items()[(trash.GDRIVE, "drive-1")]
+    assert item.attempts == 1 and item.last_error == "Google Drive is disabled"
+    assert item.next_attempt_at > datetime.utcnow()
+    assert trash.sweep() == {"deleted": 0, "failed": 0}     # لم يحن موعده بعد
+
+    # Drive مفعّل: حذف جماعي واحد، والخطأ لكل ملف على حدة
+    monkeypatch.setattr(settings, "USE_GDRIVE", True)
+    monkeypatch.setattr(gdrive, "delete_files", lambda ids: {i: (None if i == "drive-1" else "403") for i in ids})
+    with SessionLocal() as db:
+        db.get(models.TrashItem, item.id).next_attempt_at = datetime.utcnow()
+        trash.enqueue(db, [], ["drive-2"])
+        db.commit()
+    assert trash.sweep() == {"deleted": 1, "failed": 1}
+    assert list(_items()) == [(trash.GDRIVE, "drive-2")]
+
+    # ملف غاب عن نتائج الدفعة لا يُعدّ محذوفًا
+    monkeypatch.setattr(gdrive, "delete_files", lambda ids: {})
+    with SessionLocal() as db:
+        db.query(models.TrashItem).update({"next_attempt_at": datetime.utcnow()})
+        db.commit()
+    assert trash.sweep() == {"deleted": 0, "failed": 1}
+    assert _items()[(trash.GDRIVE, "drive-2")].last_error == "no result from Drive batch"
+
+
+def test_sweep_gives_up_after_max_attempts(storage, monkeypatch):
+    monkeypatch.setattr(settings, "TRASH_MAX_ATTEMPTS", 2)
+    with SessionLocal() as db:
+        trash.enqueue(db, [], ["drive-1"])
+        db.commit()
+    for _ in range(3):
+        with SessionLocal() as db:
+            for it in db.query(models.TrashItem):
+                it.next_attempt_at = datetime.utcnow()
+            db.commit()
+        trash.sweep()
+    assert _items()[(trash.GDRIVE, "drive-1")].attempts == 2
+
+
+def test_orphans_match_assets_posters_and_cover(storage):
+    with SessionLocal() as db:
+        album = models.Album(title="A")
+        db.add(album)
+        db.flush()
+        a, b = (
+            models.Asset(album_id=album.id, filename=f"albums/{album.id}/original/{n}.jpg", original_name=f"{n}.jpg")
+            for n in ("a", "b")
+        )
+        video = models.Video(album_id=album.id, provider="youtube", video_id="x")
+        db.add_all([a, b, video])
+        db.flush()
+        album.cover_asset_id = a.id
+        album.cover_renditions = json.dumps({"asset_id": a.id, "stem": "a"})
+        album_id, video_id = album.id, video.id
+        db.commit()
+
+    live = [
+        f"albums/{album_id}/original/a.jpg",
+        f"albums/{album_id}/thumb/400/b.webp",
+        f"albums/{album_id}/video/video-{video_id}.jpg",
+        f"albums/{album_id}/cover/wide/1920/a.avif",
+        "albums/tmp/upload.part",                           # ليس مجلد ألبوم
+    ]
+    orphans = [
+        f"albums/{album_id}/thumb/400/ghost.jpg",
+        f"albums/{album_id}/video/video-{video_id + 1}.jpg",
+        f"albums/{album_id}/cover/wide/1920/b.avif",        # أصل حيّ لكنه ليس الغلاف
+        f"albums/{album_id + 1}/original/a.jpg",            # ألبوم محذوف
+    ]
+    for rel in live + orphans:
+        _touch(storage, rel)
+
+    with SessionLocal() as db:
+        report = trash.scan_orphans(db)
+    assert sorted(report["local"]) == sorted(orphans)
+    assert report["local_bytes"] == len(orphans) and not report["queued"]
+    assert _items() == {}
+
+    with SessionLocal() as db:
+        trash.scan_orphans(db, apply=True)
+        assert trash.scan_orphans(db)["local"] == []         # المُدرج في السلة لا يُعاد
+    trash.sweep_all()
+    assert all((storage / rel).exists() for rel in live)
+    assert not any((storage / rel).exists() for rel in orphans)
+
+
+def test_upload_in_progress_is_not_an_orphan(storage):
+    with SessionLocal() as db:
+        album = models.Album(title="A")
+        db.add(album)
+        db.commit()
+        album_id = album.id
+    # الرفع يكتب الأصل ونسخه قبل أن يُسجَّل صف Asset
+    fresh = [_touch(storage, f"albums/{album_id}/original/new.jpg", age=0),
+             _touch(storage, f"albums/{album_id}/thumb/400/new.webp", age=0)]
+    old = _touch(storage, f"albums/{album_id}/original/old.jpg")
+
+    with SessionLocal() as db:
+        assert trash.scan_orphans(db, apply=True)["local"] == [f"albums/{album_id}/original/old.jpg"]
+    trash.sweep_all()
+    assert all(p.exists() for p in fresh) and not old.exists()
+
+
+def test_orphans_route_only_applies_on_post(storage, client):
+    _touch(storage, "albums/999/original/a.jpg")
+    assert client.post("/admin/trash/orphans").status_code == 403
+
+    admin = client
+    admin.post("/admin/login", data={"password": ADMIN_PASSWORD}, follow_redirects=False)
+    report = admin.get("/admin/trash/orphans", params={"apply": 1}).json()
+    assert report["local"] == ["albums/999/original/a.jpg"] and not report["queued"]
+    assert _items() == {}
+    assert admin.post("/admin/trash/orphans").json()["queued"]
+    assert list(_items()) == [(trash.LOCAL, "albums/999/original/a.jpg")]
@@ -0,0 +1,76 @@
+# tests/test_unlock.py
+import threading
+
+import pytest
+from conftest import make_album, make_share
+
+from app.services import ratelimit, unlock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_burst_and_refill(clock):
+    bucket = ratelimit.TokenBucket(burst=2, rate_per_min=6)     # رمز كل 10 ثوانٍ
+    assert bucket.take("a") == 0 and bucket.take("a") == 0
+    assert bucket.take("a") == pytest.approx(10)
+    assert bucket.take("b") == 0                                 # مفاتيح مستقلة
+    clock[0] += 4
+    assert bucket.take("a") == pytest.approx(6)
+    clock[0] += 6
+    assert bucket.take("a") == 0
+
+
+def test_zero_rate_disables_the_limit(clock):
+    bucket = ratelimit.TokenBucket(burst=1, rate_per_min=0)
+    assert all(bucket.take("a") == 0 for _ in range(50))
+
+
+def test_idle_full_buckets_are_pruned(clock):
+    bucket = ratelimit.TokenBucket(burst=1, rate_per_min=60, max_keys=3)
+    for k in "abc":
+        bucket.take(k)
+    clock[0] += 5
+    bucket.take("d")
+    assert set(bucket._buckets) == {"d"}
+
+
+def test_busy_rounds_retry_after_up():
+    assert unlock.Busy(0.2).retry_after == 1
+    assert unlock.Busy(10.01).retry_after == 11
+
+
+@pytest.fixture
+def locked(admin, monkeypatch):
+    monkeypatch.setattr(unlock, "by_ip", ratelimit.TokenBucket(3, 1))
+    monkeypatch.setattr(unlock, "by_slug", ratelimit.TokenBucket(100, 100))
+    return make_share(admin, make_album(admin, n_assets=1), password="secret")
+
+
+def _try(client, slug, password):
+    return client.post(f"/s/{slug}/unlock", data={"password": password}, follow_redirects=False)
+
+
+def test_unlock_is_rate_limited(admin, locked):
+    assert [_try(admin, locked, "wrong").status_code for _ in range(3)] == [403, 403, 403]
+    r = _try(admin, locked, "secret")
+    assert r.status_code == 429 and 1 <= int(r.headers["retry-after"]) <= 60
+    assert admin.get(f"/api/s/{locked}/likes").status_code == 403
+
+
+def test_unlock_with_zero_rate(admin, locked, monkeypatch):
+    monkeypatch.setattr(unlock, "by_ip", ratelimit.TokenBucket(1, 0))
+    assert [_try(admin, locked, "wrong").status_code for _ in range(5)] == [403] * 5
+    assert _try(admin, locked, "secret").status_code == 302
+    assert admin.get(f"/api/s/{locked}/likes").status_code == 200
+
+
+def test_unlock_queue_full(admin, locked, monkeypatch):
+    monkeypatch.setattr(unlock, "_slots", threading.BoundedSemaphore(1))
+    unlock._slots.acquire()
+    r = _try(admin, locked, "secret")
+    assert r.status_code == 429 and r.headers["retry-after"] == "1"
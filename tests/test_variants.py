@@ -0,0 +1,68 @@
+# tests/test_variants.py
+import base64
+
+from PIL import Image
+
+from app.services import thumbhash
+from app.services.variants import make_variants
+
+
+def test_thumbhash_does_not_copy_the_original(tmp_path, monkeypatch):
+    src = tmp_path / "a.jpg"
+    Image.linear_gradient("L").resize((3000, 2000)).convert("RGB").save(src, "JPEG")
+    expected = thumbhash.image_to_thumbhash(Image.open(src).convert("RGB"))
+
+    def no_copy(self):
+        raise AssertionError(f"full-size copy of a {self.size} image")
+
+    monkeypatch.setattr(Image.Image, "copy", no_copy)
+    info = make_variants(src, tmp_path, 1, "a")
+
+    # من مشتق 400px: الـ DC والمقاييس (أول 5 بايتات) كالحساب من الأصل ± خطوة تكميم
+    got, want = base64.b64decode(info["thumbhash"]), base64.b64decode(expected)
+    assert len(got) == len(want)
+    assert all(abs(a - b) <= 1 for a, b in zip(got[:5], want[:5]))
+    assert (tmp_path / info["thumb_jpg"]).exists()
+
+
+def test_thumbhash_keeps_aspect_of_small_images():
+    im = Image.new("RGB", (40, 10), (255, 0, 0))
+    h = base64.b64decode(thumbhash.image_to_thumbhash(im))
+    assert h[:3] == base64.b64decode(thumbhash.image_to_thumbhash(im.resize((400, 100))))[:3]
+
+
+def test_rotation_regenerates_from_the_original_under_a_new_url(admin, monkeypatch):
+    from pathlib import Path
+
+    from conftest import make_album, make_share
+
+    from app import models
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.routers import admin as admin_router
+
+    def no_rerotate(*args, **kwargs):
+        raise AssertionError("derivatives re-encoded from derivatives")
+
+    monkeypatch.setattr(admin_router, "rotate_variants", no_rerotate)
+    album_id = make_album(admin, n_assets=2)
+    slug = make_share(admin, album_id)
+    with SessionLocal() as db:
+        a = db.query(models.Asset).filter_by(album_id=album_id).order_by(models.Asset.id).all()[1]
+        asset_id, stem = a.id, Path(a.filename).stem
+    thumb = Path(settings.STORAGE_DIR) / f"albums/{album_id}/thumb/400/{stem}.jpg"
+
+    def thumb_url():
+        items = admin.get(f"/s/{slug}/assets").json()["items"]
+        return next(i["thumb"] for i in items if i["id"] == asset_id)
+
+    before = thumb_url()
+    assert "v=" not in before and Image.open(thumb).size == (64, 48)
+    for n in (1, 2):
+        admin.post(f"/admin/assets/{asset_id}/rotate", data={"dir": "cw"})
+        with SessionLocal() as db:
+            assert db.get(models.Asset, asset_id).media_rev == n
+    assert Image.open(thumb).size == (64, 48)                       # 180°
+    after = thumb_url()
+    assert after.split("?")[0] == before.split("?")[0] and after.endswith("&v=2")
+    assert admin.get(after).status_code == 200                      # v= خارج التوقيع
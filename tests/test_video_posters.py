@@ -0,0 +1,97 @@
+# tests/test_video_posters.py
+import io
+import urllib.error
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.config import settings
+from app.database import Base
+from app.services import video_posters
+
+
+def _jpeg(size=(1280, 720)):
+    b = io.BytesIO()
+    Image.new("RGB", size, (20, 40, 200)).save(b, "JPEG")
+    return b.getvalue()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(video_posters, "_failed", {})
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    album = models.Album(title="A")
+    session.add(album)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _video(db, provider="youtube", video_id="abc"):
+    v = models.Video(album_id=1, provider=provider, video_id=video_id)
+    db.add(v)
+    db.commit()
+    return v
+
+
+def test_refresh_falls_back_to_next_candidate(db, tmp_path, monkeypatch):
+    calls = []
+
+    def fake_get(url):
+        calls.append(url)
+        if "maxresdefault" in url:
+            raise urllib.error.HTTPError(url, 404, "Not Found", {}, None)
+        return _jpeg()
+
+    monkeypatch.setattr(video_posters, "http_get", fake_get)
+    v = _video(db)
+    assert video_posters.refresh(db, v)
+    assert [u.rsplit("/", 1)[-1] for u in calls] == ["maxresdefault.jpg", "hqdefault.jpg"]
+    assert v.poster_path == f"albums/1/video/video-{v.id}.jpg"
+    assert v.poster_fetched_at is not None
+    with Image.open(tmp_path / v.poster_path) as im:
+        assert im.width == settings.VIDEO_POSTER_WIDTH
+
+
+def test_stubbed_provider_and_staleness(db, monkeypatch):
+    monkeypatch.setitem(video_posters.PROVIDERS, "youtube", lambda v: [f"stub://{v.video_id}"])
+    monkeypatch.setattr(video_posters, "http_get", lambda url: _jpeg((320, 180)))
+    v = _video(db)
+    assert video_posters.stale_ids([v]) == [v.id]
+    video_posters.refresh(db, v)
+    assert video_posters.stale_ids([v]) == []
+    v.poster_fetched_at = datetime.utcnow() - timedelta(seconds=settings.VIDEO_POSTER_TTL + 1)
+    assert video_posters.stale_ids([v]) == [v.id]
+
+
+def test_failure_keeps_old_poster_and_backs_off(db, monkeypatch):
+    monkeypatch.setitem(video_posters.PROVIDERS, "youtube", lambda v: ["stub://x"])
+    monkeypatch.setattr(video_posters, "http_get", lambda url: _jpeg())
+    v = _video(db)
+    video_posters.refresh(db, v)
+    old = (v.poster_path, v.poster_fetched_at)
+
+    def broken(url):
+        raise urllib.error.URLError("down")
+
+    monkeypatch.setattr(video_posters, "http_get", broken)
+    assert not video_posters.refresh(db, v)
+    assert (v.poster_path, v.poster_fetched_at) == old
+
+    w = _video(db, video_id="new")
+    assert not video_posters.refresh(db, w)
+    assert w.poster_path is None
+    assert video_posters.stale_ids([w]) == []   # لا إعادة محاولة قبل VIDEO_POSTER_RETRY
+
+
+def test_unknown_provider(db):
+    v = _video(db, provider="dailymotion")
+    with pytest.raises(ValueError):
+        video_posters.fetch(v)
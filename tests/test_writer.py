@@ -0,0 +1,134 @@
+# tests/test_writer.py
+"""
+SQLite single-writer mode: small writes share transactions on the
+dedicated connection, one failing job does not sink its batch, and the
+read-only engine refuses writes.
+"""
+import threading
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.services import writer
+
+
+@pytest.fixture
+def split(tmp_path, monkeypatch):
+    url = f"sqlite:///{(tmp_path / 'split.db').as_posix()}"
+    with database.make_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE t (k INTEGER PRIMARY KEY)"))
+    reader, write_engine = database.sqlite_split(url)
+    monkeypatch.setattr(writer, "WriteSession", sessionmaker(bind=write_engine))
+    monkeypatch.setattr(writer.settings, "WRITE_BATCH_DELAY_MS", 50)
+    commits = []
+    event.listen(write_engine, "commit", lambda conn: commits.append(1))
+    yield reader, commits
+    writer.flush()
+    reader.dispose()
+    write_engine.dispose()
+
+
+def _insert(k):
+    return lambda db: db.execute(text("INSERT INTO t (k) VALUES (:k)"), {"k": k}).rowcount
+
+
+def test_concurrent_writes_share_commits(split):
+    reader, commits = split
+    threads = [threading.Thread(target=writer.run, args=(_insert(k),)) for k in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 20
+    assert 1 <= len(commits) < 20
+
+
+def test_failed_job_is_isolated(split):
+    reader, _ = split
+    ok = writer.submit(_insert(1))
+    dup = writer.submit(_insert(1))       # PRIMARY KEY مكرر
+    later = writer.submit(_insert(2))
+
+    assert ok.result(timeout=5) == 1 and later.result(timeout=5) == 1
+    with pytest.raises(Exception, match="UNIQUE"):
+        dup.result(timeout=5)
+    with reader.connect() as conn:
+        assert [k for (k,) in conn.execute(text("SELECT k FROM t ORDER BY k"))] == [1, 2]
+
+
+def test_file_session_overlapping_the_writer(tmp_path, monkeypatch):
+    # جلسة رفع/تدوير: قراءة ثم عمل ملفات ثم كتابة، والكاتب يكتب في الأثناء
+    url = f"sqlite:///{(tmp_path / 'main.db').as_posix()}"
+    engine = database.make_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (k INTEGER PRIMARY KEY)"))
+    _, write_engine = database.sqlite_split(url)
+    monkeypatch.setattr(writer, "WriteSession", sessionmaker(bind=write_engine))
+
+    def _append(w):
+        return w.execute(text("INSERT INTO t (k) SELECT coalesce(max(k), 0) + 1 FROM t")).rowcount
+
+    db = sessionmaker(bind=engine)()
+    next_k = db.execute(text("SELECT coalesce(max(k), 0) + 1 FROM t")).scalar()   # مثل sort_order في الرفع
+    job = threading.Thread(target=writer.run, args=(_append,))
+    job.start()
+    job.join(0.3)                             # ينتظر قفل الجلسة بدل أن يسبقها
+    db.execute(text("INSERT INTO t (k) VALUES (:k)"), {"k": next_k})
+    db.commit()
+    db.close()
+    job.join()
+
+    with engine.connect() as conn:
+        assert [k for (k,) in conn.execute(text("SELECT k FROM t ORDER BY k"))] == [1, 2]
+    writer.flush()
+    write_engine.dispose()
+    engine.dispose()
+
+
+def test_read_engine_is_read_only(split):
+    reader, _ = split
+    with reader.connect() as conn, pytest.raises(Exception, match="readonly"):
+        conn.execute(text("INSERT INTO t (k) VALUES (9)"))
+
+
+def test_admin_edits_commit_on_the_write_connection(admin, monkeypatch):
+    from conftest import make_album, make_share
+
+    from app import models
+    from app.services import covers
+
+    monkeypatch.setattr(covers, "generate_job", lambda album_id: None)   # عمل ملفات: خارج الكاتب عمدًا
+
+    album_id = make_album(admin, n_assets=3)
+    with database.ReadSessionLocal() as db:
+        a1, a2, a3 = [a.id for a in db.query(models.Asset).order_by(models.Asset.id)]
+
+    assert database.write_engine is not database.engine
+    other = []
+
+    def on_commit(conn):
+        other.append(1)
+
+    event.listen(database.engine, "commit", on_commit)
+    try:
+        ops = [{"op": "reorder", "asset_ids": [a3, a1]}, {"op": "hide", "asset_id": a2}]
+        assert admin.post(f"/admin/albums/{album_id}/assets/batch", json={"ops": ops}).json()["ok"]
+        assert admin.post(f"/admin/assets/{a1}/focal", data={"x": 0.2, "y": 2}).json() == {"ok": True, "x": 0.2, "y": 1.0}
+        admin.post(f"/admin/albums/{album_id}/edit", data={"title": "Renamed", "event_date": "2024-01-01"})
+        make_share(admin, album_id)
+        assert admin.post(f"/admin/albums/{album_id}/cover/{a3}", follow_redirects=False).status_code == 303
+        admin.post(f"/admin/assets/{a2}/delete")
+        admin.post(f"/admin/assets/{a2}/move", data={"direction": "up"})
+    finally:
+        event.remove(database.engine, "commit", on_commit)
+    assert other == []
+
+    with database.ReadSessionLocal() as db:
+        album = db.get(models.Album, album_id)
+        assert album.title == "Renamed"
+        assert [a.id for a in sorted(album.assets, key=lambda a: a.sort_order)] == [a3, a1]
+        assert db.query(models.ShareLink).filter_by(album_id=album_id).count() == 1
@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
-"""Small utility to report CPU and RSS for Gunicorn master and workers.
+"""Small utility to report CPU and memory for Gunicorn master and workers.
 
 This script looks for processes whose command line contains all target
 substrings (by default: "gunicorn" and "app.main:app"). It then samples CPU
-usage and memory (RSS), sorts processes, and prints a compact report in a
+usage and memory, sorts processes, and prints a compact report in a
 formatted table.
 
+RSS counts pages shared with the master once per process, so its sum
+overstates the real footprint of a preloaded (``preload_app``) server.
+USS is the memory private to a process and PSS splits shared pages
+between their users; the PSS sum is the footprint to compare.
+
 Notes:
     * Requires the ``psutil`` and ``tabulate`` packages.
-    * No changes were made to the program logic—only formatting and
-      documentation per PEP 8.
+    * USS/PSS come from /proc/<pid>/smaps (Linux); elsewhere they show "-".
 """
 
 import time
@@ -54,6 +58,22 @@ def fmt_mb(bytes_):
     return f"{bytes_ / (1024 * 1024):.1f} MB"
 
 
+def memory(proc):
+    """Return ``(rss, uss, pss)`` in bytes; USS/PSS are ``None`` when unavailable.
+
+    Args:
+        proc (psutil.Process): Process to inspect.
+
+    Returns:
+        tuple: RSS, USS and PSS of the process.
+    """
+    try:
+        full = proc.memory_full_info()
+        return full.rss, getattr(full, "uss", None), getattr(full, "pss", None)
+    except psutil.AccessDenied:
+        return proc.memory_info().rss, None, None
+
+
 def main():
     """Collect and print CPU and memory stats for target processes.
 
@@ -63,7 +83,7 @@ def main():
         3. Gathers CPU%, RSS, PID/PPID, and command line for each process.
         4. Sorts rows to show the master first (by PPID) and then workers by
            memory usage.
-        5. Prints a formatted table and overall totals.
+        5. Prints a formatted table and overall totals (RSS, USS, PSS).
     """
     procs = [
         p
@@ -80,28 +100,36 @@ def main():
     time.sleep(0.3)
 
     rows = []
+    totals = {"rss": 0, "uss": 0, "pss": 0}
+    total_cpu = 0.0
     for p in procs:
         try:
             cpu = p.cpu_percent(None)
-            mem = p.memory_info().rss
+            rss, uss, pss = memory(p)
             rows.append(
                 {
                     "Role": "MASTER" if p.ppid() == 1 else "worker",
                     "PID": p.pid,
                     "PPID": p.ppid(),
                     "CPU %": f"{cpu:.1f}",
-                    "RAM": fmt_mb(mem),
+                    "RSS": fmt_mb(rss),
+                    "USS": fmt_mb(uss) if uss is not None else "-",
+                    "PSS": fmt_mb(pss) if pss is not None else "-",
                     "Command": " ".join(p.cmdline() or []),
+                    "_rss": rss,
                 }
             )
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             continue
+        total_cpu += cpu
+        totals["rss"] += rss
+        totals["uss"] += uss or 0
+        totals["pss"] += pss or 0
 
     # Sort with the master (PPID == 1) first, then workers by memory usage (desc).
-    rows.sort(key=lambda r: (r["PPID"] != 1, -int(r["RAM"].split()[0].replace('.', ''))))
-
-    total_rss = sum(p.memory_info().rss for p in procs if p.is_running())
-    total_cpu = sum(p.cpu_percent(None) for p in procs if p.is_running())
+    rows.sort(key=lambda r: (r["PPID"] != 1, -r["_rss"]))
+    for r in rows:
+        del r["_rss"]
 
     print("Master + workers (sorted):")
     print(tabulate(rows, headers="keys", tablefmt="pretty"))
@@ -109,7 +137,9 @@ def main():
     print("\nTotals:")
     print(f"  Processes: {len(rows)} (expect 6 = 1 master + 5 workers)")
     print(f"  CPU sum : {total_cpu:.1f}%")
-    print(f"  RAM sum : {fmt_mb(total_rss)}")
+    print(f"  RSS sum : {fmt_mb(totals['rss'])}  (shared pages counted per process)")
+    print(f"  USS sum : {fmt_mb(totals['uss'])}  (private to each process)")
+    print(f"  PSS sum : {fmt_mb(totals['pss'])}  (real footprint; compare this one)")
 
 
 if __name__ == "__main__":